@@ -1,6 +1,9 @@
 import os as __os
 from placissimo.__main__ import call
+from placissimo.lib.event_bus import report_progress
+from placissimo.lib.result_cache import ResultCache
 from placissimo.lib.server import serve
+from placissimo.lib.worker_local import worker_state
 
 # set global module metadata.
 __NAME__ = "Placissimo"
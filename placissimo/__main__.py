@@ -12,8 +12,6 @@ TODO:
     and making CORS an optional flag/param.
     * Cache /filesytem data until /api is called again -> to save redrawing the data
     every time.
-    * Should you honor Plac's type conversion capability? Maybe it should be optional (i.e. default
-    is to use the "ast" library.)
     * Might want to consider replacing lambda function in the API handler.
         - See: https://docs.python.org/3.6/library/asyncio-eventloop.html#asyncio-event-loop
         ... functools.partial() is better than lambda functions, because asyncio can inspect
@@ -23,11 +21,17 @@ TODO:
 """
 
 # import modules.
+import asyncio
 import logging
 import os
 import plac
 import sys
-from .lib import dependency_error, server
+from .lib import dependency_error, remote_pool, server, worker_local
+from .lib.compression import COMPRESS_LEVEL, COMPRESS_MIN_BYTES
+from .lib.request_body import MAX_BODY_BYTES
+from .lib.result_files import SPILL_BYTES
+from .lib.serializer import OFFLOAD_BYTES
+from .lib.server import UNIX_SOCKET_MODE
 
 # create logger.
 logger = logging.getLogger(__name__)
@@ -35,7 +39,8 @@ logger.addHandler(logging.NullHandler())
 
 
 def call(funk, server_name="servissimo", render_object=None, callback_arg=None, max_threads=None,
-         socket_filters=None, *args, **kwargs):
+         socket_filters=None, max_coroutines=None, cancel_arg=None, worker_init=None, cache=None,
+         *args, **kwargs):
     """ Provides an iterface to @funk via the command line or an HTTP server.
 
     Args:
@@ -46,16 +51,29 @@ def call(funk, server_name="servissimo", render_object=None, callback_arg=None,
         - callback_arg (str): The name of the argument for @funk to which to pass back
         placissimo.server.serve()'s non-private local vars. Use None to omit passing anything back 
         to @funk.
-        - max_threads (int): The number of concurrent threads to support. If None, the value will be
-        based on your CPU per: https://docs.python.org/3/library/concurrent.futures.html#concurrent.futures.ThreadPoolExecutor.
+        - max_threads (int): The number of concurrent threads (or worker processes) to support. If
+        None, the value will be based on your CPU per: https://docs.python.org/3/library/concurrent.futures.html#concurrent.futures.ThreadPoolExecutor.
         - socket_filters (list): Logging filters to add to the websocket logger. Each item in the 
         list must be an instance of logging.Filter. Use None if no filters are needed.
+        - max_coroutines (int): The number of concurrent tasks to support if @funk is a coroutine
+        function. If None, placissimo.lib.coroutine_pool.MAX_COROUTINES is used.
+        - cancel_arg (str): The name of the argument for @funk to which to pass a cancellation
+        token (a threading.Event) when @funk runs as a server task. The token is set once the task
+        is cancelled or times out. Use None to omit passing anything to @funk.
+        - worker_init (function): The function each worker thread (or process) calls once, before
+        its first task, e.g. to load data that's expensive to create. It takes no arguments; its
+        return value is available to @funk through placissimo.worker_state(). From the command
+        line, it's called once before @funk. Use None to skip it.
+        - cache (placissimo.lib.result_cache.ResultCache): The cache in which the server keeps
+        @funk's results, keyed by the arguments sent to "/api". Use None to only cache results if
+        the "-cache-size" server option is passed. Only use a cache if @funk always returns the
+        same result for the same arguments.
 
     Returns:
         None
 
     Raises:
-        - ValueError: If @callback_arg is not an actual argument within @funk.
+        - ValueError: If @callback_arg or @cancel_arg is not an actual argument within @funk.
         - Exception: If @funk can't be wrapped then the given exception is raised. But if the 
         exception is "dependency_error.DependencyError", then sys.exit() is called.
     """
@@ -72,6 +90,17 @@ def call(funk, server_name="servissimo", render_object=None, callback_arg=None,
             funk.__annotations__[callback_arg] = (
                 "", "positional", None, None, None, "")
 
+    # likewise for @cancel_arg.
+    if cancel_arg is not None:
+        if cancel_arg not in funk.__code__.co_varnames:
+            msg = "Cancel argument '{}' does not appear in the function's arglist: {}".format(
+                cancel_arg, funk.__code__.co_varnames)
+            logger.error(msg)
+            raise ValueError(msg)
+        elif funk.__annotations__.get(cancel_arg) is None:
+            funk.__annotations__[cancel_arg] = (
+                "", "positional", None, None, None, "")
+
     # get name of calling module.
     caller = os.path.basename(sys.argv[0])
 
@@ -83,16 +112,39 @@ def call(funk, server_name="servissimo", render_object=None, callback_arg=None,
         arglist = sys.argv[1:]
 
     # create a default wrapper function that assumes the CLI will be used.
-    wrapper = (lambda: plac.call(funk, arglist, *args, **kwargs))
+    def _call_funk():
+        worker_local.init_worker(worker_init, new_loop=False)
+        return plac.call(funk, arglist, *args, **kwargs)
+    wrapper = _call_funk
 
-    # set the trigger phrase to launch the server.
+    # if @funk is a coroutine function, run it to completion from the command line.
+    if asyncio.iscoroutinefunction(funk):
+        wrapper = (lambda: asyncio.get_event_loop().run_until_complete(_call_funk()))
+
+    # set the trigger phrases to launch the server or its standalone workers.
     trigger = "--{}".format(server_name)
+    worker_trigger = "--workerissimo"
+
+    # alter @wrapper as needed per the presence or absence of the triggers in sys.argv.
+    if worker_trigger in sys.argv:
+
+        # remove @worker_trigger from command line arguments.
+        arglist.remove(worker_trigger)
+        workers.prog = "{} {}".format(caller, worker_trigger)
+
+        # get the server's address and the number of workers from @workers.
+        connect, processes = plac.call(workers, arglist, *args, **kwargs)
 
-    # alter @wrapper as needed per the presence or absence of @trigger in sys.argv.
-    if trigger not in sys.argv:
+        # update @wrapper to launch workers; the key is read from the environment so that it
+        # doesn't show up in the process list.
+        wrapper = (lambda: remote_pool.run_workers(
+            funk, connect, os.environ.get(remote_pool.WORKER_KEY_ENV), processes, worker_init))
 
-        # update the .epilog attribute to include server details.
-        addendum = "\n\nserver usage: {} {} -h".format(caller, trigger)
+    elif trigger not in sys.argv:
+
+        # update the .epilog attribute to include server and worker details.
+        addendum = "\n\nserver usage: {} {} -h\nworker usage: {} {} -h".format(
+            caller, trigger, caller, worker_trigger)
         funk.epilog = addendum if not hasattr(funk, "epilog") else "{}{}".format(
             funk.epilog.format(), addendum)
 
@@ -105,13 +157,25 @@ def call(funk, server_name="servissimo", render_object=None, callback_arg=None,
         main.prog = "{} {}".format(caller, trigger)
 
         # get required parameters from @main (port number, etc.).
-        port, index_file, filesystem_path, allow_websocket, allow_broadcasts, allow_get = plac.call(
-            main, arglist, *args, **kwargs)
+        (port, index_file, filesystem_path, allow_websocket, allow_broadcasts, allow_get,
+         executor, max_queue, max_tasks, max_task_age, max_result_bytes, task_store,
+         result_tail, task_timeout, cache_size, cache_bytes, cache_ttl, coalesce,
+         max_body_bytes, result_dir, spill_bytes, offload_bytes, compress, compress_level,
+         compress_min_bytes, processes, worker_address, unix_socket,
+         unix_socket_mode) = plac.call(main, arglist, *args, **kwargs)
 
         # update @wrapper to launch a server.
         wrapper = (lambda: server.serve(funk, server_name, render_object, callback_arg, max_threads,
                                         socket_filters, port, index_file, filesystem_path, allow_websocket, allow_broadcasts,
-                                        allow_get, *args, **kwargs))
+                                        allow_get, executor, max_queue, max_tasks, max_task_age,
+                                        max_result_bytes, task_store, max_coroutines, result_tail,
+                                        task_timeout, cancel_arg, worker_init, cache_size,
+                                        cache_bytes, cache_ttl, cache, coalesce, max_body_bytes,
+                                        result_dir, spill_bytes, offload_bytes, compress,
+                                        compress_level, compress_min_bytes, processes,
+                                        worker_address,
+                                        os.environ.get(remote_pool.WORKER_KEY_ENV), unix_socket,
+                                        unix_socket_mode, *args, **kwargs))
 
     # run @wrapper.
     try:
@@ -124,14 +188,63 @@ def call(funk, server_name="servissimo", render_object=None, callback_arg=None,
     return
 
 
+def _octal(value):
+    """ Converts the octal string @value to an int, e.g. "660" to 0o660. """
+
+    return int(value, 8)
+
+
 def main(allow_get: ("enable GET access", "flag"),
+         coalesce: ("let identical calls share a queued or running task", "flag"),
+         compress: ("compress responses per the client's \"Accept-Encoding\" header", "flag"),
          websocket_mode: ("options for the \"/websocket\" endpoint", "option", None, None,
                           ("private", "broadcast")),
+         cache_bytes: ("approximate total size in bytes of cached results", "option", None,
+                       int) = None,
+         cache_size: ("number of results to cache by their arguments", "option", None,
+                      int) = None,
+         cache_ttl: ("number of seconds to keep a cached result", "option", None, float) = None,
+         compress_level: ("compression level from 1 (fastest) to 9 (smallest)", "option", None,
+                          int) = COMPRESS_LEVEL,
+         compress_min_bytes: ("size in bytes below which a response isn't compressed", "option",
+                              None, int) = COMPRESS_MIN_BYTES,
+         executor: ("run tasks in a thread pool, in a pool of worker processes, or in standalone \
+            workers", "option", None, str, ("thread", "process", "remote")) = "thread",
          filesystem_path: ("path to parent directory for the \"/filesystem\" endpoint", "option",
                            None, str) = None,
          index_file: ("path to HTML template for the \"/\" endpoint \
             (use \"DEFAULT\" to use the built-in file)", "option", None, str) = None,
-         port: ("port number to use", "option", None, int) = 8080,
+         max_body_bytes: ("maximum size in bytes of a request body sent to \"/api\"", "option",
+                          None, int) = MAX_BODY_BYTES,
+         max_queue: ("number of tasks that may wait for a free worker", "option", None,
+                     int) = 0,
+         max_result_bytes: ("approximate total size in bytes of task results to keep", "option",
+                            None, int) = None,
+         max_task_age: ("number of seconds to keep a finished task", "option", None,
+                        float) = None,
+         max_tasks: ("number of tasks to keep", "option", None, int) = None,
+         offload_bytes: ("approximate size in bytes above which a response is encoded in a \
+            helper thread", "option", None, int) = OFFLOAD_BYTES,
+         port: ("port number to use (default: 8080 unless -unix-socket is used)", "option", None,
+                int) = None,
+         processes: ("number of worker processes that share the port (requires a task store)",
+                     "option", None, int) = 1,
+         result_dir: ("directory in which to write large results instead of keeping them in memory",
+                      "option", None, str) = None,
+         result_tail: ("number of items yielded by a generator function to keep as the result",
+                       "option", None, int) = 100,
+         spill_bytes: ("size in bytes above which a result is written to the result directory",
+                       "option", None, int) = SPILL_BYTES,
+         task_store: ("path to an SQLite database in which to keep tasks across restarts",
+                      "option", None, str) = None,
+         task_timeout: ("default number of seconds a task may run before it's cancelled",
+                        "option", None, float) = None,
+         unix_socket: ("path of a Unix socket on which to serve, alone or alongside -port",
+                       "option", None, str) = None,
+         unix_socket_mode: ("permissions of the Unix socket in octal, e.g. 660", "option", None,
+                            _octal) = "{:o}".format(UNIX_SOCKET_MODE),
+         worker_address: ("Unix socket path or \"host:port\" at which standalone workers connect",
+                          "option", None, str) = None,
          ):
     """Server options."""
 
@@ -141,12 +254,30 @@ def main(allow_get: ("enable GET access", "flag"),
         allow_websocket = True
         allow_broadcasts = (websocket_mode == "broadcast")
 
+    # use the default port unless only a Unix socket is requested.
+    if port is None and unix_socket is None:
+        port = 8080
+
     # if needed, use built-in HTML template.
     if index_file == "DEFAULT":
         index_file = os.path.join(
             os.path.dirname(__file__), "lib", "index.html")
 
-    return (port, index_file, filesystem_path, allow_websocket, allow_broadcasts, allow_get)
+    return (port, index_file, filesystem_path, allow_websocket, allow_broadcasts, allow_get,
+            executor, max_queue, max_tasks, max_task_age, max_result_bytes, task_store,
+            result_tail, task_timeout, cache_size, cache_bytes, cache_ttl, coalesce, max_body_bytes,
+            result_dir, spill_bytes, offload_bytes, compress, compress_level, compress_min_bytes,
+            processes, worker_address, unix_socket, unix_socket_mode)
+
+
+def workers(connect: ("Unix socket path or \"host:port\" of the server's worker address",
+                      "positional", None, str),
+            processes: ("number of worker processes (default: number of CPUs)", "option", None,
+                        int) = None,
+            ):
+    """Worker options."""
+
+    return connect, processes
 
 
 if __name__ == "__main__":
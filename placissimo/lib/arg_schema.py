@@ -0,0 +1,213 @@
+#!/usr/bin/python3
+
+""" This module contains a class that checks and converts the arguments sent to "/api" for the
+function called by placissimo.call().
+
+The function's signature and Plac annotations are compiled once, when the server starts, into one
+converter per argument. Arguments with a declared type (e.g. int) are converted with that type;
+flags accept "True"/"False" and "1"/"0"; arguments with declared choices must be one of them.
+Arguments without a declared type keep the old behavior: values that look like numbers, booleans,
+or None are converted and everything else stays a string.
+"""
+
+# import modules.
+import ast
+import inspect
+import plac
+from .argument_error import ArgumentError
+
+# the string values accepted for flags.
+_FLAG_VALUES = {"True": True, "true": True, "1": True, "": True,
+                "False": False, "false": False, "0": False}
+
+# the instance types accepted for already typed (e.g. JSON) values of common declared types.
+_TYPED_VALUES = {int: (int,), float: (int, float), bool: (bool,), str: (str,)}
+
+
+def _infer(value):
+    """ Converts @value to the type implied by its contents. For example, the string "True" is
+    converted to a boolean True. Values that aren't None, a number, or a boolean stay strings.
+
+    Args:
+        - value (str): The value to convert.
+
+    Returns:
+        object: The return value.
+    """
+
+    try:
+        obj = ast.literal_eval(value)
+    except Exception:
+        return value
+
+    if obj.__class__.__name__ not in ["NoneType", "int", "float", "bool"]:
+        return value
+
+    return obj
+
+
+def _parse_flag(value):
+    """ Converts the string @value of a flag to a boolean.
+
+    Args:
+        - value (str): The value to convert.
+
+    Returns:
+        bool: The return value.
+
+    Raises:
+        - ValueError: If @value isn't a boolean value.
+    """
+
+    try:
+        return _FLAG_VALUES[value]
+    except KeyError:
+        raise ValueError("Expected a boolean value, not: {}".format(value))
+
+
+class _Param():
+    """ This class holds the compiled converter for one argument of the user function.
+
+    Args:
+        - name (str): The argument's name.
+        - annotation (object): The argument's annotation, if any.
+        - default (object): The argument's default value, or inspect.Parameter.empty.
+    """
+
+    __slots__ = ("name", "kind", "type", "choices", "default", "implied", "required", "convert")
+
+    def __init__(self, name, annotation, default):
+
+        if annotation is inspect.Parameter.empty:
+            annotation = plac.Annotation()
+        else:
+            annotation = plac.Annotation.from_(annotation)
+
+        self.name = name
+        self.kind = annotation.kind
+        self.type = bool if self.kind == "flag" else annotation.type
+        self.choices = annotation.choices
+        self.default = default
+        self.implied = False
+        self.required = False
+
+        # pick the fastest converter for the declared type.
+        if self.type is None:
+            self.convert = _infer
+        elif self.type is str:
+            self.convert = None
+        elif self.type is bool:
+            self.convert = _parse_flag
+        else:
+            self.convert = self.type
+
+        # as with Plac, missing flags are False and missing options are None; only positional
+        # arguments without a default are required.
+        if default is inspect.Parameter.empty:
+            if self.kind == "positional":
+                self.required = True
+            else:
+                self.default = False if self.kind == "flag" else None
+                self.implied = True
+
+    def parse(self, value):
+        """ Converts @value and checks it against the argument's choices.
+
+        Args:
+            - value (object): The value sent for the argument. Strings are converted; other
+            values (e.g. parsed from JSON) are only checked.
+
+        Returns:
+            object: The return value.
+
+        Raises:
+            - ArgumentError: If @value can't be converted or isn't one of the choices.
+        """
+
+        try:
+            if isinstance(value, str):
+                if self.convert is not None:
+                    value = self.convert(value)
+            elif self.type in _TYPED_VALUES and (
+                    not isinstance(value, _TYPED_VALUES[self.type])
+                    or (isinstance(value, bool) and self.type is not bool)):
+                raise ValueError("Expected a value of type '{}', not: {}".format(
+                    self.type.__name__, value))
+        except (TypeError, ValueError) as err:
+            raise ArgumentError("Invalid value for argument '{}': {}".format(self.name, err))
+
+        if self.choices and value not in self.choices:
+            raise ArgumentError("Invalid value for argument '{}': {} is not one of {}".format(
+                self.name, value, list(self.choices)))
+
+        return value
+
+
+class ArgSchema():
+    """ This class checks and converts "/api" arguments per the signature and Plac annotations of
+    the user function.
+
+    Args:
+        - funk (function): The user function.
+        - server_args (list): The names of the arguments that the server passes to @funk itself,
+        e.g. the callback argument. They can't be sent by clients. Use None for none.
+    """
+
+    def __init__(self, funk, server_args=None):
+
+        server_args = [arg for arg in server_args or [] if arg is not None]
+        self.params = {}
+        self.names = set()
+        self.accepts_any = False
+
+        for param in inspect.signature(funk).parameters.values():
+            self.names.add(param.name)
+            if param.kind == inspect.Parameter.VAR_KEYWORD:
+                self.accepts_any = True
+            elif param.kind == inspect.Parameter.VAR_POSITIONAL or param.name in server_args:
+                continue
+            else:
+                self.params[param.name] = _Param(param.name, param.annotation, param.default)
+
+        self.required = [name for name, param in self.params.items() if param.required]
+        self.implied = {name: param.default for name, param in self.params.items()
+                        if param.implied}
+
+    def parse(self, kwargs):
+        """ Converts the values in @kwargs and adds the implied values of missing flags and
+        options.
+
+        Args:
+            - kwargs (dict): The arguments sent to "/api".
+
+        Returns:
+            dict: The return value.
+            The arguments for the user function.
+
+        Raises:
+            - ArgumentError: If an argument is unknown, a required argument is missing, or a value
+            is invalid.
+        """
+
+        parsed = {}
+        for name, value in kwargs.items():
+            param = self.params.get(name)
+            if param is not None:
+                parsed[name] = param.parse(value)
+            elif self.accepts_any and name not in self.names:
+                parsed[name] = _infer(value) if isinstance(value, str) else value
+            else:
+                raise ArgumentError("Unknown argument: {}".format(name))
+
+        missing = [name for name in self.required if name not in parsed]
+        if missing:
+            raise ArgumentError("Missing required argument(s): {}".format(", ".join(missing)))
+
+        for name, value in self.implied.items():
+            parsed.setdefault(name, value)
+
+        return parsed
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,19 @@
+#!/usr/bin/python3
+
+""" This module contains a custom exception class for "/api" arguments that don't match the
+function called by placissimo.call(). """
+
+
+class ArgumentError(ValueError):
+    """ A custom exception class for "/api" arguments that don't match the function called by
+    placissimo.call(), e.g. unknown or missing arguments or values of the wrong type.
+
+    Args:
+        - msg (str): The error message.
+    """
+
+    pass
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,216 @@
+#!/usr/bin/python3
+
+""" This module contains a class that compresses the responses of the endpoints created by
+placissimo.server.serve().
+
+The content encoding is negotiated with the request's "Accept-Encoding" header. Gzip is always
+available; Zstandard and Brotli are preferred if the "zstandard" or "brotli" module is installed.
+Responses that are written in several chunks, e.g. streamed task items, are compressed chunk by
+chunk as they're sent.
+"""
+
+# import modules.
+import zlib
+from tornado import web
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# the default compression level, from 1 (fastest) to 9 (smallest).
+COMPRESS_LEVEL = 6
+
+# the default size in bytes below which a response that's sent in one chunk isn't compressed.
+COMPRESS_MIN_BYTES = 1024
+
+# the content types to compress in addition to any types starting with "text/".
+CONTENT_TYPES = {"application/json", "application/x-ndjson", "application/javascript",
+                 "application/xml", "application/xhtml+xml", "image/svg+xml",
+                 "application/msgpack", "application/cbor"}
+
+
+class _Compressor():
+    """ This class compresses a response body in one or more chunks.
+
+    Args:
+        - encoding (str): The content encoding: "zstd", "br", or "gzip".
+        - level (int): The compression level.
+    """
+
+    def __init__(self, encoding, level):
+
+        if encoding == "zstd":
+            compressor = zstandard.ZstdCompressor(level=level).compressobj()
+            self._compress = compressor.compress
+            self._flush = lambda: compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+            self._finish = compressor.flush
+        elif encoding == "br":
+            compressor = brotli.Compressor(quality=level)
+            self._compress = compressor.process
+            self._flush = compressor.flush
+            self._finish = compressor.finish
+        else:
+            compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._compress = compressor.compress
+            self._flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = compressor.flush
+
+    def compress(self, chunk, finishing=True):
+        """ Compresses the next @chunk of the body.
+
+        Args:
+            - chunk (bytes): The next chunk.
+            - finishing (bool): Use True if @chunk is the last chunk.
+
+        Returns:
+            bytes: The return value.
+            The compressed data, flushed so that the client can decompress everything sent so far.
+        """
+
+        return self._compress(chunk) + (self._finish() if finishing else self._flush())
+
+
+class _CompressTransform(web.OutputTransform):
+    """ This class is a Tornado output transform that compresses a response per a
+    placissimo.lib.compression.Compression.
+
+    Args:
+        - request (tornado.httputil.HTTPServerRequest): The request.
+        - compression (Compression): The compression settings.
+    """
+
+    def __init__(self, request, compression):
+
+        self._compression = compression
+        self._encoding = compression.negotiate(request.headers.get("Accept-Encoding"))
+        self._compressor = None
+
+    def transform_first_chunk(self, status_code, headers, chunk, finishing):
+
+        if "Vary" in headers:
+            headers["Vary"] += ", Accept-Encoding"
+        else:
+            headers["Vary"] = "Accept-Encoding"
+
+        # only compress whole responses of compressible types that aren't too small.
+        content_type = headers.get("Content-Type", "").split(";")[0].strip()
+        if (self._encoding is not None and status_code not in [204, 206, 304]
+                and "Content-Encoding" not in headers
+                and (content_type.startswith("text/") or content_type in CONTENT_TYPES)
+                and (not finishing or len(chunk) >= self._compression.min_bytes)):
+            headers["Content-Encoding"] = self._encoding
+            self._compressor = _Compressor(self._encoding, self._compression.level)
+            chunk = self.transform_chunk(chunk, finishing)
+            if "Content-Length" in headers:
+                if finishing:
+                    headers["Content-Length"] = str(len(chunk))
+                else:
+                    del headers["Content-Length"]
+
+        # the compressed body isn't byte-for-byte the same as the original, so its ETag is weak.
+        etag = headers.get("Etag")
+        if etag is not None and not etag.startswith("W/") and headers.get(
+                "Content-Encoding") in self._compression.encodings:
+            headers["Etag"] = "W/{}".format(etag)
+
+        return status_code, headers, chunk
+
+    def transform_chunk(self, chunk, finishing):
+
+        if self._compressor is not None:
+            chunk = self._compressor.compress(chunk, finishing)
+
+        return chunk
+
+
+class Compression():
+    """ This class compresses responses per the request's "Accept-Encoding" header.
+
+    Args:
+        - level (int): The compression level, from 1 (fastest) to 9 (smallest).
+        - min_bytes (int): The size in bytes below which a response that's sent in one chunk isn't
+        compressed. Use None to compress responses of any size.
+    """
+
+    def __init__(self, level=COMPRESS_LEVEL, min_bytes=COMPRESS_MIN_BYTES):
+
+        self.level = level
+        self.min_bytes = min_bytes or 0
+
+        # list the available content encodings from the most to the least preferred.
+        self.encodings = [encoding for encoding, module in [
+            ("zstd", zstandard), ("br", brotli), ("gzip", zlib)] if module is not None]
+
+    def negotiate(self, accept_encoding):
+        """ Picks the content encoding per the value of an "Accept-Encoding" header.
+
+        Args:
+            - accept_encoding (str): The value of the "Accept-Encoding" header. Use None if
+            there's no header.
+
+        Returns:
+            str: The return value.
+            The content encoding with the highest quality, or None if no available encoding is
+            accepted.
+        """
+
+        if not accept_encoding:
+            return None
+
+        qualities = {}
+        for coding in accept_encoding.split(","):
+            params = coding.split(";")
+            quality = 1.0
+            for param in params[1:]:
+                key, _, value = param.partition("=")
+                if key.strip() == "q":
+                    try:
+                        quality = float(value)
+                    except ValueError:
+                        quality = 0.0
+            qualities[params[0].strip().lower()] = quality
+
+        # pick the highest quality, preferring earlier encodings for ties.
+        best_encoding, best_quality = None, 0
+        for encoding in self.encodings:
+            quality = qualities.get(encoding, qualities.get("*", 0))
+            if quality > best_quality:
+                best_encoding, best_quality = encoding, quality
+
+        return best_encoding
+
+    def compress(self, data, encoding):
+        """ Compresses the whole body @data with @encoding.
+
+        Args:
+            - data (bytes): The body to compress.
+            - encoding (str): The content encoding; see self.negotiate().
+
+        Returns:
+            bytes: The return value.
+        """
+
+        return _Compressor(encoding, self.level).compress(data)
+
+    def transform(self, request):
+        """ Returns a Tornado output transform that compresses the response to @request. Pass this
+        method to tornado.web.Application's @transforms.
+
+        Args:
+            - request (tornado.httputil.HTTPServerRequest): The request.
+
+        Returns:
+            tornado.web.OutputTransform: The return value.
+        """
+
+        return _CompressTransform(request, self)
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,236 @@
+#!/usr/bin/python3
+
+""" This module contains a class that runs a coroutine function called by placissimo.call() on the
+server's IOLoop instead of in a worker thread.
+
+Async generator functions are supported too; each yielded item is written to the task's stream
+before the next one is requested.
+
+Coroutine tasks all run on the IOLoop's thread. So that their logs still carry each task's thread
+name, logging records created inside a coroutine task are renamed after the task.
+
+Todo:
+    * Renaming logging records requires Python 3.7+ (contextvars); older versions log coroutine
+    tasks under the IOLoop thread's name.
+"""
+
+# import modules.
+import asyncio
+import functools
+import inspect
+import logging
+from .worker_local import init_worker
+from concurrent.futures import Executor, Future
+from tornado import gen
+
+try:
+    import contextvars
+except ImportError:
+    contextvars = None
+
+# the default number of coroutine tasks that may run at the same time.
+MAX_COROUTINES = 1000
+
+# the thread name of the coroutine task that's running, if any.
+_task_name = contextvars.ContextVar(
+    "task_name", default=None) if contextvars is not None else None
+
+
+def _install_record_factory():
+    """ Makes logging records created inside a coroutine task carry the task's thread name. This
+    only takes effect once.
+
+    Returns:
+        None
+    """
+
+    if _task_name is None or getattr(logging.getLogRecordFactory(), "task_aware", False):
+        return
+
+    base_factory = logging.getLogRecordFactory()
+
+    def _factory(*args, **kwargs):
+        record = base_factory(*args, **kwargs)
+        thread_name = _task_name.get()
+        if thread_name is not None:
+            record.threadName = thread_name
+        return record
+
+    _factory.task_aware = True
+    logging.setLogRecordFactory(_factory)
+
+    return
+
+
+class CoroutinePool(Executor):
+    """ This class runs the coroutine function called by placissimo.call() on the server's IOLoop.
+
+    Like placissimo.lib.process_pool.ProcessPool, submit() takes the task's thread name instead of
+    a function; each call runs @funk.
+    """
+
+    def __init__(self, funk, io_loop, max_workers=None, streams=None, worker_init=None):
+        """ Sets instance attributes.
+
+        Args:
+            - funk (function): The user function. This must be a coroutine function or an async
+            generator function, i.e. defined with "async def".
+            - io_loop (tornado.ioloop.IOLoop): The server's IOLoop. Tasks run on it.
+            - max_workers (int): The number of tasks that may run at the same time. If None,
+            @MAX_COROUTINES is used.
+            - streams (dict): The placissimo.lib.task_stream.TaskStream for each streaming task,
+            keyed by thread name. Items yielded by async generator tasks are written to them.
+            - worker_init (function): The function to call once, before the first task, to create
+            the state shared by all tasks; see placissimo.lib.worker_local. It runs on
+            @self.io_loop, so it blocks the server while it runs. Use None to skip it.
+        """
+
+        # set logging.
+        self.logger = logging.getLogger(__name__)
+        self.logger.addHandler(logging.NullHandler())
+
+        # set attributes.
+        self.funk = funk
+        self.io_loop = io_loop
+        self._max_workers = max_workers or MAX_COROUTINES
+        self.streams = streams if streams is not None else {}
+        self.worker_init = worker_init
+        self._running = {}
+        self._cancelled = {}
+        self._shutdown = False
+
+        _install_record_factory()
+
+    def _run(self, thread_name, kwargs):
+        """ Sets the current task's thread name and schedules @self.funk(**kwargs). Call this
+        inside a copied context so that the name only applies to this task.
+
+        Returns:
+            asyncio.Future: The return value.
+        """
+
+        if _task_name is not None:
+            _task_name.set(thread_name)
+
+        result = self.funk(**kwargs)
+        if getattr(inspect, "isasyncgen", lambda obj: False)(result):
+            result = self._write_items(result, self.streams.get(thread_name))
+
+        return gen.convert_yielded(result)
+
+    @staticmethod
+    async def _write_items(items, stream):
+        """ Writes each item yielded by the async generator @items to @stream, waiting for each
+        write to finish.
+
+        Args:
+            - items (async_generator): The return value of the user function.
+            - stream (placissimo.lib.task_stream.TaskStream): The task's stream, or None.
+
+        Returns:
+            None
+        """
+
+        async for item in items:
+            written = stream.write(item) if stream is not None else None
+            if written is not None:
+                await written
+
+        return
+
+    def _finish(self, future, thread_name, task_future):
+        """ Copies the outcome of the finished @task_future to @future. This runs on
+        @self.io_loop. """
+
+        self._running.pop(thread_name, None)
+        error = self._cancelled.pop(thread_name, None)
+        if error is not None and task_future.cancelled():
+            future.set_exception(error)
+            return
+        try:
+            future.set_result(task_future.result())
+        except (Exception, asyncio.CancelledError) as err:
+            future.set_exception(err)
+
+        return
+
+    def submit(self, thread_name, **kwargs):
+        """ Schedules @self.funk(**kwargs) on @self.io_loop under @thread_name. Call this on
+        @self.io_loop.
+
+        Args:
+            - thread_name (str): The unique thread name for a given task.
+            - kwargs: The arguments to send to @self.funk().
+
+        Returns:
+            concurrent.futures.Future: The return value.
+
+        Raises:
+            - RuntimeError: If the pool has been shut down.
+        """
+
+        if self._shutdown:
+            raise RuntimeError("Can't submit task after shutdown.")
+
+        future = Future()
+        future.set_running_or_notify_cancel()
+
+        # start the coroutine; tasks created inside it inherit the copied context.
+        # note: all tasks run on @self.io_loop's thread, so they share a single worker state.
+        try:
+            init_worker(self.worker_init, new_loop=False)
+            if _task_name is not None:
+                task_future = contextvars.copy_context().run(
+                    self._run, thread_name, kwargs)
+            else:
+                task_future = self._run(thread_name, kwargs)
+        except Exception as err:
+            future.set_exception(err)
+            return future
+
+        self._running[thread_name] = task_future
+        self.io_loop.add_future(
+            task_future, functools.partial(self._finish, future, thread_name))
+
+        return future
+
+    def shutdown(self, wait=True):
+        """ Cancels all running tasks. Tasks can't be waited on once the IOLoop has stopped, so
+        @wait is ignored.
+
+        Returns:
+            None
+        """
+
+        self.logger.info("Cancelling {} coroutine task(s).".format(
+            len(self._running)))
+        self._shutdown = True
+        for task_future in list(self._running.values()):
+            task_future.cancel()
+
+        return
+
+    def cancel(self, thread_name, error):
+        """ Cancels the running task @thread_name. Call this on @self.io_loop.
+
+        Args:
+            - thread_name (str): The unique thread name for a given task.
+            - error (Exception): The exception with which the task's future is failed.
+
+        Returns:
+            bool: The return value.
+            True if the task was found. False if it's already done.
+        """
+
+        task_future = self._running.get(thread_name)
+        if task_future is None:
+            return False
+
+        self._cancelled[thread_name] = error
+        task_future.cancel()
+
+        return True
+
+
+if __name__ == "__main__":
+    pass
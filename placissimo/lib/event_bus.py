@@ -0,0 +1,202 @@
+#!/usr/bin/python3
+
+""" This module contains a class that publishes task lifecycle events to the "/events" endpoint in
+placissimo.server.serve().
+
+Events can be published from any thread. Each event is encoded once, when it's published, and then
+handed to every subscriber on the server's IOLoop. The most recent events are kept in a bounded
+ring so that clients that reconnect can resume where they left off. Events only carry task
+metadata; results are left out so that they're neither encoded again nor kept in the ring, and
+clients read them from "/tasks" or "/tasks/result" instead.
+
+Tasks report their progress through logging; see report_progress().
+"""
+
+# import modules.
+import json
+import logging
+import threading
+from .serializer import default
+from collections import deque
+
+# the number of recent events to keep for clients that resume.
+EVENT_HISTORY = 1000
+
+
+class EventBus():
+    """ This class publishes task lifecycle events to subscribers. """
+
+    def __init__(self, io_loop, history=EVENT_HISTORY):
+        """ Sets instance attributes.
+
+        Args:
+            - io_loop (tornado.ioloop.IOLoop): The server's IOLoop. Events are delivered on it.
+            - history (int): The number of recent events to keep for clients that resume.
+        """
+
+        # set logging.
+        self.logger = logging.getLogger(__name__)
+        self.logger.addHandler(logging.NullHandler())
+
+        # set attributes.
+        self.io_loop = io_loop
+        self.subscribers = []
+        self.watchers = {}
+        self._ring = deque(maxlen=history)
+        self.last_id = 0
+        self._lock = threading.Lock()
+
+    def publish(self, event, thread_name, data=None):
+        """ Publishes an @event for the task @thread_name. This is thread-safe.
+
+        Args:
+            - event (str): The event type, e.g. "queued" or "finished".
+            - thread_name (str): The unique thread name for the task.
+            - data (object): The event's JSON-compatible payload. Other values are converted with
+            placissimo.lib.serializer.default(). If it's a dict of task metadata, its "result" is
+            left out.
+
+        Returns:
+            None
+        """
+
+        # leave out the task's result and encode the remaining metadata here, off the IOLoop.
+        if isinstance(data, dict) and "result" in data:
+            data = {key: value for key, value in data.items() if key != "result"}
+        payload = json.dumps({"name": thread_name, "data": data}, default=default)
+
+        # number and schedule events under the lock so that they're delivered in order.
+        with self._lock:
+            self.last_id += 1
+            item = (self.last_id, event, thread_name, payload)
+            self._ring.append(item)
+            self.io_loop.add_callback(self._deliver, item)
+
+        return
+
+    def _deliver(self, item):
+        """ Hands the event @item to each subscriber and to the watchers of its task. This runs on
+        @self.io_loop. """
+
+        callbacks = list(self.subscribers)
+        if item is not None:
+            callbacks += self.watchers.get(item[2], [])
+        for callback in callbacks:
+            try:
+                callback(item)
+            except Exception as err:
+                self.logger.error("Can't deliver event to subscriber: {}".format(
+                    err.__repr__()))
+
+        return
+
+    def heartbeat(self):
+        """ Hands None to each subscriber so that idle connections are kept open. This runs on
+        @self.io_loop.
+
+        Returns:
+            None
+        """
+
+        self._deliver(None)
+
+        return
+
+    def subscribe(self, callback, last_event_id=None):
+        """ Adds @callback as a subscriber. This runs on @self.io_loop.
+
+        Args:
+            - callback (function): Called with each new event as a tuple of (event id, event type,
+            thread name, JSON payload), or with None for a heartbeat.
+            - last_event_id (int): The id of the last event the subscriber received. Use None to
+            only receive new events.
+
+        Returns:
+            list: The return value.
+            The kept events after @last_event_id, oldest first. Events that were published but not
+            yet delivered may be both returned here and handed to @callback later. If some events
+            after @last_event_id are no longer kept, or if @last_event_id wasn't published by this
+            bus, e.g. before the server restarted, None is returned instead.
+        """
+
+        self.subscribers.append(callback)
+        if last_event_id is None:
+            return []
+
+        with self._lock:
+            if last_event_id > self.last_id:
+                return None
+            if last_event_id < self.last_id and (
+                    not self._ring or self._ring[0][0] > last_event_id + 1):
+                return None
+            return [item for item in self._ring if item[0] > last_event_id]
+
+    def unsubscribe(self, callback):
+        """ Removes @callback as a subscriber.
+
+        Returns:
+            None
+        """
+
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+
+        return
+
+    def watch(self, thread_name, callback):
+        """ Adds @callback as a watcher of the task @thread_name. Unlike subscribers, watchers only
+        receive that task's events and no heartbeats. This runs on @self.io_loop.
+
+        Args:
+            - thread_name (str): The unique thread name for the task.
+            - callback (function): Called with each new event for the task; see subscribe().
+
+        Returns:
+            None
+        """
+
+        self.watchers.setdefault(thread_name, []).append(callback)
+
+        return
+
+    def unwatch(self, thread_name, callback):
+        """ Removes @callback as a watcher of the task @thread_name.
+
+        Returns:
+            None
+        """
+
+        callbacks = self.watchers.get(thread_name, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+        if not callbacks:
+            self.watchers.pop(thread_name, None)
+
+        return
+
+
+def report_progress(progress, message=None):
+    """ Reports the progress of the current task to the "/events" endpoint. Call this from the user
+    function while it runs as a task.
+
+    Args:
+        - progress (object): Any JSON-compatible value, e.g. a percentage or a dict of counts.
+        - message (str): The message to log. If None, a message is created from @progress.
+
+    Returns:
+        None
+    """
+
+    # note: this goes through logging so that it also works in worker processes; see
+    # ./log_manager:_EventsHandler.emit().
+    logger = logging.getLogger(__name__)
+    logger.addHandler(logging.NullHandler())
+    if message is None:
+        message = "Progress: {}".format(progress)
+    logger.info(message, extra={"taskProgress": progress})
+
+    return
+
+
+if __name__ == "__main__":
+    pass
@@ -1,22 +1,27 @@
 #!/usr/bin/python3
 
 """ This module contains a class that provides a RESTful API to the function called by 
-placissimo.call(). 
-
-Todo:
-    * Consolidate redundant logic in GET/POST.
-"""
+placissimo.call(). """
 
 # import modules.
-import ast
-import asyncio
+import functools
+import inspect
+import json
+import logging
 import os
 import threading
+from ..argument_error import ArgumentError
+from ..queue_full_error import QueueFullError
+from ..request_body import RequestBody
+from ..result_cache import ResultCache
+from ..task_cancelled_error import TaskCancelledError
+from ..task_stream import TaskStream
+from ..worker_local import init_worker
 from .base_handler import BaseHandler
-from datetime import datetime
-from tornado import web
+from tornado import httputil, ioloop, web
 
 
+@web.stream_request_body
 class ApiHandler(BaseHandler):
     """ This class provides a RESTful API to the function called by placissimo.call(). """
 
@@ -24,6 +29,119 @@ class ApiHandler(BaseHandler):
 
         super().initialize(__name__, **server_locals)
 
+        # set long-poll and streaming attributes; see self._wait_for_task() and
+        # self._stream_task().
+        self.waiting = None
+        self.streaming = None
+
+        # set request body attributes; see self.prepare() and self.data_received().
+        self.body = None
+        self.body_error = None
+
+    def prepare(self):
+        """ Prepares to receive the body of a POST request in chunks. If the body is larger than
+        @self.max_body_bytes, sends a 413.
+
+        Returns:
+            None
+        """
+
+        if self.request.method != "POST":
+            return
+
+        # make sure the body isn't too large.
+        if self.max_body_bytes is not None:
+            self.request.connection.set_max_body_size(self.max_body_bytes)
+            length = self.request.headers.get("Content-Length", "0")
+            if length.isdigit() and int(length) > self.max_body_bytes:
+                self.logger.warning("Request body of {} bytes is too large.".format(length))
+                self.set_status(413)
+                self.respond({"error": "The request body may not exceed {} bytes.".format(
+                    self.max_body_bytes)})
+                return
+
+        try:
+            self.body = RequestBody(self.request.headers)
+        except ValueError as err:
+            self.body_error = err
+
+        return
+
+    def data_received(self, chunk):
+        """ Receives the next @chunk of the request body. Uploaded files are written to disk as
+        they arrive.
+
+        Returns:
+            None
+        """
+
+        if self.body is None or self.body_error is not None:
+            return
+
+        try:
+            self.body.receive(chunk)
+        except ValueError as err:
+            self.body_error = err
+            self.body.discard()
+
+        return
+
+    def _finish_body(self):
+        """ Ends the request body once it's received. Bodies that are kept in memory are set as
+        @self.request.body. If the body is invalid, sends a 400.
+
+        Returns:
+            bool: The return value.
+            True if the body is valid, otherwise False.
+        """
+
+        if self.body is not None and self.body_error is None:
+            try:
+                self.body.finish()
+            except ValueError as err:
+                self.body_error = err
+
+        if self.body_error is not None:
+            self._send_invalid_arguments(self.body_error)
+            return False
+
+        if self.body is not None and self.body.data is not None:
+            self.request.body = self.body.data
+
+        return True
+
+    def _body_kwargs(self):
+        """ Returns the arguments in the request body. A JSON object's values are kept as they're
+        parsed; form values are strings; uploaded files are passed by their path.
+
+        Returns:
+            dict: The return value.
+
+        Raises:
+            - ValueError: If a JSON body can't be parsed or isn't an object.
+        """
+
+        if self.body is None:
+            return {}
+
+        # multipart and binary bodies were parsed as they arrived.
+        if self.body.data is None:
+            return dict(self.body.fields)
+
+        if self.body.content_type == "application/json":
+            if not self.body.data.strip():
+                return {}
+            kwargs = json.loads(self.body.data.decode("utf-8"))
+            if not isinstance(kwargs, dict):
+                raise ValueError("The JSON body must be an object.")
+            return kwargs
+
+        arguments = {}
+        httputil.parse_body_arguments(self.request.headers.get("Content-Type", ""),
+                                      self.body.data, arguments, {}, self.request.headers)
+
+        return self._convert_kwargs_items(arguments.items())
+
     def _convert_kwargs_items(self, kwargs_items):
         """ Converts each item in @kwargs_items to a string per 
         "https://stackoverflow.com/a/10356004".
@@ -40,51 +158,96 @@ class ApiHandler(BaseHandler):
 
         return kwargs
 
-    def _translate_kwargs(self, kwargs):
-        """ Converts each value in @kwargs to the assumed type based on its value. For example,
-        the string "True" is converted to a boolean True.
+    def _pop_control_arg(self, kwargs, name):
+        """ Removes the server control argument @name (e.g. "wait") from @kwargs, unless
+        @self.funk declares an argument with the same name. In that case, the argument is left for
+        @self.funk and the control is ignored.
 
         Args:
-            - kwargs (dict): The key/value pairs to evaluate.
+            - kwargs (dict): The request's arguments.
+            - name (str): The name of the control argument.
 
         Returns:
-            dict: The return value.
+            str: The return value.
+            The argument's value, or None if it wasn't passed or belongs to @self.funk.
         """
 
-        self.logger.info(
-            "Interpreting parameter types in URL: {}".format(kwargs))
+        if name in self.arg_schema.names:
+            return None
 
-        # interprets the implied type for an object.
-        changed = []
+        return kwargs.pop(name, None)
 
-        def _safe_eval(obj):
-            try:
-                obj = ast.literal_eval(obj)
-                if obj.__class__.__name__ not in ["NoneType", "int", "float", "bool"]:
-                    obj = str(obj)
-                changed.append(obj)
-            except:
-                pass
+    def _client_key(self):
+        """ Returns the key by which queued tasks are shared fairly between clients: the
+        "X-Client-Key" header if it's given, otherwise the client's IP address.
 
-            return obj
+        Returns:
+            str: The return value.
+        """
 
-        # update values in @kwargs.
-        for kwarg in kwargs:
-            kwargs[kwarg] = _safe_eval(kwargs[kwarg])
+        return self.request.headers.get("X-Client-Key", self.request.remote_ip)
 
-        # report changes.
-        self.logger.info(
-            "Number of changes to URL parameters: {}".format(len(changed)))
-        if len(changed) != 0:
-            self.logger.debug("Updated paramaters dict to: {}".format(kwargs))
+    def _parse_priority(self, priority):
+        """ Converts the "priority" argument to an integer.
 
-        return kwargs
+        Args:
+            - priority (str): The argument's value, or None if it wasn't passed.
 
-    def _update_task(self, task_future):
+        Returns:
+            int: The return value.
+            The priority, or 0 if @priority is None.
+
+        Raises:
+            - ValueError: If @priority isn't an integer.
+        """
+
+        if priority is None:
+            return 0
+
+        try:
+            return int(priority)
+        except (TypeError, ValueError):
+            raise ValueError("The 'priority' argument must be an integer, not {!r}.".format(
+                priority))
+
+    def _parse_seconds(self, name, value, allow_zero=False):
+        """ Converts the @name argument, e.g. "wait" or "timeout", to a number of seconds.
+
+        Args:
+            - name (str): The argument's name.
+            - value (str): The argument's value, or None if it wasn't passed.
+            - allow_zero (bool): Use True to accept 0 seconds.
+
+        Returns:
+            float: The return value.
+            The number of seconds, or None if @value is None.
+
+        Raises:
+            - ValueError: If @value isn't a positive number, or a non-negative one if @allow_zero
+            is True.
+        """
+
+        if value is None:
+            return None
+
+        try:
+            seconds = float(value)
+        except (TypeError, ValueError):
+            seconds = float("nan")
+        if not (seconds > 0 or (allow_zero and seconds == 0)):
+            raise ValueError("The '{}' argument must be a {} number, not {!r}.".format(
+                name, "non-negative" if allow_zero else "positive", value))
+
+        return seconds
+
+    def _update_task(self, thread_name, cache_key, task_future):
         """ This is the callback function for a given task. It updates the task's entry in 
         @self.task_metadata upon the task's completion.
 
         Args:
+            - thread_name (str): The unique thread name for the task.
+            - cache_key (tuple): The key under which to cache the task's result in
+            @self.result_cache. Use None to skip caching.
             - task_future (concurrent.futures._base.Future): The task for which metadata is to be 
             updated.
 
@@ -92,31 +255,98 @@ class ApiHandler(BaseHandler):
             None
         """
 
-        # find the thread name for the given task.
-        thread_name = self.futures_metadata[task_future]
-        self.logger.debug(
-            "Updating task metadata for thread: {}".format(thread_name))
-
-        # update the task's metadata dict.
-        self.task_metadata[thread_name]["end_time"] = datetime.now(
-        ).isoformat()
-        self.task_metadata[thread_name]["running"] = task_future.running()
-        self.task_metadata[thread_name]["done"] = task_future.done()
+        # get the task's result or exception.
+        event = "finished"
         try:
-            self.task_metadata[thread_name]["result"] = task_future.result()
-            self.task_metadata[thread_name]["exception"] = task_future.exception()
+            result, exception = task_future.result(), task_future.exception()
+        except TaskCancelledError as err:
+            result, exception, event = None, err.__repr__(), err.reason
         except Exception as err:
-            self.task_metadata[thread_name]["result"] = None
-            self.task_metadata[thread_name]["exception"] = err.__repr__()
+            result, exception, event = None, err.__repr__(), "failed"
+        self.task_canceller.finish(thread_name)
+
+        # for generator functions, keep the last yielded items as the result and end the stream.
+        # note: the stream is removed on the IOLoop so that a client can still attach to it.
+        task_stream = self.task_streams.get(thread_name)
+        if task_stream is not None:
+            if exception is None:
+                result = list(task_stream.tail)
+            task_stream.close()
+            task_stream.io_loop.add_callback(
+                self.task_streams.pop, thread_name, None)
+
+        # if needed, write a large result to a file instead of keeping it in memory.
+        result_file = None
+        if self.result_files is not None and exception is None:
+            result_file = self.result_files.spill(thread_name, result)
+            if result_file is not None:
+                self.logger.info("Wrote result of {} bytes to: {}".format(
+                    result_file["size"], self.result_files.path(thread_name)))
+                result = None
+
+                # keep the file until the tasks that share this task's work have their own links.
+                if self.task_coalescer is not None:
+                    self.result_files.hold(thread_name)
+
+        # update the task's metadata unless the task was cancelled, which already did so.
+        done = self.task_metadata.set_done(task_future, result, exception, result_file)
+        if done is not None:
+            self.logger.debug(
+                "Updated task metadata for thread: {}".format(thread_name))
+            self.event_bus.publish(event, thread_name, done[1])
+
+            # cache successful results so that calls with the same arguments can reuse them.
+            if cache_key is not None and event == "finished" and result_file is None:
+                self.result_cache.put(cache_key, result)
+        elif result_file is not None:
+            self.result_files.remove(thread_name)
+
+        # finish any tasks that share this task's work.
+        # note: this runs on the IOLoop so that no new task can follow this one halfway through.
+        if self.task_coalescer is not None:
+            self.task_queue.io_loop.add_callback(
+                self._finish_followers, thread_name, result, exception, event, result_file)
+
+        # free the task's worker so that queued tasks can start, and delete its uploaded files now
+        # that its function has returned.
+        self.task_queue.release(thread_name)
+        self.task_queue.io_loop.add_callback(self.task_uploads.release, thread_name)
 
         return
 
-    def _wrap_task(self, thread_name, **kwargs):
+    def _finish_followers(self, thread_name, result, exception, event, result_file=None):
+        """ Marks the tasks that share the work of the task @thread_name as done with its @result
+        (or @result_file) and @exception and publishes @event for each. This runs on the IOLoop.
+
+        Each follower gets its own links to @result_file, so that they outlive the task
+        @thread_name; see placissimo.lib.result_files.ResultFiles.link().
+
+        Returns:
+            None
+        """
+
+        for follower in self.task_coalescer.finish(thread_name):
+            follower_file = result_file
+            if result_file is not None:
+                follower_file = self.result_files.link(thread_name, follower, result_file)
+            task_data = self.task_metadata.finish(follower, result, exception, follower_file)
+            if task_data is not None:
+                self.event_bus.publish(event, follower, task_data)
+
+        # let the result file be deleted, e.g. once the task is evicted.
+        if result_file is not None:
+            self.result_files.release(thread_name)
+
+        return
+
+    def _wrap_task(self, thread_name, cancel_token, **kwargs):
         """ This wraps @self.funk() so that its execution is contained within a given thread name.
         This forces its logs and all child logging to have the same thread name.
 
         Args:
             - thread_name (str): The unique thread name for a given task.
+            - cancel_token (threading.Event): The task's cancellation token. Generator functions
+            are closed at their next yield once it's set.
             - args/kwargs: The arguments to send to @self.funk().
 
         Returns:
@@ -127,9 +357,8 @@ class ApiHandler(BaseHandler):
         self.logger.debug(
             "Wrapping function as thread: {}".format(thread_name))
 
-        # without this, child logs of @self.funk() don't seem to appear.
-        # fix per "https://github.com/tornadoweb/tornado/issues/2183#issuecomment-371001254".
-        asyncio.set_event_loop(asyncio.new_event_loop())
+        # reuse the worker thread's event loop and, on its first task, run @self.worker_init().
+        init_worker(self.worker_init)
 
         # set the current thread name.
         # note: this allows for consistent incrementing of the thread suffix (_0, _1, etc.) VS
@@ -137,86 +366,430 @@ class ApiHandler(BaseHandler):
         # the latter approach will result in restart the numbering from time to time.
         threading.current_thread().name = thread_name
 
-        return self.funk(**kwargs)
+        # for generator functions, pass each yielded item to the task's stream.
+        result = self.funk(**kwargs)
+        if inspect.isgenerator(result):
+            task_stream = self.task_streams[thread_name]
+            for item in result:
+                if cancel_token.is_set():
+                    result.close()
+                    break
+                task_stream.put(item)
+            result = None
+
+        return result
+
+    def _submit_task(self, thread_name, kwargs, timeout=None, cache_key=None,
+                     log_level=logging.INFO):
+        """ Submits a task to @self.task_pool and marks it as running. This is called by
+        @self.task_queue once a worker is free. If the task can't be submitted, it's marked as
+        failed instead; see self._fail_task().
+
+        Args:
+            - thread_name (str): The unique thread name for a given task.
+            - kwargs (dict): The arguments to send to @self.funk().
+            - timeout (float): The number of seconds the task may run. If None,
+            @self.task_canceller's default is used.
+            - cache_key (tuple): The key under which to cache the task's result; see
+            self._update_task().
+            - log_level (int): The level at which to log the task's submission.
+
+        Returns:
+            None
+        """
+
+        self.logger.log(log_level, "Now running {} out of {} maximum tasks.".format(
+            self.task_queue.running, self.task_pool._max_workers))
+
+        # add the task to @self.task_pool.
+        # note: worker processes and coroutine pools already hold @self.funk and set their own
+        # thread name.
+        try:
+            if self.executor in ["process", "remote", "coroutine"]:
+                task_future = self.task_pool.submit(thread_name, **kwargs)
+            else:
+                task_future = self.task_pool.submit(self._wrap_task, thread_name,
+                                                    self.task_canceller.token(thread_name),
+                                                    **kwargs)
+        except Exception as err:
+            self._fail_task(thread_name, err)
+            return
+
+        # update @self.task_metadata.
+        self.task_uploads.start(thread_name)
+        task_data = self.task_metadata.set_running(thread_name, task_future)
+        self.event_bus.publish("started", thread_name, task_data)
+        self.task_canceller.start_deadline(thread_name, timeout)
+
+        # tasks that share this task's work start with it.
+        if self.task_coalescer is not None:
+            for follower in self.task_coalescer.followers(thread_name):
+                self.event_bus.publish("started", follower,
+                                       self.task_metadata.set_running(follower))
+
+        # add a callback to @task_future so that its metadata can be updated upon completion.
+        task_future.add_done_callback(
+            functools.partial(self._update_task, thread_name, cache_key))
+
+        return
+
+    def _fail_task(self, thread_name, err):
+        """ Marks the task @thread_name, which couldn't be submitted to @self.task_pool, as done
+        with @err, publishes "failed" for it and the tasks that share its work, and frees its
+        worker slot.
+
+        Args:
+            - thread_name (str): The unique thread name for the task.
+            - err (Exception): The error raised while submitting the task.
+
+        Returns:
+            None
+        """
+
+        self.logger.error("Can't start task '{}': {}".format(thread_name, err.__repr__()))
+        exception = err.__repr__()
+        self.task_canceller.finish(thread_name)
+        task_stream = self.task_streams.pop(thread_name, None)
+        if task_stream is not None:
+            task_stream.close()
+
+        task_data = self.task_metadata.finish(thread_name, None, exception)
+        if task_data is not None:
+            self.event_bus.publish("failed", thread_name, task_data)
+        if self.task_coalescer is not None:
+            self._finish_followers(thread_name, None, exception, "failed")
+
+        self.task_queue.release(thread_name)
 
-    def _start_task(self, **kwargs):
-        """ Starts a new task via @self._wrap_task() and updates @self.task_metadata with a new 
-        entry for the task.
+        return
+
+    def _start_task(self, kwargs, timeout=None, priority=0, log_level=logging.INFO):
+        """ Admits a new task to @self.task_queue and updates @self.task_metadata with a new entry
+        for the task. The task starts right away if a worker is free; otherwise it's queued under
+        @priority and the request's client key; see self._client_key().
 
         Args:
-            - kwargs (dict): The arguments to send to @self._wrap_task().
+            - kwargs (dict): The arguments to send to @self._wrap_task(), as returned by
+            @self.arg_schema.parse().
+            - timeout (float): The number of seconds the task may run once it starts. If None,
+            the server's default is used.
+            - priority (int): The task's priority. Queued tasks with a higher priority start first.
+            - log_level (int): The level at which to log the task's creation, e.g. logging.DEBUG
+            for the tasks of a batch.
 
         Returns:
             dict: The return value.
-            The metadata for the started task.
+            The metadata for the started task. If the result was found in @self.result_cache, the
+            task is already done. If an identical task is queued or running and
+            @self.task_coalescer is not None, the new task follows it instead of running.
 
         Raises:
-            - RuntimeError: If an attempt is made to start a new task and the maximum number of 
-            threads is already running.
+            - QueueFullError: If an attempt is made to start a new task while the maximum number of
+            threads is already running and the queue is full.
         """
 
-        self.logger.info("Adding task thread.")
-
-        # if the max number of threads is already running, raise an error.
-        running_threads = sum([1 for t in self.task_metadata
-                               if not self.task_metadata[t].get("done")])
-        if not running_threads < self.thread_pool._max_workers:
-            msg = "Can't add task; already running {} maximum threads.".format(
-                self.thread_pool._max_workers)
-            self.logger.error(msg)
-            raise RuntimeError(msg)
-        else:
-            self.logger.info("Now running {} out of {} maximum threads.".format(running_threads + 1,
-                                                                                self.thread_pool._max_workers))
-
-        # create a new task identifier.
-        task_id = len(self.task_metadata) + 1
-        task_id = str(task_id).zfill(3)
-
-        # create a new thread name and set the thread name.
-        thread_name = "{}{}".format(self.thread_prefix, task_id)
-        self.logger.info(
-            "Task is assigned to thread name: {}".format(thread_name))
+        self.logger.log(log_level, "Adding task thread.")
 
-        # create new metadata for the task.
-        caller = os.path.basename(self.funk.__code__.co_filename)
-        task_data = {"caller": "{}:{}".format(caller, self.funk.__name__),
-                     "start_time": datetime.now().isoformat(),
-                     "running": True,
-                     "done": False}
+        # create a new thread name.
+        thread_name = self.task_metadata.new_name()
+        self.logger.log(log_level,
+                        "Task is assigned to thread name: {}".format(thread_name))
 
-        # update values in @kwargs.
-        kwargs = self._translate_kwargs(kwargs)
+        caller = os.path.basename(self.funk.__code__.co_filename)
+        caller = "{}:{}".format(caller, self.funk.__name__)
+
+        # if possible, reuse a cached result instead of running a task.
+        # note: the key is created before any server arguments are added to @kwargs.
+        cache_key = None
+        if self.result_cache is not None:
+            cache_key = self.result_cache.key(kwargs)
+            hit, result = self.result_cache.get(cache_key)
+            if hit:
+                self.logger.log(log_level,
+                                "Using cached result for task: {}".format(thread_name))
+                task_data = self.task_metadata.add_cached(thread_name, caller, result)
+                self.event_bus.publish("finished", thread_name, task_data)
+                return {thread_name: task_data}
+
+        # if possible, share the work of a queued or running task with the same arguments.
+        if self.task_coalescer is not None:
+            leader = self.task_coalescer.join(
+                cache_key or ResultCache.key(kwargs), thread_name)
+            if leader is not None:
+                self.logger.log(log_level, "Task {} shares the work of task: {}".format(
+                    thread_name, leader))
+                task_data = self.task_metadata.add(thread_name, caller, leader)
+                self.event_bus.publish("queued", thread_name, task_data)
+                if self.task_metadata.get(leader, {}).get("state") == "running":
+                    task_data = self.task_metadata.set_running(thread_name)
+                    self.event_bus.publish("started", thread_name, task_data)
+                return {thread_name: task_data}
 
         # if needed, add @self.callback_arg to @kwargs.
         if self.callback_arg is not None:
-            if self.callback_arg in kwargs:
-                msg = "Callback argument '{}' already exists in parameters".format(
-                    self.callback_arg)
-                msg += "; it will be overwritten."
-                self.logger.warning(msg)
-            self.logger.info("Passing server arguments as '{}' to function.".format(
+            self.logger.log(log_level, "Passing server arguments as '{}' to function.".format(
                 self.callback_arg))
             kwargs[self.callback_arg] = self.server_locals
 
-        # add the task to @self.thread_pool.
-        task_future = self.thread_pool.submit(
-            self._wrap_task, thread_name, **kwargs)
+            # worker processes can only receive the picklable server arguments; see
+            # placissimo.server.serve().
+            if self.executor in ["process", "remote"]:
+                kwargs[self.callback_arg] = self.worker_locals
 
-        # add @task_future to @self.futures_metadata.
-        self.futures_metadata[task_future] = thread_name
+        # if needed, add a cancellation token as @self.cancel_arg to @kwargs.
+        # note: worker processes are stopped instead, so they don't receive a token.
+        if self.cancel_arg is not None and self.executor not in ["process", "remote"]:
+            kwargs[self.cancel_arg] = self.task_canceller.token(thread_name)
 
-        # update @self.task_metadata.
-        self.task_metadata[thread_name] = task_data
+        # create new metadata for the task.
+        task_data = self.task_metadata.add(thread_name, caller)
+        self.event_bus.publish("queued", thread_name, task_data)
 
-        # add a callback to @task_future so that its metadata can be updated upon completion.
-        task_future.add_done_callback(self._update_task)
+        # if needed, create a stream for the items yielded by the task.
+        if self.streamable:
+            self.task_streams[thread_name] = TaskStream(
+                ioloop.IOLoop.current(), self.result_tail)
+
+        # start the task or add it to @self.task_queue.
+        try:
+            started = self.task_queue.admit(
+                thread_name, functools.partial(self._submit_task, thread_name, kwargs, timeout,
+                                               cache_key, log_level),
+                priority, self._client_key())
+        except QueueFullError as err:
+            self.logger.error(err)
+            self.task_metadata.discard(thread_name)
+            self.task_streams.pop(thread_name, None)
+            self.task_canceller.finish(thread_name)
+            if self.task_coalescer is not None:
+                self.task_coalescer.finish(thread_name)
+            self.event_bus.publish("rejected", thread_name,
+                                   {"error": str(err), "retry_after": err.retry_after})
+            raise
+        if not started:
+            self.logger.log(log_level,
+                            "Queued task with priority {}; {} task(s) now waiting.".format(
+                                priority, self.task_queue.depth))
 
         # create a temporary metadata dict with @thread_name as the key.
         temp_md = {thread_name: task_data}
 
         return temp_md
 
+    def _send_queue_full(self, err):
+        """ Sends a 429 with a "Retry-After" header for a task that couldn't be admitted.
+
+        Args:
+            - err (QueueFullError): The error raised by @self.task_queue.
+
+        Returns:
+            None
+        """
+
+        self.logger.warning(
+            "Asking client to retry after {} second(s).".format(err.retry_after))
+        self.set_status(429)
+        self.set_header("Retry-After", err.retry_after)
+        self.respond({"error": str(err), "retry_after": err.retry_after})
+
+        return
+
+    def _send_invalid_arguments(self, err):
+        """ Sends a 400 with the reason the request's arguments don't match @self.funk or with
+        the reason a control argument, e.g. "wait", is invalid.
+
+        Args:
+            - err (ArgumentError|ValueError): The error raised by @self.arg_schema or by the
+            argument's parser.
+
+        Returns:
+            None
+        """
+
+        self.logger.warning("Invalid arguments: {}".format(err))
+        self.set_status(400)
+        self.respond({"error": str(err)})
+
+        return
+
+    def _wait_for_task(self, task_metadata, wait):
+        """ Holds the request open until the task in @task_metadata is done or until @wait seconds
+        have passed, whichever comes first. Then sends the task's metadata.
+
+        Args:
+            - task_metadata (dict): The metadata for the started task, keyed by its thread name.
+            - wait (float): The maximum number of seconds to wait.
+
+        Returns:
+            None
+        """
+
+        thread_name = next(iter(task_metadata))
+        io_loop = ioloop.IOLoop.current()
+        self.logger.info("Waiting up to {} second(s) for task: {}".format(
+            wait, thread_name))
+
+        # send the finished task's metadata, including its result, once @self.event_bus says
+        # it's done.
+        # note: events leave out the result, so it's read from @self.task_metadata.
+        def _on_event(item):
+            _, event, _, payload = item
+            if event not in ["finished", "failed", "cancelled", "timed_out"]:
+                return
+            self._stop_waiting()
+            self.respond(self.task_metadata.snapshot([thread_name])
+                         or {thread_name: json.loads(payload)["data"]})
+
+        # otherwise, send the task's current metadata.
+        def _on_timeout():
+            self.logger.info(
+                "Task {} isn't done; sending task identifier.".format(thread_name))
+            self._stop_waiting()
+            self.respond(self.task_metadata.snapshot([thread_name]) or task_metadata)
+
+        self.event_bus.watch(thread_name, _on_event)
+        timeout = io_loop.add_timeout(io_loop.time() + wait, _on_timeout)
+        self.waiting = (thread_name, _on_event, timeout)
+
+        return
+
+    def _stop_waiting(self):
+        """ Stops waiting for a task; see self._wait_for_task(). """
+
+        if self.waiting is None:
+            return
+
+        thread_name, on_event, timeout = self.waiting
+        self.event_bus.unwatch(thread_name, on_event)
+        ioloop.IOLoop.current().remove_timeout(timeout)
+        self.waiting = None
+
+        return
+
+    def _stream_task(self, task_metadata):
+        """ Writes each item yielded by the task in @task_metadata as a line of JSON until the task
+        is done.
+
+        Args:
+            - task_metadata (dict): The metadata for the started task, keyed by its thread name.
+
+        Returns:
+            None
+        """
+
+        thread_name = next(iter(task_metadata))
+        self.logger.info("Streaming items for task: {}".format(thread_name))
+
+        # send the response headers right away.
+        self.set_header("Content-Type", "application/x-ndjson")
+        self.set_header("X-Task-Name", thread_name)
+        self.flush()
+
+        def _write_chunk(chunk):
+            self.write(chunk)
+            return self.flush()
+
+        self.streaming = self.task_streams[thread_name]
+        self.streaming.attach(_write_chunk, self.finish)
+
+        return
+
+    def on_connection_close(self):
+        """ Stops waiting for or streaming a task if the client disconnects. Uploaded files that
+        weren't handed to a task are deleted. """
+
+        self._stop_waiting()
+        if self.streaming is not None:
+            self.streaming.detach()
+            self.streaming = None
+        if self.body is not None:
+            self.body.discard()
+
+        return
+
+    def on_finish(self):
+        """ Deletes uploaded files that weren't handed to a task, e.g. after a 400. """
+
+        if self.body is not None:
+            self.body.discard()
+
+        return
+
+    def _call(self):
+        """ Starts a task with the request's arguments and sends the task's metadata. If the
+        request has a "wait" argument, the metadata is sent once the task is done or once "wait"
+        seconds have passed. If the request has a "stream" argument and @self.funk is a generator
+        function, the yielded items are sent instead. If the request has a "timeout" argument, the
+        task is cancelled once it has run for "timeout" seconds. If the request has a "priority"
+        argument, the task is queued with that priority. If the other arguments don't match
+        @self.funk, a 400 is sent without starting a task.
+
+        Arguments may also be sent in the body of a POST request as form data, as a JSON object,
+        or as "multipart/form-data" with uploaded files; see self._body_kwargs().
+
+        Returns:
+            None
+        """
+
+        # get parameters.
+        kwargs = self._convert_kwargs_items(self.request.arguments.items())
+        try:
+            kwargs.update(self._body_kwargs())
+        except ValueError as err:
+            self._send_invalid_arguments(err)
+            return
+        wait = self._pop_control_arg(kwargs, "wait")
+        stream = self._pop_control_arg(kwargs, "stream")
+        timeout = self._pop_control_arg(kwargs, "timeout")
+        priority = self._pop_control_arg(kwargs, "priority")
+
+        # make sure @wait is a non-negative number, @timeout a positive one and @priority an
+        # integer.
+        try:
+            wait = self._parse_seconds("wait", wait, allow_zero=True)
+            timeout = self._parse_seconds("timeout", timeout)
+            priority = self._parse_priority(priority)
+        except ValueError as err:
+            self._send_invalid_arguments(err)
+            return
+
+        # check and convert the arguments for @self.funk.
+        try:
+            kwargs = self.arg_schema.parse(kwargs)
+        except ArgumentError as err:
+            self._send_invalid_arguments(err)
+            return
+
+        # start a task.
+        try:
+            task_metadata = self._start_task(kwargs, timeout, priority=priority)
+        except QueueFullError as err:
+            self._send_queue_full(err)
+            return
+
+        # hand the uploaded files to the task; they're deleted once it's done.
+        # note: a task with a cached result is already done, so its files are deleted along with
+        # the request body instead.
+        thread_name = next(iter(task_metadata))
+        if self.body is not None and not task_metadata[thread_name]["done"]:
+            self.task_uploads.add(thread_name, self.body.files)
+            self.body.files = []
+
+        # if requested, stream the items yielded by the task.
+        if str(stream) in ["1", "true", "True"] and self.streamable:
+            self._stream_task(task_metadata)
+            return
+
+        # if requested, wait for the task to finish unless it's already done.
+        if wait and not next(iter(task_metadata.values()))["done"]:
+            self._wait_for_task(task_metadata, wait)
+            return
+
+        # send the task metadata.
+        self.respond(task_metadata)
+
+        return
+
     @web.asynchronous
     def get(self):
         """ Implements GET requests. If @self.allow_get is False, sends a 403.
@@ -231,13 +804,8 @@ class ApiHandler(BaseHandler):
             self.send_error(403)
             return
 
-        # get parameters.
-        kwargs = self._convert_kwargs_items(self.request.arguments.items())
-
         # start a task and send the task metadata.
-        task_metadata = self._start_task(**kwargs)
-        self.write(task_metadata)
-        self.finish()
+        self._call()
 
         return
 
@@ -249,13 +817,9 @@ class ApiHandler(BaseHandler):
             None
         """
 
-        # get parameters.
-        kwargs = self._convert_kwargs_items(self.request.arguments.items())
-
         # start a task and send the task metadata.
-        task_metadata = self._start_task(**kwargs)
-        self.write(task_metadata)
-        self.finish()
+        if self._finish_body():
+            self._call()
 
         return
 
@@ -3,8 +3,9 @@
 """ This module contains a generic tornado.web.RequestHandler class. """
 
 # import modules.
+import functools
 import logging
-from tornado import web
+from tornado import ioloop, web
 
 
 class BaseHandler(web.RequestHandler):
@@ -28,6 +29,69 @@ class BaseHandler(web.RequestHandler):
         # allow CORS per: https://stackoverflow.com/a/40431557
         self.set_header("Access-Control-Allow-Origin", "*")
 
+    def respond(self, obj):
+        """ Sends @obj in the format negotiated with the request's "Accept" header and finishes the
+        request. Large responses are encoded in a helper thread; see
+        placissimo.lib.serializer.Serializer.
+
+        Args:
+            - obj (object): The value to send, e.g. a dict of task metadata.
+
+        Returns:
+            None
+        """
+
+        media_type = self.serializer.negotiate(self.request.headers.get("Accept"))
+        self.add_header("Vary", "Accept")
+
+        if not self.serializer.is_large(obj):
+            self._send_encoded(*self.serializer.encode(obj, media_type))
+            return
+
+        # compress the response in the helper thread, too; see
+        # placissimo.lib.compression.Compression.transform().
+        compress = None
+        encoding = self.compression.negotiate(
+            self.request.headers.get("Accept-Encoding")) if self.compression is not None else None
+        if encoding is not None:
+            self.set_header("Content-Encoding", encoding)
+            compress = functools.partial(self.compression.compress, encoding=encoding)
+
+        self.logger.info("Encoding large response in a helper thread.")
+        future = self.serializer.encode_async(obj, media_type, compress)
+        ioloop.IOLoop.current().add_future(future, self._send_encoded_future)
+
+        return
+
+    def _send_encoded(self, content_type, data):
+        """ Sends the encoded @data with the "Content-Type" header @content_type and finishes
+        the request. """
+
+        # note: the request may have been finished while @data was encoded, e.g. by a timeout.
+        if self._finished:
+            return
+
+        self.set_header("Content-Type", content_type)
+        self.write(data)
+        self.finish()
+
+        return
+
+    def _send_encoded_future(self, future):
+        """ Sends the result of @future from self.respond(), or a 500 if encoding failed. """
+
+        try:
+            content_type, data = future.result()
+        except Exception as err:
+            self.logger.error("Can't encode response: {}".format(err))
+            if not self._finished:
+                self.send_error(500)
+            return
+
+        self._send_encoded(content_type, data)
+
+        return
+
 
 if __name__ == "__main__":
     pass
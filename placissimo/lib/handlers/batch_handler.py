@@ -0,0 +1,174 @@
+#!/usr/bin/python3
+
+""" This module contains a class that starts many tasks from a single request and reports their
+combined progress. """
+
+# import modules.
+import json
+import logging
+from ..argument_error import ArgumentError
+from ..queue_full_error import QueueFullError
+from .api_handler import ApiHandler
+from tornado import web
+
+
+class BatchHandler(ApiHandler):
+    """ This class starts many tasks from a single request and reports their combined progress. """
+
+    def _read_items(self):
+        """ Reads the argument dicts in the request body, as received by self.data_received().
+        The body is either a JSON array or newline-delimited JSON with one object per line.
+
+        Returns:
+            list: The return value.
+
+        Raises:
+            - ValueError: If the body was written to disk (i.e. it's "multipart/form-data" or
+            "application/octet-stream"), can't be parsed, has no items, or an item isn't a JSON
+            object.
+        """
+
+        # note: only bodies that are kept in memory can hold a batch.
+        if self.body is None or self.body.data is None:
+            raise ValueError("The batch must be sent as JSON, not as '{}'.".format(
+                self.body.content_type if self.body is not None else None))
+
+        body = self.body.data.decode("utf-8").strip()
+        if body.startswith("["):
+            items = json.loads(body)
+        else:
+            items = [json.loads(line) for line in body.splitlines() if line.strip()]
+
+        for item in items:
+            if not isinstance(item, dict):
+                raise ValueError("Each item must be a JSON object, not: {}".format(item))
+        if not items:
+            raise ValueError("The batch has no items.")
+
+        return items
+
+    def _start_batch(self, get_argument):
+        """ Starts a task for each argument dict in the request body, in order, until the queue is
+        full. Then sends the batch identifier and the thread names of the started tasks.
+
+        Args:
+            - get_argument (function): The function with which to read request arguments, i.e.
+            @self.get_query_argument or @self.get_argument.
+
+        Returns:
+            None
+        """
+
+        # get the items and the timeout and priority for each task.
+        try:
+            items = self._read_items()
+            timeout = self._parse_seconds("timeout", get_argument("timeout", default=None))
+            priority = self._parse_priority(get_argument("priority", default=None))
+        except ValueError as err:
+            self._send_invalid_arguments(err)
+            return
+
+        # check and convert the arguments of all items before any task is started.
+        try:
+            items = [self.arg_schema.parse(kwargs) for kwargs in items]
+        except ArgumentError as err:
+            self._send_invalid_arguments(err)
+            return
+
+        # start the tasks.
+        # note: each task is only logged at the DEBUG level; the batch is summarized below.
+        self.logger.debug("Starting batch of {} task(s).".format(len(items)))
+        names, rejected, queue_full = [], 0, None
+        for position, kwargs in enumerate(items):
+            try:
+                task_metadata = self._start_task(kwargs, timeout, priority=priority,
+                                                 log_level=logging.DEBUG)
+            except QueueFullError as err:
+                rejected, queue_full = len(items) - position, err
+                break
+            names.append(next(iter(task_metadata)))
+
+        # if no task could be admitted, ask the client to retry.
+        if queue_full is not None and not names:
+            self._send_queue_full(queue_full)
+            return
+
+        # send the batch identifier.
+        batch_id = self.task_batches.add(names, rejected)
+        self.logger.info("Started batch {} with {} task(s); {} item(s) rejected.".format(
+            batch_id, len(names), rejected))
+        response = {"batch": batch_id, "tasks": names, "rejected": rejected}
+        if queue_full is not None:
+            self.set_header("Retry-After", queue_full.retry_after)
+            response["retry_after"] = queue_full.retry_after
+        self.respond(response)
+
+        return
+
+    def _send_status(self, batch_id):
+        """ Sends the progress of the batch @batch_id, or a 404 if it doesn't exist.
+
+        Returns:
+            None
+        """
+
+        status = self.task_batches.status(batch_id)
+        if status is None:
+            self.logger.warning("Batch identifier doesn't exist.")
+            self.send_error(404)
+            return
+
+        self.respond({batch_id: status})
+
+        return
+
+    @web.asynchronous
+    def get(self):
+        """ Implements GET requests, which return the progress of the batch given by the "id"
+        argument. If @self.allow_get is False, sends a 403.
+
+        Returns:
+            None
+        """
+
+        # if GET access is restricted, return an error.
+        if not self.allow_get:
+            self.logger.warning("GET requests are forbidden.")
+            self.send_error(403)
+            return
+
+        # send the batch's progress.
+        batch_id = self.get_query_argument("id", default=None)
+        if batch_id is None:
+            self.logger.warning("No batch identifier given.")
+            self.send_error(400)
+            return
+        self._send_status(batch_id)
+
+        return
+
+    @web.asynchronous
+    def post(self):
+        """ Implements POST requests. If the "id" argument is given, the batch's progress is sent.
+        Otherwise, a batch is started from the request body.
+
+        Returns:
+            None
+        """
+
+        if not self._finish_body():
+            return
+
+        batch_id = self.get_query_argument("id", default=None)
+        if batch_id is not None:
+            self._send_status(batch_id)
+            return
+
+        # start a batch of tasks.
+        self._start_batch(self.get_query_argument)
+
+        return
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,100 @@
+#!/usr/bin/python3
+
+""" This module contains a class that provides a RESTful API to cancel tasks. """
+
+# import modules.
+from .base_handler import BaseHandler
+from tornado import web
+
+
+class CancelHandler(BaseHandler):
+    """ This class provides a RESTful API to cancel tasks. """
+
+    def initialize(self, **server_locals):
+
+        super().initialize(__name__, **server_locals)
+
+    def _cancel_task(self, get_argument):
+        """ Cancels the task named by the request's "name" argument.
+
+        Args:
+            - get_argument (function): The function with which to read request arguments, i.e.
+            @self.get_query_argument or @self.get_argument.
+
+        Returns:
+            dict: The return value.
+            The metadata for the cancelled task, keyed by its thread name. If the "name" argument is
+            missing, 400 is returned. If the task doesn't exist, 404 is returned. If the task is
+            already done, 409 is returned. If the task runs in another worker process, that process
+            is asked to cancel it and the response's status is 202.
+        """
+
+        # get the task's thread name.
+        thread_name = get_argument("name", default=None)
+        if thread_name is None:
+            self.logger.warning("No task identifier given.")
+            return 400
+        if thread_name not in self.task_metadata:
+            self.logger.warning("Task identifier doesn't exist.")
+            return 404
+
+        # cancel the task.
+        self.logger.info("Cancelling task: {}".format(thread_name))
+        task_data = self.task_canceller.cancel(thread_name)
+
+        # if the task runs in another worker process, ask that process to cancel it.
+        if task_data is None and self.task_metadata.shared is not None:
+            task_data = self.task_metadata.request_cancel(thread_name)
+            if task_data is not None:
+                self.logger.info("Asked another process to cancel task: {}".format(thread_name))
+                self.set_status(202)
+
+        if task_data is None:
+            self.logger.warning("Task is already done.")
+            return 409
+
+        return {thread_name: task_data}
+
+    @web.asynchronous
+    def get(self):
+        """ Implements GET requests. If @self.allow_get is False, sends a 403.
+
+        Returns:
+            None
+        """
+
+        # if GET access is restricted, return an error.
+        if not self.allow_get:
+            self.logger.warning("GET requests are forbidden.")
+            self.send_error(403)
+            return
+
+        # cancel the task and send its metadata.
+        task_metadata = self._cancel_task(self.get_query_argument)
+        if isinstance(task_metadata, int):
+            self.send_error(task_metadata)
+            return
+        self.respond(task_metadata)
+
+        return
+
+    @web.asynchronous
+    def post(self):
+        """ Implements POST requests.
+
+        Returns:
+            None
+        """
+
+        # cancel the task and send its metadata.
+        task_metadata = self._cancel_task(self.get_argument)
+        if isinstance(task_metadata, int):
+            self.send_error(task_metadata)
+            return
+        self.respond(task_metadata)
+
+        return
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,190 @@
+#!/usr/bin/python3
+
+""" This module contains a class that streams task lifecycle events as Server-Sent Events. """
+
+# import modules.
+import functools
+import json
+from .base_handler import BaseHandler
+from tornado import iostream, web
+
+# the number of bytes that may wait to be sent to a client before its stream is closed.
+MAX_PENDING_BYTES = 1024 * 1024
+
+
+class EventsHandler(BaseHandler):
+    """ This class streams task lifecycle events as Server-Sent Events. """
+
+    def initialize(self, **server_locals):
+
+        super().initialize(__name__, **server_locals)
+
+        # set stream attributes.
+        self.names = None
+        self.last_event_id = 0
+        self.pending_bytes = 0
+        self.closed = False
+
+    def _open_stream(self, get_argument):
+        """ Subscribes to @self.event_bus and sends any kept events the client missed.
+
+        Args:
+            - get_argument (function): The function with which to read request arguments, i.e.
+            @self.get_query_argument or @self.get_argument.
+
+        Returns:
+            None
+        """
+
+        # get the task names to which to limit events.
+        names = get_argument("name", default=None)
+        if names is not None:
+            self.names = set(name.strip() for name in names.split(","))
+
+        # get the id of the last event the client received, if it's resuming.
+        last_event_id = self.request.headers.get(
+            "Last-Event-ID", get_argument("last_event_id", default=None))
+        try:
+            last_event_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            self.logger.warning(
+                "Invalid last event id: {}".format(last_event_id))
+            self.send_error(400)
+            return
+
+        # open the stream.
+        self.logger.info("Opening event stream for tasks: {}".format(
+            "all" if self.names is None else sorted(self.names)))
+        self.set_header("Content-Type", "text/event-stream")
+        self.set_header("Cache-Control", "no-cache")
+        self.last_event_id = last_event_id or 0
+        missed = self.event_bus.subscribe(self._send_event, last_event_id)
+
+        # if the client missed events that are no longer kept, tell it to reload the tasks.
+        if missed is None:
+            self.logger.warning(
+                "Events after id {} are no longer kept; sending reset.".format(last_event_id))
+            self.last_event_id = 0
+            self._write_chunk("event: reset\ndata: {}\n\n".format(
+                json.dumps({"name": None, "data": {"last_event_id": last_event_id}})))
+            missed = []
+        if missed:
+            self.logger.info("Resending {} event(s).".format(len(missed)))
+        for item in missed:
+            self._send_event(item)
+        self.flush()
+
+        return
+
+    def _on_flushed(self, size, future):
+        """ Counts @size bytes as sent once the flush @future is done. """
+
+        self.pending_bytes -= size
+
+        return
+
+    def _write_chunk(self, chunk):
+        """ Writes and flushes @chunk unless the client is too slow to keep up, in which case the
+        stream is closed instead. The client can then reconnect and resume; see
+        self._open_stream().
+
+        Args:
+            - chunk (str): The text to write.
+
+        Returns:
+            None
+        """
+
+        if self.pending_bytes > MAX_PENDING_BYTES:
+            self.logger.warning("Closing event stream for a slow client; {} bytes pending.".format(
+                self.pending_bytes))
+            self.on_connection_close()
+            self.request.connection.close()
+            return
+
+        self.write(chunk)
+        self.pending_bytes += len(chunk)
+        try:
+            self.flush().add_done_callback(
+                functools.partial(self._on_flushed, len(chunk)))
+        except iostream.StreamClosedError:
+            self.on_connection_close()
+
+        return
+
+    def _send_event(self, item):
+        """ Writes the event @item to the stream. This is called by @self.event_bus.
+
+        Args:
+            - item (tuple): The event id, event type, thread name, and JSON payload. If None, a
+            comment is written to keep the connection open.
+
+        Returns:
+            None
+        """
+
+        if self.closed:
+            return
+
+        # write a heartbeat.
+        if item is None:
+            self._write_chunk(": heartbeat\n\n")
+            return
+
+        # otherwise, write the event unless it was already sent or is filtered out.
+        event_id, event, thread_name, payload = item
+        if event_id <= self.last_event_id:
+            return
+        self.last_event_id = event_id
+        if self.names is not None and thread_name not in self.names:
+            return
+        self._write_chunk("id: {}\nevent: {}\ndata: {}\n\n".format(
+            event_id, event, payload))
+
+        return
+
+    def on_connection_close(self):
+        """ Unsubscribes from @self.event_bus once the client disconnects. """
+
+        if not self.closed:
+            self.logger.info("Closing event stream.")
+            self.closed = True
+            self.event_bus.unsubscribe(self._send_event)
+
+        return
+
+    @web.asynchronous
+    def get(self):
+        """ Implements GET requests. If @self.allow_get is False, sends a 403.
+
+        Returns:
+            None
+        """
+
+        # if GET access is restricted, return an error.
+        if not self.allow_get:
+            self.logger.warning("GET requests are forbidden.")
+            self.send_error(403)
+            return
+
+        # stream events until the client disconnects.
+        self._open_stream(self.get_query_argument)
+
+        return
+
+    @web.asynchronous
+    def post(self):
+        """ Implements POST requests.
+
+        Returns:
+            None
+        """
+
+        # stream events until the client disconnects.
+        self._open_stream(self.get_argument)
+
+        return
+
+
+if __name__ == "__main__":
+    pass
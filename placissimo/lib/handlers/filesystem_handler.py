@@ -139,8 +139,7 @@ class FilesystemHandler(BaseHandler):
         if isinstance(contents, int):
             self.send_error(contents)
             return
-        self.write(contents)
-        self.finish()
+        self.respond(contents)
 
         return
 
@@ -161,8 +160,7 @@ class FilesystemHandler(BaseHandler):
         if isinstance(contents, int):
             self.send_error(contents)
             return
-        self.write(contents)
-        self.finish()
+        self.respond(contents)
 
         return
 
@@ -0,0 +1,163 @@
+#!/usr/bin/python3
+
+""" This module contains a class that serves task results that were written to files. """
+
+# import modules.
+import os
+from .base_handler import BaseHandler
+from tornado import gen, web
+
+
+class ResultHandler(BaseHandler, web.StaticFileHandler):
+    """ This class serves task results that were written to files by
+    placissimo.lib.result_files.ResultFiles. Whole files are sent in chunks and support HTTP
+    "Range" requests and ETags; ranges of list items can be read with the "start" and "limit"
+    arguments. """
+
+    def initialize(self, **server_locals):
+
+        BaseHandler.initialize(self, __name__, **server_locals)
+
+        # set the attributes used by tornado.web.StaticFileHandler.
+        self.root = self.result_files.directory if self.result_files is not None else None
+        self.default_filename = None
+
+    def compute_etag(self):
+        """ Returns an ETag built from the result file's size and modification time. Unlike the
+        default, this doesn't require reading the whole file. Ranges of list items use the
+        default ETag instead.
+
+        Returns:
+            str: The return value.
+        """
+
+        if getattr(self, "absolute_path", None) is None:
+            return web.RequestHandler.compute_etag(self)
+
+        stat = os.stat(self.absolute_path)
+
+        return '"{}-{}"'.format(stat.st_size, stat.st_mtime_ns)
+
+    def _send_items(self, name, get_argument):
+        """ Sends a range of items from the list result of the task @name per the "start" and
+        "limit" arguments. The total number of items is sent in the "X-Total-Count" header.
+
+        Args:
+            - name (str): The unique thread name for the task.
+            - get_argument (function): The function with which to read request arguments.
+
+        Returns:
+            None
+        """
+
+        try:
+            start = int(get_argument("start", default=0))
+            limit = get_argument("limit", default=None)
+            limit = int(limit) if limit is not None else None
+            if start < 0 or (limit is not None and limit < 0):
+                raise ValueError("The start and limit values must not be negative.")
+        except ValueError as err:
+            self.logger.warning("Invalid result query: {}".format(err))
+            raise web.HTTPError(400)
+
+        items = self.result_files.read_items(name, start, limit)
+        if items is None:
+            self.logger.warning("Result of task {} isn't a list.".format(name))
+            raise web.HTTPError(400)
+
+        data, total = items
+        self.set_header("Content-Type", "application/json; charset=UTF-8")
+        self.set_header("X-Total-Count", total)
+        self.write(data)
+
+        return
+
+    @gen.coroutine
+    def _send_result(self, get_argument, include_body=True):
+        """ Sends the result file of the task given by the "name" argument, or the range of its
+        items given by the "start" and "limit" arguments. Sends a 404 if the task doesn't exist or
+        its result wasn't written to a file.
+
+        Args:
+            - get_argument (function): The function with which to read request arguments, i.e.
+            @self.get_query_argument or @self.get_argument.
+            - include_body (bool): Use False to only send the headers, e.g. for HEAD requests.
+
+        Returns:
+            None
+        """
+
+        # get the task's thread name.
+        name = get_argument("name", default=None)
+        if name is None:
+            self.logger.warning("No task identifier given.")
+            raise web.HTTPError(400)
+
+        # make sure the task's result was written to a file.
+        task_data = self.task_metadata.get(name) if self.result_files is not None else None
+        if task_data is None or task_data.get("result_file") is None:
+            self.logger.warning("Task {} has no result file.".format(name))
+            raise web.HTTPError(404)
+
+        # send a range of items or the whole file.
+        if get_argument("start", default=None) is not None or get_argument(
+                "limit", default=None) is not None:
+            self._send_items(name, get_argument)
+            return
+
+        self.logger.info("Sending result file for task: {}".format(name))
+        yield web.StaticFileHandler.get(self, os.path.basename(self.result_files.path(name)),
+                                        include_body)
+
+        return
+
+    @gen.coroutine
+    def get(self):
+        """ Implements GET requests. If @self.allow_get is False, sends a 403.
+
+        Returns:
+            None
+        """
+
+        # if GET access is restricted, return an error.
+        if not self.allow_get:
+            self.logger.warning("GET requests are forbidden.")
+            self.send_error(403)
+            return
+
+        yield self._send_result(self.get_query_argument)
+
+        return
+
+    @gen.coroutine
+    def head(self):
+        """ Implements HEAD requests, which send the same headers as GET requests. If
+        @self.allow_get is False, sends a 403.
+
+        Returns:
+            None
+        """
+
+        if not self.allow_get:
+            self.send_error(403)
+            return
+
+        yield self._send_result(self.get_query_argument, include_body=False)
+
+        return
+
+    @gen.coroutine
+    def post(self):
+        """ Implements POST requests.
+
+        Returns:
+            None
+        """
+
+        yield self._send_result(self.get_argument)
+
+        return
+
+
+if __name__ == "__main__":
+    pass
@@ -22,13 +22,28 @@ class StateHandler(BaseHandler):
             dict: The return value.
         """
 
-        # create dict for application state.
+        # create dict for application state; with several worker processes, the task counts cover
+        # all of them while the queue, cache, and connections are this process's own.
         self.logger.info("Checking application state.")
-        running_threads = sum([1 for t in self.task_metadata
-                               if not self.task_metadata[t].get("done")])
+        task_counts = self.task_metadata.counts()
+        running_threads = task_counts["running"]
         state = {"endpoints": self.get_endpoint_paths(),
                  "running_threads": running_threads,
-                 "available_threads": self.thread_pool._max_workers - running_threads,
+                 "available_threads": self.task_pool._max_workers * self.processes
+                 - running_threads,
+                 "queued_tasks": task_counts["queued"],
+                 "done_tasks": task_counts["done"],
+                 "evicted_tasks": self.task_metadata.eviction_counts(),
+                 "queued_by_client": self.task_queue.client_depths(),
+                 "max_queue": self.task_queue.max_queue,
+                 "executor": self.executor,
+                 "processes": self.processes,
+                 "remote_workers": self.task_pool.worker_names()
+                 if self.executor == "remote" else None,
+                 "cache": self.result_cache.stats()
+                 if self.result_cache is not None else None,
+                 "coalesced_tasks": self.task_coalescer.coalesced
+                 if self.task_coalescer is not None else None,
                  "websocket_connections": len(self.websocket_connections)
                  if self.allow_websocket else None}
 
@@ -49,8 +64,7 @@ class StateHandler(BaseHandler):
             return
 
         # send application state.
-        self.write(self._get_state())
-        self.finish()
+        self.respond(self._get_state())
 
         return
 
@@ -63,8 +77,7 @@ class StateHandler(BaseHandler):
         """
 
         # send application state.
-        self.write(self._get_state())
-        self.finish()
+        self.respond(self._get_state())
 
         return
 
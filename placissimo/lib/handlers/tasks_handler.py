@@ -1,16 +1,39 @@
 #!/usr/bin/python3
 
-""" This module contains a class that provides a RESTful API to task metadata. 
-
-Todo:
-    * Consolidate redundant logic in GET/POST.
-    * Add start/limit params.
-"""
+""" This module contains a class that provides a RESTful API to task metadata. """
 
 # import modules.
+import hashlib
 from .base_handler import BaseHandler
+from datetime import datetime
 from tornado import web
 
+# the accepted formats for the "since" and "until" arguments.
+ISO_FORMATS = ["%Y-%m-%dT%H:%M:%S.%f", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%dT%H:%M", "%Y-%m-%d"]
+
+
+def _parse_iso(timestamp):
+    """ Converts an ISO @timestamp to the format used for task start times so that the two can be
+    compared as strings.
+
+    Args:
+        - timestamp (str): The timestamp to convert, e.g. "2019-02-14" or "2019-02-14T10:00:30".
+
+    Returns:
+        str: The return value.
+
+    Raises:
+        - ValueError: If @timestamp doesn't match any format in @ISO_FORMATS.
+    """
+
+    for iso_format in ISO_FORMATS:
+        try:
+            return datetime.strptime(timestamp, iso_format).isoformat()
+        except ValueError:
+            continue
+
+    raise ValueError("Can't parse timestamp: {}".format(timestamp))
+
 
 class TasksHandler(BaseHandler):
     """ This class provides a RESTful API to task metadata. """
@@ -19,6 +42,95 @@ class TasksHandler(BaseHandler):
 
         super().initialize(__name__, **server_locals)
 
+    def compute_etag(self):
+        """ Returns an ETag for GET requests built from the task registry's revision, the query
+        arguments, and the "Accept" header. Unlike the default, this doesn't require the response
+        body, so unchanged polls are answered with a 304 before any tasks are read.
+
+        Returns:
+            str: The return value.
+        """
+
+        query = sorted(self.request.query_arguments.items())
+        accept = self.request.headers.get("Accept")
+        key = "{}:{}:{}".format(self._revision, query, accept).encode()
+
+        return '"{}"'.format(hashlib.sha1(key).hexdigest())
+
+    def _get_tasks(self, get_argument):
+        """ Gets task metadata per the request's arguments.
+
+        Args:
+            - get_argument (function): The function with which to read request arguments, i.e.
+            @self.get_query_argument or @self.get_argument.
+
+        Returns:
+            dict: The return value.
+            The metadata for the requested tasks. If an argument is invalid, 400 is returned. If
+            @since_rev is too old to be answered, 410 is returned.
+        """
+
+        # send the revision as of which tasks are returned, so clients can ask for later changes.
+        self.set_header("X-Revision", self.task_metadata.revision)
+
+        # get the task's thread name.
+        thread_name = get_argument("name", default=None)
+
+        # get the metadata keys to include.
+        fields = get_argument("fields", default=None)
+        if fields is not None:
+            fields = [field.strip() for field in fields.split(",") if field.strip()]
+
+        # extract the appropriate metadata from @self.task_metadata.
+        if thread_name is not None:
+            tasks = self.task_metadata.snapshot([thread_name], fields)
+            if not tasks:
+                self.logger.warning("Task identifier doesn't exist.")
+            return tasks
+
+        # if requested, only return tasks that changed after a given revision.
+        since_rev = get_argument("since_rev", default=None)
+        if since_rev is not None:
+            try:
+                since_rev = int(since_rev)
+            except ValueError as err:
+                self.logger.warning("Invalid task query: {}".format(err))
+                return 400
+            revision, tasks = self.task_metadata.changes(since_rev, fields)
+            self.set_header("X-Revision", revision)
+            if tasks is None:
+                self.logger.warning(
+                    "Changes after revision {} are no longer known.".format(since_rev))
+                return 410
+            return tasks
+
+        # get the filters and page to return.
+        try:
+            start = int(get_argument("start", default=0))
+            limit = get_argument("limit", default=None)
+            limit = int(limit) if limit is not None else None
+            if start < 0 or (limit is not None and limit < 0):
+                raise ValueError("The start and limit values must not be negative.")
+            state = get_argument("state", default=None)
+            if state is not None and state not in self.task_metadata.filters:
+                raise ValueError("The state value must be one of: {}".format(
+                    self.task_metadata.filters))
+            since, until = [get_argument(arg, default=None) for arg in ["since", "until"]]
+            since, until = [_parse_iso(t) if t is not None else None
+                            for t in [since, until]]
+        except ValueError as err:
+            self.logger.warning("Invalid task query: {}".format(err))
+            return 400
+
+        self.logger.info(
+            "Querying tasks with state={}, since={}, until={}, start={}, limit={}.".format(
+                state, since, until, start, limit))
+        total, tasks = self.task_metadata.query(
+            state, since, until, start, limit, fields)
+        self.set_header("X-Total-Count", total)
+
+        return tasks
+
     @web.asynchronous
     def get(self):
         """ Implements GET requests. If @self.allow_get is False, sends a 403.
@@ -33,21 +145,20 @@ class TasksHandler(BaseHandler):
             self.send_error(403)
             return
 
-        # get the task's thread name.
-        thread_name = self.get_query_argument("name", default=None)
-
-        # extract the appropriate metadata from @self.task_metadata.
-        if thread_name is None:
-            tasks = self.task_metadata
-        elif thread_name in self.task_metadata:
-            tasks = {thread_name: self.task_metadata[thread_name]}
-        else:
-            self.logger.warning("Task identifier doesn't exist.")
-            tasks = {}
+        # answer unchanged polls with a 304.
+        self._revision = self.task_metadata.revision
+        self.set_etag_header()
+        if self.check_etag_header():
+            self.set_status(304)
+            self.finish()
+            return
 
         # send metadata.
-        self.write(tasks)
-        self.finish()
+        tasks = self._get_tasks(self.get_query_argument)
+        if isinstance(tasks, int):
+            self.send_error(tasks)
+            return
+        self.respond(tasks)
 
         return
 
@@ -59,21 +170,12 @@ class TasksHandler(BaseHandler):
             None
         """
 
-        # get the task's thread name.
-        thread_name = self.get_argument("name", default=None)
-
-        # extract the appropriate metadata from @self.task_metadata.
-        if thread_name is None:
-            tasks = self.task_metadata
-        elif thread_name in self.task_metadata:
-            tasks = {thread_name: self.task_metadata[thread_name]}
-        else:
-            self.logger.warning("Task identifier doesn't exist.")
-            tasks = {}
-
         # send metadata.
-        self.write(tasks)
-        self.finish()
+        tasks = self._get_tasks(self.get_argument)
+        if isinstance(tasks, int):
+            self.send_error(tasks)
+            return
+        self.respond(tasks)
 
         return
 
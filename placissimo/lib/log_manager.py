@@ -1,6 +1,7 @@
 #!/usr/bin/python3
 
-""" This module contains functions to update stream and websocket handling for the root logger. """
+""" This module contains functions to update stream, websocket, and event handling for the root
+logger. """
 
 # import modules.
 import json
@@ -92,6 +93,47 @@ class _WebsocketHandler(logging.StreamHandler):
         return
 
 
+class _EventsHandler(logging.Handler):
+    """ This class creates a logging handler that publishes task progress reports to the
+    "/events" endpoint. It only handles records created by
+    placissimo.lib.event_bus.report_progress() inside a task.
+
+    WARNING: Do not attempt any logging statements inside this class; use print() if needed.
+    """
+
+    def __init__(self, event_bus, thread_prefix):
+        """ Initializes the base Handler class with additional attributes.
+
+        Args:
+            - event_bus (placissimo.lib.event_bus.EventBus): The bus to which to publish events.
+            - thread_prefix (str): The prefix for each task's thread name.
+        """
+
+        super().__init__()
+        self.event_bus = event_bus
+        self.thread_prefix = thread_prefix
+
+    def emit(self, record):
+        """ Publishes a "progress" event for the logging @record. """
+
+        # ignore records that aren't progress reports from a task.
+        if not hasattr(record, "taskProgress"):
+            return
+        if not record.threadName.startswith(self.thread_prefix):
+            return
+
+        try:
+            self.event_bus.publish("progress", record.threadName,
+                                   {"progress": record.taskProgress,
+                                    "message": record.getMessage()})
+        except Exception as err:
+            msg = "\n*** Can't publish progress for task '{}' due to error: {}\n\n".format(
+                record.threadName, err.__repr__())
+            print(msg, flush=True)
+
+        return
+
+
 def handle_streams():
     """ Removes any existing stream handlers for the root logger and adds a new, root stream 
     handler. 
@@ -178,5 +220,23 @@ def handle_sockets(websocket_connections, allow_broadcasts, socket_filters):
     return
 
 
+def handle_events(event_bus, thread_prefix):
+    """ Adds a logging handler to the root logger that publishes task progress reports to
+    @event_bus.
+
+    Args:
+        - event_bus (placissimo.lib.event_bus.EventBus): The bus to which to publish events.
+        - thread_prefix (str): The prefix for each task's thread name.
+
+    Returns:
+        None
+    """
+
+    logging.info("Adding logging handler for task progress events.")
+    logging.root.addHandler(_EventsHandler(event_bus, thread_prefix))
+
+    return
+
+
 if __name__ == "__main__":
     pass
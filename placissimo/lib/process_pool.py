@@ -0,0 +1,630 @@
+#!/usr/bin/python3
+
+""" This module contains a class that runs the function called by placissimo.call() in a pool of
+pre-forked worker processes.
+
+Each worker process receives the function once, at startup, and then runs tasks sent to it over a
+pipe. Logging records emitted inside a worker are sent back to the server process so that they
+still reach the console and any websocket clients. Results that are larger than a given threshold
+are returned through shared memory instead of being pushed through the pipe. Items yielded by
+generator functions are sent back one at a time and the worker waits for acknowledgements so that
+only a small window of items is ever in flight.
+
+Note:
+    * Shared memory requires Python 3.8+; older versions always send results through the pipe.
+"""
+
+# import modules.
+import functools
+import inspect
+import itertools
+import logging
+import multiprocessing
+import os
+import pickle
+import signal
+import threading
+from .task_stream import STREAM_WINDOW
+from .worker_local import close_loops, init_worker
+from collections import deque
+from concurrent.futures import Executor, Future
+from multiprocessing import connection
+
+try:
+    from multiprocessing import resource_tracker, shared_memory
+except ImportError:
+    resource_tracker, shared_memory = None, None
+
+# results with a pickled size at or above this many bytes are returned through shared memory.
+SHARED_MEMORY_THRESHOLD = 1024 * 1024
+
+
+class _PipeHandler(logging.Handler):
+    """ This class creates a logging handler for worker processes. It sends each logging record's
+    __dict__ attribute back to the server process.
+
+    WARNING: Do not attempt any logging statements inside this class; use print() if needed.
+    """
+
+    def __init__(self, conn, lock):
+        """ Initializes the base Handler class with additional attributes.
+
+        Args:
+            - conn (multiprocessing.connection.Connection): The worker's end of the pipe.
+            - lock (threading.Lock): The lock that guards writes to @conn.
+        """
+
+        super().__init__()
+        self.conn = conn
+        self.conn_lock = lock
+
+    def emit(self, record):
+        """ Sends the logging @record to the server process. """
+
+        try:
+            # merge @record.args into the message and flatten any traceback so that the record
+            # can be pickled.
+            record_dict = dict(record.__dict__)
+            record_dict["msg"], record_dict["args"] = record.getMessage(), None
+            if record.exc_info:
+                record_dict["exc_text"] = logging.Formatter().formatException(
+                    record.exc_info)
+            record_dict["exc_info"] = None
+
+            with self.conn_lock:
+                self.conn.send(("log", record_dict))
+        except Exception:
+            self.handleError(record)
+
+        return
+
+
+def _pack_result(result, shm_threshold):
+    """ Converts @result to a picklable payload, using shared memory if @result is large.
+
+    Args:
+        - result (object): The return value of the user function.
+        - shm_threshold (int): The pickled size in bytes at or above which shared memory is used.
+        Use None to never use shared memory.
+
+    Returns:
+        tuple: The return value.
+        Either ("pickle", bytes, buffers) or ("shm", name, sizes).
+    """
+
+    if shared_memory is None or shm_threshold is None:
+        return ("pickle", pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL), [])
+
+    # note: objects that support pickle protocol 5's out-of-band buffers (e.g. NumPy arrays) are
+    # kept out of the pickled data, so they're copied only once: straight into shared memory.
+    buffers = []
+    data = pickle.dumps(result, protocol=5, buffer_callback=buffers.append)
+    views = [buffer.raw() for buffer in buffers]
+    sizes = [len(data)] + [view.nbytes for view in views]
+    if sum(sizes) < shm_threshold:
+        return ("pickle", data, [bytearray(view) for view in views])
+
+    # write @data and then each buffer into a new shared memory block; the server process
+    # unlinks it once read.
+    block = shared_memory.SharedMemory(create=True, size=sum(sizes))
+    offset = 0
+    for chunk, size in zip([data] + views, sizes):
+        block.buf[offset:offset + size] = chunk
+        offset += size
+    name = block.name
+    block.close()
+
+    # stop this process's resource tracker from deleting the block when the worker exits.
+    # note: the tracker knows the block by its POSIX name, i.e. @name with a leading "/".
+    resource_tracker.unregister("/" + name, "shared_memory")
+
+    return ("shm", name, sizes)
+
+
+def _unpack_result(payload):
+    """ Converts a @payload created by _pack_result() back to the original result.
+
+    Args:
+        - payload (tuple): The return value of _pack_result().
+
+    Returns:
+        object: The return value.
+    """
+
+    if payload[0] == "pickle":
+        _, data, buffers = payload
+        if not buffers:
+            return pickle.loads(data)
+        return pickle.loads(data, buffers=buffers)
+
+    # note: the buffers are copied out of the block so that the result doesn't refer to it once
+    # it's unlinked.
+    _, name, sizes = payload
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        buffers, offset = [], sizes[0]
+        for size in sizes[1:]:
+            buffers.append(bytearray(block.buf[offset:offset + size]))
+            offset += size
+        result = pickle.loads(block.buf[:sizes[0]], buffers=buffers)
+    finally:
+        block.close()
+        block.unlink()
+
+    return result
+
+
+def _picklable_error(err):
+    """ Returns @err if it can be pickled. Otherwise, returns a RuntimeError with @err's repr. """
+
+    try:
+        pickle.dumps(err)
+    except Exception:
+        err = RuntimeError(err.__repr__())
+
+    return err
+
+
+def _send_items(items, task_key, conn, lock, window=STREAM_WINDOW):
+    """ Sends each item yielded by the generator @items to the server process. Once @window items
+    haven't been acknowledged, this waits for an acknowledgement before sending the next item.
+
+    Args:
+        - items (generator): The return value of the user function.
+        - task_key (int): The task's key.
+        - conn (multiprocessing.connection.Connection): The worker's end of the pipe.
+        - lock (threading.Lock): The lock that guards writes to @conn.
+        - window (int): The number of items that may be unacknowledged.
+
+    Returns:
+        None
+
+    Raises:
+        - RuntimeError: If the server process closes the pipe or sends None.
+    """
+
+    unacknowledged = 0
+    for item in items:
+        with lock:
+            conn.send(("item", task_key, item))
+        unacknowledged += 1
+
+        # wait for the server process to catch up.
+        while unacknowledged >= window:
+            if conn.recv() != "ack":
+                raise RuntimeError("The worker was stopped while streaming items.")
+            unacknowledged -= 1
+
+    return
+
+
+def worker_main(funk, conn, shm_threshold, worker_init=None):
+    """ Runs tasks received over @conn until the server process closes the pipe or sends None.
+
+    Args:
+        - funk (function): The user function.
+        - conn (multiprocessing.connection.Connection): The worker's end of the pipe.
+        - shm_threshold (int): The pickled size in bytes at or above which results are returned
+        through shared memory. Use None to always send results over @conn.
+        - worker_init (function): The function to call once, before the first task, to create the
+        worker's state. Use None to skip it.
+
+    Returns:
+        None
+    """
+
+    # let the server process decide when workers stop (i.e. ignore Ctrl + C).
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    # send all logging back to the server process.
+    lock = threading.Lock()
+    for handler in list(logging.root.handlers):
+        logging.root.removeHandler(handler)
+    logging.root.addHandler(_PipeHandler(conn, lock))
+    logging.root.setLevel(logging.DEBUG)
+
+    while True:
+
+        # wait for the next task.
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            break
+        if message is None:
+            break
+
+        # skip acknowledgements for items that were sent by a finished task.
+        if message == "ack":
+            continue
+
+        # run @funk under the task's thread name so that its logs carry the task identifier.
+        task_key, thread_name, kwargs = message
+        threading.current_thread().name = thread_name
+        try:
+            init_worker(worker_init)
+            result = funk(**kwargs)
+            if inspect.isgenerator(result):
+                _send_items(result, task_key, conn, lock)
+                result = None
+            reply = ("result", task_key, True,
+                     _pack_result(result, shm_threshold))
+        except Exception as err:
+            reply = ("result", task_key, False, _picklable_error(err))
+
+        with lock:
+            conn.send(reply)
+
+    close_loops()
+
+    return
+
+
+class _Worker():
+    """ This class holds the process and pipe for a single worker. The worker is identified by
+    @name, which defaults to its process id. Once @stopping is True, the worker is never sent
+    another task; it's replaced once it exits. """
+
+    def __init__(self, process, conn, name=None):
+
+        self.process = process
+        self.conn = conn
+        self.name = name if name is not None else str(process.pid)
+        self.task_key = None
+        self.stopping = False
+
+
+class ProcessPool(Executor):
+    """ This class runs the function called by placissimo.call() in pre-forked worker processes.
+
+    Unlike concurrent.futures.ProcessPoolExecutor, the function is handed to each worker once, at
+    startup, and logging records from the workers are re-emitted in the server process.
+    """
+
+    def __init__(self, funk, max_workers=None, thread_prefix="",
+                 shm_threshold=SHARED_MEMORY_THRESHOLD, streams=None, worker_init=None):
+        """ Sets instance attributes and starts the worker processes.
+
+        Args:
+            - funk (function): The user function. This must be importable by the worker processes,
+            i.e. defined at the top level of a module.
+            - max_workers (int): The number of worker processes. If None, the number of CPUs is
+            used.
+            - thread_prefix (str): The prefix for the pool's thread and process names.
+            - shm_threshold (int): The pickled size in bytes at or above which results are
+            returned through shared memory.
+            - streams (dict): The placissimo.lib.task_stream.TaskStream for each streaming task,
+            keyed by thread name. Items yielded by generator tasks are put into them.
+            - worker_init (function): The function each worker calls once, before its first task,
+            to create its state; see placissimo.lib.worker_local. It must be picklable. Use None to
+            skip it.
+        """
+
+        # set logging.
+        self.logger = logging.getLogger(__name__)
+        self.logger.addHandler(logging.NullHandler())
+
+        # set attributes.
+        self.funk = funk
+        self._max_workers = max_workers or os.cpu_count() or 1
+        self.thread_prefix = thread_prefix
+        self.shm_threshold = shm_threshold
+        self.streams = streams if streams is not None else {}
+        self.worker_init = worker_init
+        self._lock = threading.Lock()
+        self._task_keys = itertools.count()
+        self._futures = {}
+        self._names = {}
+        self._cancelled = {}
+        self._pending = deque()
+        self._idle = deque()
+        self._workers = []
+        self._shutdown = False
+
+        # start the workers.
+        self._wakeup_reader, self._wakeup_writer = multiprocessing.Pipe(
+            duplex=False)
+        self._start_workers()
+
+        # read results and logging records on a background thread.
+        self._reader = threading.Thread(target=self._read_workers, daemon=True,
+                                        name="{}reader".format(self.thread_prefix))
+        self._reader.start()
+
+    def _start_workers(self):
+        """ Pre-forks @self._max_workers worker processes. """
+
+        self.logger.info(
+            "Starting {} worker processes.".format(self._max_workers))
+        for _ in range(self._max_workers):
+            self._spawn_worker()
+
+        return
+
+    def _spawn_worker(self):
+        """ Starts a new worker process and marks it as idle. """
+
+        parent_conn, child_conn = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=worker_main, daemon=True,
+                                          args=(self.funk, child_conn,
+                                                self.shm_threshold, self.worker_init),
+                                          name="{}worker".format(self.thread_prefix))
+        process.start()
+        child_conn.close()
+
+        worker = _Worker(process, parent_conn)
+        self._workers.append(worker)
+        self._idle.append(worker)
+        self.logger.debug(
+            "Started worker process: {}".format(process.pid))
+
+        return worker
+
+    def _dispatch(self):
+        """ Sends pending tasks to idle workers. Call this only while holding @self._lock. """
+
+        while self._pending and self._idle:
+            task_key, thread_name, kwargs = self._pending.popleft()
+            future = self._futures[task_key]
+            if not future.set_running_or_notify_cancel():
+                del self._futures[task_key]
+                del self._names[task_key]
+                continue
+
+            worker = self._idle.popleft()
+            worker.task_key = task_key
+            try:
+                worker.conn.send((task_key, thread_name, kwargs))
+            except Exception as err:
+                worker.task_key = None
+                self._idle.appendleft(worker)
+                del self._futures[task_key]
+                del self._names[task_key]
+                future.set_exception(err)
+
+        return
+
+    def _replace_worker(self, worker):
+        """ Removes a dead @worker, fails its task, and starts a replacement. Call this only while
+        holding @self._lock. """
+
+        error = self._cancelled.pop(worker.task_key, None)
+        if error is None:
+            error = RuntimeError(
+                "Worker process {} exited unexpectedly.".format(worker.name))
+            if not (worker.stopping or self._shutdown):
+                self.logger.warning(error.args[0])
+        self._workers.remove(worker)
+        if worker in self._idle:
+            self._idle.remove(worker)
+        worker.conn.close()
+
+        if worker.task_key is not None:
+            future = self._futures.pop(worker.task_key)
+            del self._names[worker.task_key]
+            future.set_exception(error)
+
+        if not self._shutdown:
+            self._spawn_worker()
+            self._dispatch()
+            self._wakeup_writer.send(None)
+
+        return
+
+    def _stop_worker(self, worker):
+        """ Stops @worker in the middle of its task. Call this only while holding @self._lock. """
+
+        worker.process.terminate()
+
+        return
+
+    def _acknowledge(self, worker, task_key):
+        """ Tells @worker that an item it yielded for @task_key was handled, unless the task is
+        already done. """
+
+        with self._lock:
+            if worker.task_key != task_key:
+                return
+            try:
+                worker.conn.send("ack")
+            except Exception:
+                pass
+
+        return
+
+    def _handle_message(self, worker, message):
+        """ Handles a logging record, yielded item, or task result sent by @worker. """
+
+        # re-emit logging records in this process.
+        if message[0] == "log":
+            record = logging.makeLogRecord(message[1])
+            logging.getLogger(record.name).handle(record)
+            return
+
+        # pass yielded items to the task's stream; @worker waits for the acknowledgement.
+        if message[0] == "item":
+            _, task_key, item = message
+            on_release = functools.partial(self._acknowledge, worker, task_key)
+            stream = self.streams.get(self._names.get(task_key))
+            if stream is None:
+                on_release()
+            else:
+                stream.put(item, on_release)
+            return
+
+        # otherwise, resolve the task's future and free @worker.
+        # note: a worker that's being stopped isn't freed, even if its task finished before it
+        # stopped, and the task's future is failed with the cancellation error instead.
+        _, task_key, ok, payload = message
+        with self._lock:
+            future = self._futures.pop(task_key)
+            del self._names[task_key]
+            error = self._cancelled.pop(task_key, None)
+            worker.task_key = None
+            if not worker.stopping:
+                self._idle.append(worker)
+                self._dispatch()
+
+        if error is not None:
+            future.set_exception(error)
+            return
+        if not ok:
+            future.set_exception(payload)
+            return
+        try:
+            future.set_result(_unpack_result(payload))
+        except Exception as err:
+            future.set_exception(err)
+
+        return
+
+    def _read_workers(self):
+        """ Reads messages from all workers until the pool is shut down. """
+
+        while not (self._shutdown and not self._futures):
+
+            with self._lock:
+                conns = {w.conn: w for w in self._workers}
+            ready = connection.wait(list(conns) + [self._wakeup_reader])
+
+            for conn in ready:
+
+                # a wake-up only means that @self._workers changed.
+                if conn is self._wakeup_reader:
+                    self._wakeup_reader.recv()
+                    continue
+
+                worker = conns[conn]
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    with self._lock:
+                        self._replace_worker(worker)
+                    continue
+                self._handle_message(worker, message)
+
+        return
+
+    def submit(self, thread_name, **kwargs):
+        """ Schedules @self.funk(**kwargs) to run in a worker process under @thread_name.
+
+        Args:
+            - thread_name (str): The unique thread name for a given task.
+            - kwargs: The arguments to send to @self.funk(). These must be picklable.
+
+        Returns:
+            concurrent.futures.Future: The return value.
+
+        Raises:
+            - RuntimeError: If the pool has been shut down.
+        """
+
+        future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("Can't submit task after shutdown.")
+            task_key = next(self._task_keys)
+            self._futures[task_key] = future
+            self._names[task_key] = thread_name
+            self._pending.append((task_key, thread_name, kwargs))
+            self._dispatch()
+
+        return future
+
+    def cancel(self, thread_name, error):
+        """ Stops the task @thread_name. A pending task is dropped. A running task's worker process
+        is terminated and replaced, since the user function can't be interrupted otherwise.
+
+        Args:
+            - thread_name (str): The unique thread name for a given task.
+            - error (Exception): The exception with which the task's future is failed.
+
+        Returns:
+            bool: The return value.
+            True if the task was found. False if it's already done.
+        """
+
+        with self._lock:
+            task_key = next((k for k, v in self._names.items() if v == thread_name), None)
+            if task_key is None:
+                return False
+
+            # drop the task if it hasn't been sent to a worker yet.
+            for pending in self._pending:
+                if pending[0] == task_key:
+                    self._pending.remove(pending)
+                    del self._names[task_key]
+                    self._futures.pop(task_key).set_exception(error)
+                    return True
+
+            # otherwise, stop its worker; @self._read_workers() fails the future with @error.
+            for worker in self._workers:
+                if worker.task_key == task_key:
+                    self.logger.info("Stopping worker process {} for task: {}".format(
+                        worker.name, thread_name))
+                    self._cancelled[task_key] = error
+                    worker.stopping = True
+                    self._stop_worker(worker)
+                    return True
+
+        return False
+
+    def shutdown(self, wait=True):
+        """ Stops all worker processes.
+
+        Args:
+            - wait (bool): Use True to wait for running tasks to finish before returning.
+
+        Returns:
+            None
+        """
+
+        self.logger.info("Stopping worker processes.")
+        with self._lock:
+            self._shutdown = True
+            for task_key, _, _ in self._pending:
+                self._futures.pop(task_key).cancel()
+                del self._names[task_key]
+            self._pending.clear()
+            for worker in self._workers:
+                try:
+                    worker.conn.send(None)
+                except Exception:
+                    pass
+            self._wakeup_writer.send(None)
+
+        for worker in list(self._workers):
+            if worker.process is None:
+                continue
+            worker.process.join(None if wait else 0)
+            if worker.process.is_alive():
+                worker.process.terminate()
+
+        return
+
+
+def picklable_items(items):
+    """ Returns a copy of the dict @items without any values that can't be pickled. This is used
+    once, when the server starts, to pass placissimo.server.serve()'s locals to worker processes
+    via the callback argument.
+
+    Args:
+        - items (dict): The key/value pairs to filter.
+
+    Returns:
+        dict: The return value.
+        The values are copies, as a worker process would receive them, so that later changes to
+        the values in @items can't make the dict unpicklable.
+    """
+
+    picklable = {}
+    for k, v in items.items():
+        try:
+            picklable[k] = pickle.loads(pickle.dumps(v))
+        except Exception:
+            continue
+
+    return picklable
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,23 @@
+#!/usr/bin/python3
+
+""" This module contains a custom exception class for when a task can't be admitted to the task
+queue in placissimo.server.serve(). """
+
+
+class QueueFullError(Exception):
+    """ A custom exception class for when a task can't be admitted to the task queue in
+    placissimo.server.serve().
+
+    Args:
+        - msg (str): The error message.
+        - retry_after (int): The estimated number of seconds after which a client should retry.
+    """
+
+    def __init__(self, msg, retry_after):
+
+        super().__init__(msg)
+        self.retry_after = retry_after
+
+
+if __name__ == "__main__":
+    pass
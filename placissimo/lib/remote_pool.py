@@ -0,0 +1,409 @@
+#!/usr/bin/python3
+
+""" This module contains a class that runs the function called by placissimo.call() in standalone
+worker processes, and the function that starts those workers.
+
+Workers are started separately from the server, e.g. with "--workerissimo", on the same host or on
+other hosts. Each worker connects to the server over a Unix socket or a TCP socket, introduces
+itself, and then runs the tasks it's sent exactly like a worker of
+placissimo.lib.process_pool.ProcessPool: logging records and yielded items are sent back as they
+happen, followed by the result. The server only dispatches and tracks tasks.
+
+Connections are authenticated with a shared key, which is required for TCP sockets since tasks and
+results are pickled. The key is optional for a Unix socket: without one, the socket's file mode
+(only the user that runs the server may connect) is the only protection.
+
+A worker whose task is cancelled interrupts the task and exits, so that run_workers() starts a new
+worker in its place.
+"""
+
+# import modules.
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import socket
+import stat
+import sys
+import threading
+import time
+from . import supervisor
+from .process_pool import ProcessPool, _Worker, worker_main
+from multiprocessing import connection
+
+# the environment variable that holds the key shared by the server and its workers.
+WORKER_KEY_ENV = "PLACISSIMO_WORKER_KEY"
+
+# the number of seconds a worker waits before it tries to reconnect to the server.
+RETRY_SECONDS = 2
+
+# the number of seconds the server waits for a new worker to introduce itself.
+HELLO_TIMEOUT = 10
+
+# the signal with which a worker interrupts its cancelled task.
+CANCEL_SIGNAL = signal.SIGUSR1
+
+# the number of seconds a worker waits for its cancelled task to be interrupted before it exits
+# anyway, e.g. because the task is stuck in a C extension.
+CANCEL_SECONDS = 5
+
+
+def parse_address(address):
+    """ Converts a worker @address to the form used by multiprocessing.connection.
+
+    Args:
+        - address (str): The path of a Unix socket, or "host:port" for a TCP socket.
+
+    Returns:
+        object: The return value.
+        The path as it is, or a (host, port) tuple.
+
+    Raises:
+        - ValueError: If a TCP @address has no valid port.
+    """
+
+    if os.sep in address or ":" not in address:
+        return address
+
+    host, _, port = address.rpartition(":")
+    try:
+        port = int(port)
+    except ValueError:
+        raise ValueError("The worker address '{}' has an invalid port.".format(address))
+
+    return host, port
+
+
+def _as_key(key):
+    """ Returns @key as bytes, or None if @key is None or empty. """
+
+    if not key:
+        return None
+
+    return key.encode() if isinstance(key, str) else key
+
+
+class _TaskCancelled(BaseException):
+    """ This is raised in a worker's main thread once its task is cancelled. Unlike Exception, it
+    isn't caught by the user function or by placissimo.lib.process_pool.worker_main(). """
+
+
+class _CancellableConnection():
+    """ This class wraps a worker's connection to the server. A background thread reads every
+    message, so that the task can be interrupted as soon as it's cancelled even while the user
+    function runs; the other messages are passed on to recv(). Create this in the main thread.
+
+    Args:
+        - conn (multiprocessing.connection.Connection): The connection to the server.
+    """
+
+    def __init__(self, conn):
+
+        self.conn = conn
+        self._messages = queue.Queue()
+        signal.signal(CANCEL_SIGNAL, self._interrupt)
+        self._reader = threading.Thread(target=self._read, daemon=True, name="server_reader")
+        self._reader.start()
+
+    @staticmethod
+    def _interrupt(signum, frame):
+        """ Raises _TaskCancelled in the main thread. This is the handler for CANCEL_SIGNAL. """
+
+        raise _TaskCancelled()
+
+    def _cancel(self):
+        """ Interrupts the task in the main thread; see run_workers(). If the main thread is still
+        running after CANCEL_SECONDS, the logs are flushed, the connection is closed, and the
+        worker exits. """
+
+        os.kill(os.getpid(), CANCEL_SIGNAL)
+        time.sleep(CANCEL_SECONDS)
+
+        for handler in logging.root.handlers:
+            handler.flush()
+        self.conn.close()
+        os._exit(1)
+
+    def _read(self):
+        """ Reads messages from the server until the connection is closed. """
+
+        while True:
+            try:
+                message = self.conn.recv()
+            except (EOFError, OSError):
+                self._messages.put(EOFError)
+                return
+
+            # note: the user function can't be stopped otherwise.
+            if message == "cancel":
+                self._cancel()
+            self._messages.put(message)
+
+    def recv(self):
+        """ Returns the next message from the server.
+
+        Returns:
+            object: The return value.
+
+        Raises:
+            - EOFError: If the connection is closed.
+        """
+
+        message = self._messages.get()
+        if message is EOFError:
+            raise EOFError("The server closed the connection.")
+
+        return message
+
+    def send(self, obj):
+        """ Sends @obj to the server.
+
+        Args:
+            - obj (object): The message to send. It must be picklable.
+
+        Returns:
+            None
+        """
+
+        self.conn.send(obj)
+
+        return
+
+
+class RemotePool(ProcessPool):
+    """ This class runs the function called by placissimo.call() in standalone worker processes
+    that connect to the server; see run_workers().
+
+    Tasks wait until a worker is free. Unlike ProcessPool, results are always sent over the
+    connection since workers may run on other hosts, and a cancelled task's worker exits and is
+    replaced by run_workers() instead of being terminated by the server.
+    """
+
+    def __init__(self, funk, address, key=None, max_workers=None, thread_prefix="", streams=None):
+        """ Sets instance attributes and starts accepting workers.
+
+        Args:
+            - funk (function): The user function. Workers that run a function with another name
+            are turned away.
+            - address (str): The path of the Unix socket, or "host:port" of the TCP socket, on
+            which to accept workers. An existing Unix socket at the path is replaced.
+            - key (str): The key that workers must know. Use None to accept any worker that can
+            open the Unix socket; only do this for a Unix socket.
+            - max_workers (int): The number of tasks to hand to workers at a time, e.g. the total
+            number of worker processes. If None, the number of CPUs is used.
+            - thread_prefix (str): The prefix for the pool's thread names.
+            - streams (dict): The placissimo.lib.task_stream.TaskStream for each streaming task,
+            keyed by thread name.
+        """
+
+        self.address = parse_address(address)
+        self.key = _as_key(key)
+        self._listener = None
+
+        super().__init__(funk, max_workers, thread_prefix, shm_threshold=None, streams=streams)
+
+    def _start_workers(self):
+        """ Listens at @self.address and accepts workers on a background thread. """
+
+        # replace a Unix socket left behind by an earlier server.
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            if stat.S_ISSOCK(os.stat(self.address).st_mode):
+                os.remove(self.address)
+
+        # note: a Unix socket is created with the umask's mode, so it's only ever accessible to
+        # this user.
+        if isinstance(self.address, str):
+            umask = os.umask(0o177)
+            try:
+                self._listener = connection.Listener(self.address, authkey=self.key)
+            finally:
+                os.umask(umask)
+            if self.key is None:
+                self.logger.warning(
+                    "Workers need no key; only the mode of {} keeps other users out.".format(
+                        self.address))
+        else:
+            self._listener = connection.Listener(self.address, authkey=self.key)
+        self.logger.info("Waiting for workers at: {}".format(self._listener.address))
+
+        self._acceptor = threading.Thread(target=self._accept_workers, daemon=True,
+                                          name="{}acceptor".format(self.thread_prefix))
+        self._acceptor.start()
+
+        return
+
+    def _greet(self, conn):
+        """ Waits for a new worker to introduce itself over @conn.
+
+        Returns:
+            str: The return value.
+            The worker's name, or None if the worker was turned away.
+        """
+
+        try:
+            hello = conn.recv() if conn.poll(HELLO_TIMEOUT) else None
+        except (EOFError, OSError):
+            hello = None
+        if not (isinstance(hello, tuple) and len(hello) == 3 and hello[0] == "hello"):
+            self.logger.warning("Refused a worker that didn't introduce itself.")
+            return None
+
+        _, name, funk_name = hello
+        reply = ("welcome",)
+        if funk_name != self.funk.__name__:
+            msg = "Worker {} runs '{}' instead of '{}'.".format(name, funk_name, self.funk.__name__)
+            self.logger.warning(msg)
+            reply = ("refused", msg)
+        try:
+            conn.send(reply)
+        except (EOFError, OSError):
+            return None
+
+        return name if reply[0] == "welcome" else None
+
+    def _accept_workers(self):
+        """ Adds workers as they connect until the pool is shut down. """
+
+        while not self._shutdown:
+            try:
+                conn = self._listener.accept()
+            except (EOFError, OSError, multiprocessing.AuthenticationError) as err:
+                if self._shutdown:
+                    break
+                self.logger.warning("Refused a worker: {}".format(err.__repr__()))
+                continue
+
+            name = self._greet(conn)
+            if name is None:
+                conn.close()
+                continue
+
+            with self._lock:
+                if self._shutdown:
+                    conn.close()
+                    break
+                worker = _Worker(None, conn, name)
+                self._workers.append(worker)
+                self._idle.append(worker)
+                self._dispatch()
+                self._wakeup_writer.send(None)
+            self.logger.info("Worker {} connected.".format(name))
+
+        return
+
+    def _spawn_worker(self):
+        """ Does nothing; workers reconnect on their own. """
+
+        return None
+
+    def _stop_worker(self, worker):
+        """ Asks @worker to exit in the middle of its task. Call this only while holding
+        @self._lock. """
+
+        try:
+            worker.conn.send("cancel")
+        except Exception:
+            pass
+
+        return
+
+    def worker_names(self):
+        """ Returns the names of the connected workers, i.e. "host:pid".
+
+        Returns:
+            list: The return value.
+        """
+
+        with self._lock:
+            return [worker.name for worker in self._workers]
+
+    def shutdown(self, wait=True):
+        """ Disconnects all workers and stops accepting new ones. Connected workers then try to
+        reconnect until the server is back.
+
+        Args:
+            - wait (bool): Ignored; workers aren't waited for.
+
+        Returns:
+            None
+        """
+
+        super().shutdown(wait)
+        if self._listener is not None:
+            self._listener.close()
+
+        return
+
+
+def run_workers(funk, address, key=None, processes=None, worker_init=None):
+    """ Starts standalone worker processes that run @funk for the server at @address until they're
+    stopped, e.g. with Ctrl+C. Each worker reconnects whenever its connection is lost, e.g. while
+    the server restarts; a worker whose task is cancelled exits and is replaced.
+
+    Args:
+        - funk (function): The user function. It must have the same name as the server's.
+        - address (str): The path of the server's Unix socket, or "host:port" of its TCP socket.
+        - key (str): The key shared with the server. Use None if the server doesn't use one.
+        - processes (int): The number of worker processes. If None, the number of CPUs is used.
+        - worker_init (function): The function each worker calls once, before its first task; see
+        placissimo.lib.worker_local. Use None to skip it.
+
+    Returns:
+        None
+    """
+
+    # set logging.
+    logger = logging.getLogger(__name__)
+    logger.addHandler(logging.NullHandler())
+
+    address, key = parse_address(address), _as_key(key)
+    if supervisor.fork_workers(processes or os.cpu_count() or 1, max_restarts=None) is None:
+        return
+
+    # keep this process's logging handlers for the time between connections.
+    name = "{}:{}".format(socket.gethostname(), os.getpid())
+    handlers, level = list(logging.root.handlers), logging.root.level
+
+    while True:
+
+        # connect and introduce this worker.
+        try:
+            conn = connection.Client(address, authkey=key)
+            conn.send(("hello", name, funk.__name__))
+            reply = conn.recv()
+        except (EOFError, OSError, multiprocessing.AuthenticationError) as err:
+            logger.warning("Can't connect to server at {}: {}".format(address, err.__repr__()))
+            time.sleep(RETRY_SECONDS)
+            continue
+        if reply[0] != "welcome":
+            logger.error("The server refused worker {}: {}".format(name, reply[1]))
+            conn.close()
+            sys.exit(0)
+
+        # run tasks until the connection is lost or a task is cancelled.
+        logger.info("Worker {} connected to: {}".format(name, address))
+        cancelled = False
+        try:
+            worker_main(funk, _CancellableConnection(conn), None, worker_init)
+        except _TaskCancelled:
+            cancelled = True
+        conn.close()
+
+        for handler in list(logging.root.handlers):
+            logging.root.removeHandler(handler)
+        for handler in handlers:
+            logging.root.addHandler(handler)
+        logging.root.setLevel(level)
+
+        # exit once a task is cancelled since it may have left this worker in any state; the
+        # supervisor starts a new worker in its place.
+        if cancelled:
+            logger.info("Worker {} exits since its task was cancelled.".format(name))
+            sys.exit(1)
+        logger.info("Worker {} was disconnected from the server.".format(name))
+        time.sleep(RETRY_SECONDS)
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,275 @@
+#!/usr/bin/python3
+
+""" This module contains a class that receives the body of a request to "/api" in chunks.
+
+Uploaded files (parts of a "multipart/form-data" body that have a filename, or a whole
+"application/octet-stream" body) are written to temporary files as they arrive, so they're never
+held in memory; the function called by placissimo.call() receives their paths instead. Other bodies,
+e.g. JSON or form data, are kept in memory.
+"""
+
+# import modules.
+import email.message
+import os
+import tempfile
+from tornado import httputil
+
+# the default maximum size of a request body in bytes (the same as Tornado's).
+MAX_BODY_BYTES = 100 * 1024 * 1024
+
+# the maximum size of the headers of one part of a "multipart/form-data" body in bytes.
+MAX_PART_HEADER_BYTES = 64 * 1024
+
+
+def _parse_header(name, value):
+    """ Parses the value of the header @name into an email.message.Message so that its parameters
+    can be read with get_param().
+
+    Args:
+        - name (str): The header's name, e.g. "Content-Type".
+        - value (str): The header's value.
+
+    Returns:
+        email.message.Message: The return value.
+    """
+
+    message = email.message.Message()
+    message[name] = value
+
+    return message
+
+
+def discard_files(paths):
+    """ Deletes the files at @paths, ignoring any that no longer exist.
+
+    Args:
+        - paths (list): The paths of the files to delete.
+
+    Returns:
+        None
+    """
+
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    return
+
+
+class RequestBody():
+    """ This class receives the body of a request in chunks.
+
+    Args:
+        - headers (tornado.httputil.HTTPHeaders): The request's headers. For an
+        "application/octet-stream" body, the "X-Upload-Arg" header gives the name of the argument
+        to which to pass the file's path.
+
+    Raises:
+        - ValueError: If a multipart body has no boundary or a binary body has no "X-Upload-Arg"
+        header.
+    """
+
+    def __init__(self, headers):
+
+        content_type = _parse_header("Content-Type", headers.get("Content-Type", ""))
+        self.content_type = content_type.get_content_type()
+        self.fields = {}
+        self.files = []
+        self.data = None
+        self._chunks = []
+        self._part = None
+        self._file = None
+
+        if self.content_type == "multipart/form-data":
+            boundary = content_type.get_param("boundary")
+            if not boundary:
+                raise ValueError("The multipart body has no boundary.")
+
+            # note: the body starts with a boundary, so a line break is prepended to match the
+            # delimiter that precedes every other boundary.
+            self._delimiter = "\r\n--{}".format(boundary).encode()
+            self._buffer = b"\r\n"
+            self._state = "preamble"
+
+        elif self.content_type == "application/octet-stream":
+            name = headers.get("X-Upload-Arg")
+            if not name:
+                raise ValueError("Binary bodies need an 'X-Upload-Arg' header.")
+            self._file = self._open_file()
+            self.fields[name] = self._file.name
+
+    def _open_file(self):
+        """ Creates a temporary file for an upload and adds its path to @self.files.
+
+        Returns:
+            file: The return value.
+        """
+
+        upload = tempfile.NamedTemporaryFile(prefix="placissimo_upload_", delete=False)
+        self.files.append(upload.name)
+
+        return upload
+
+    def _start_part(self, header_bytes):
+        """ Starts a new part of a multipart body with the headers in @header_bytes. """
+
+        headers = httputil.HTTPHeaders.parse(header_bytes.decode("utf-8"))
+        disposition = _parse_header(
+            "Content-Disposition", headers.get("Content-Disposition", ""))
+        name = disposition.get_param("name", header="content-disposition")
+        if not name:
+            raise ValueError("A part of the multipart body has no name.")
+
+        if disposition.get_filename() is None:
+            self._part = (name, [])
+        else:
+            self._file = self._open_file()
+            self._part = (name, None)
+
+        return
+
+    def _write_part(self, data):
+        """ Adds @data to the current part of a multipart body, if any. """
+
+        if self._part is None or not data:
+            return
+
+        if self._file is not None:
+            self._file.write(data)
+        else:
+            self._part[1].append(data)
+
+        return
+
+    def _end_part(self):
+        """ Ends the current part of a multipart body and adds its value to @self.fields. Files
+        are added by their path. """
+
+        if self._part is None:
+            return
+
+        name, data = self._part
+        if self._file is not None:
+            self._file.close()
+            self.fields[name] = self._file.name
+            self._file = None
+        else:
+            self.fields[name] = b"".join(data).decode("utf-8")
+        self._part = None
+
+        return
+
+    def _receive_multipart(self, chunk):
+        """ Parses the next @chunk of a multipart body. Only the bytes that might belong to the
+        next boundary are kept in memory between chunks. """
+
+        # ignore anything after the closing boundary.
+        if self._state == "done":
+            return
+
+        self._buffer += chunk
+        while self._state != "done":
+
+            if self._state in ["preamble", "body"]:
+                index = self._buffer.find(self._delimiter)
+                if index < 0:
+                    # keep enough bytes to find a delimiter that's split across chunks.
+                    safe = len(self._buffer) - len(self._delimiter) + 1
+                    if safe > 0:
+                        self._write_part(self._buffer[:safe])
+                        self._buffer = self._buffer[safe:]
+                    return
+                self._write_part(self._buffer[:index])
+                self._end_part()
+                self._buffer = self._buffer[index + len(self._delimiter):]
+                self._state = "boundary"
+
+            if self._state == "boundary":
+                if len(self._buffer) < 2:
+                    return
+                if self._buffer.startswith(b"--"):
+                    self._buffer = b""
+                    self._state = "done"
+                    return
+                if not self._buffer.startswith(b"\r\n"):
+                    raise ValueError("The multipart body has an invalid boundary.")
+                self._buffer = self._buffer[2:]
+                self._state = "headers"
+
+            if self._state == "headers":
+                index = self._buffer.find(b"\r\n\r\n")
+                if index < 0:
+                    if len(self._buffer) > MAX_PART_HEADER_BYTES:
+                        raise ValueError("A part of the multipart body has too many headers.")
+                    return
+                self._start_part(self._buffer[:index])
+                self._buffer = self._buffer[index + 4:]
+                self._state = "body"
+
+        return
+
+    def receive(self, chunk):
+        """ Receives the next @chunk of the body.
+
+        Args:
+            - chunk (bytes): The next chunk.
+
+        Returns:
+            None
+
+        Raises:
+            - ValueError: If a multipart body is invalid.
+        """
+
+        if self.content_type == "multipart/form-data":
+            self._receive_multipart(chunk)
+        elif self.content_type == "application/octet-stream":
+            self._file.write(chunk)
+        else:
+            self._chunks.append(chunk)
+
+        return
+
+    def finish(self):
+        """ Ends the body once all chunks are received. For a body that's kept in memory, the
+        body is set as @self.data.
+
+        Returns:
+            None
+
+        Raises:
+            - ValueError: If a multipart body is incomplete.
+        """
+
+        if self.content_type == "multipart/form-data":
+            if self._state != "done":
+                raise ValueError("The multipart body is incomplete.")
+        elif self.content_type == "application/octet-stream":
+            self._file.close()
+            self._file = None
+        else:
+            self.data = b"".join(self._chunks)
+            self._chunks = []
+
+        return
+
+    def discard(self):
+        """ Deletes the uploaded files that weren't handed to a task.
+
+        Returns:
+            None
+        """
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        discard_files(self.files)
+        self.files = []
+
+        return
+
+
+if __name__ == "__main__":
+    pass
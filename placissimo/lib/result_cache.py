@@ -0,0 +1,148 @@
+#!/usr/bin/python3
+
+""" This module contains a thread-safe cache of the results of the function called by
+placissimo.call(), keyed by the arguments sent to "/api".
+
+The cache is bounded by its number of entries and, optionally, by the total size of its results.
+Once a limit is exceeded, the least recently used entries are evicted. Entries can also expire
+after a given number of seconds.
+"""
+
+# import modules.
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResultCache():
+    """ This class is a thread-safe cache of task results.
+
+    Args:
+        - max_entries (int): The number of results to keep.
+        - max_bytes (int): The approximate total size in bytes of the results to keep. Results that
+        are larger than this on their own aren't cached. Use None for no limit.
+        - ttl (float): The number of seconds to keep a result. Use None for no limit.
+    """
+
+    def __init__(self, max_entries, max_bytes=None, ttl=None):
+
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.result_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evicted = {"max_entries": 0, "max_bytes": 0, "ttl": 0}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(kwargs):
+        """ Returns the cache key for the arguments @kwargs. Values are compared by their repr() so
+        that, e.g., 1, 1.0, True, and "1" are different keys.
+
+        Args:
+            - kwargs (dict): The arguments for the user function, after their types are
+            interpreted.
+
+        Returns:
+            tuple: The return value.
+        """
+
+        return tuple(sorted((k, repr(v)) for k, v in kwargs.items()))
+
+    def _result_size(self, result):
+        """ Returns the approximate size of @result in bytes, or 0 if there's no size limit. """
+
+        if self.max_bytes is None:
+            return 0
+
+        try:
+            return len(pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            return sys.getsizeof(result)
+
+    def _remove(self, key, reason):
+        """ Removes the entry for @key and counts it under @reason. Call this only while holding
+        @self._lock. """
+
+        _, size, _ = self._entries.pop(key)
+        self.result_bytes -= size
+        self.evicted[reason] += 1
+
+        return
+
+    def get(self, key):
+        """ Looks up the result for @key.
+
+        Args:
+            - key (tuple): The return value of key().
+
+        Returns:
+            tuple: The return value.
+            True and the cached result if there's a live entry for @key. Otherwise, False and None.
+        """
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is not None and entry[0] <= time.monotonic():
+                self._remove(key, "ttl")
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return False, None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[2]
+
+    def put(self, key, result):
+        """ Caches @result under @key and evicts the least recently used entries that exceed the
+        cache's limits.
+
+        Args:
+            - key (tuple): The return value of key().
+            - result (object): The return value of the user function.
+
+        Returns:
+            None
+        """
+
+        size = self._result_size(result)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            if key in self._entries:
+                self.result_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (expires, size, result)
+            self.result_bytes += size
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)), "max_entries")
+            while self.max_bytes is not None and self.result_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)), "max_bytes")
+
+        return
+
+    def stats(self):
+        """ Returns the cache's size and its hit, miss, and eviction counts.
+
+        Returns:
+            dict: The return value.
+        """
+
+        with self._lock:
+            return {"entries": len(self._entries),
+                    "result_bytes": self.result_bytes,
+                    "hits": self.hits,
+                    "misses": self.misses,
+                    "evicted": dict(self.evicted)}
+
+
+if __name__ == "__main__":
+    pass
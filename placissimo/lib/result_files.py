@@ -0,0 +1,310 @@
+#!/usr/bin/python3
+
+""" This module contains a class that writes large task results to files instead of keeping them
+in memory in placissimo.server.serve().
+
+A result whose JSON encoding exceeds a size threshold is written to "<thread name>.json" in the
+result directory; the task's metadata then refers to the file. List results are written with one
+item per line, along with an index of each item's byte offset in "<thread name>.idx", so that a
+range of items can be read without reading the whole file.
+
+Results are encoded as they're written, so a large result is never held in memory as a whole.
+Tasks that share another task's work get hard links to its files, so each task's files can be
+deleted on their own.
+"""
+
+# import modules.
+import json
+import os
+import shutil
+import struct
+import tempfile
+import threading
+
+# the default size in bytes of the JSON encoding above which a result is written to a file.
+SPILL_BYTES = 1024 * 1024
+
+# the format of each byte offset in an index file.
+_OFFSET = struct.Struct("<q")
+
+
+class ResultFiles():
+    """ This class writes large task results to files and reads them back.
+
+    Args:
+        - directory (str): The directory in which to write results. It's created if needed.
+        - spill_bytes (int): The size in bytes of the JSON encoding above which a result is
+        written to a file.
+    """
+
+    def __init__(self, directory, spill_bytes=SPILL_BYTES):
+
+        self.directory = os.path.abspath(directory)
+        self.spill_bytes = spill_bytes
+        self._held = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, name):
+        """ Returns the path of the result file for the task @name.
+
+        Args:
+            - name (str): The unique thread name for the task.
+
+        Returns:
+            str: The return value.
+        """
+
+        return os.path.join(self.directory, "{}.json".format(name))
+
+    def _index_path(self, name):
+        """ Returns the path of the index file for the list result of the task @name. """
+
+        return os.path.join(self.directory, "{}.idx".format(name))
+
+    def _write(self, path, chunks, min_bytes=-1):
+        """ Writes the byte strings in @chunks to @path if they add up to more than @min_bytes.
+        The chunks are only buffered until then. The file only appears once it's complete.
+
+        Returns:
+            int: The return value.
+            The number of bytes written, or None if the chunks didn't exceed @min_bytes.
+        """
+
+        # buffer the first chunks until they exceed @min_bytes.
+        chunks, buffered, size = iter(chunks), [], 0
+        for chunk in chunks:
+            buffered.append(chunk)
+            size += len(chunk)
+            if size > min_bytes:
+                break
+        else:
+            return None
+
+        handle, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(handle, "wb") as temp_file:
+                temp_file.write(b"".join(buffered))
+                for chunk in chunks:
+                    temp_file.write(chunk)
+                    size += len(chunk)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+        return size
+
+    def _write_list(self, name, items):
+        """ Writes the list @items to the result file for the task @name with one item per line,
+        along with the byte offset of each item, if its JSON encoding exceeds @self.spill_bytes.
+
+        Returns:
+            int: The return value.
+            The size of the result file in bytes, or None if nothing was written.
+        """
+
+        offsets = []
+
+        def _chunks():
+            position = 2
+            yield b"[\n"
+            for i, item in enumerate(items):
+                data = json.dumps(item).encode()
+                if i:
+                    yield b",\n"
+                    position += 2
+                offsets.append(position)
+                yield data
+                position += len(data)
+
+            # note: the last offset points past the end of the last item and its separator.
+            offsets.append(position + 2)
+            yield b"\n]"
+
+        size = self._write(self.path(name), _chunks(), self.spill_bytes)
+        if size is not None:
+            self._write(self._index_path(name), (_OFFSET.pack(offset) for offset in offsets))
+
+        return size
+
+    @staticmethod
+    def _encode(result):
+        """ Yields the JSON encoding of @result in chunks of bytes. The items of a dict are encoded
+        one at a time. """
+
+        if not isinstance(result, dict):
+            yield json.dumps(result).encode()
+            return
+
+        yield b"{"
+        for i, item in enumerate(result.items()):
+            # note: this converts the key the same way json.dumps(@result) does.
+            data = json.dumps(dict([item]))[1:-1].encode()
+            yield b", " + data if i else data
+        yield b"}"
+
+    def _may_spill(self, result):
+        """ Returns False if @result is too small to exceed @self.spill_bytes once encoded, so
+        that it needn't be encoded. """
+
+        # note: an escaped character takes at most 12 bytes, e.g. "\ud83d\ude00".
+        if isinstance(result, str):
+            return len(result) * 12 + 2 > self.spill_bytes
+
+        return isinstance(result, (list, tuple, dict))
+
+    def spill(self, name, result):
+        """ Writes @result to a file if its JSON encoding is larger than @self.spill_bytes. The
+        size is measured while the file is written.
+
+        Args:
+            - name (str): The unique thread name for the task.
+            - result (object): The task's result.
+
+        Returns:
+            dict: The return value.
+            The size of the file in bytes, the number of items if @result is a list (otherwise
+            None), and the URL from which to get the file. If @result is small or can't be
+            encoded as JSON, None is returned and @result should be kept in memory.
+        """
+
+        if not self._may_spill(result):
+            return None
+
+        try:
+            if isinstance(result, list):
+                size = self._write_list(name, result)
+                items = len(result)
+            else:
+                size = self._write(self.path(name), self._encode(result), self.spill_bytes)
+                items = None
+        except (TypeError, ValueError, OverflowError):
+            self.remove(name)
+            return None
+
+        if size is None:
+            return None
+
+        return {"size": size, "items": items, "url": "/tasks/result?name={}".format(name)}
+
+    def link(self, name, other, result_file):
+        """ Gives the task @other its own links to the result files of the task @name, e.g.
+        because @other shared the work of @name. The files are copied if they can't be linked.
+
+        Args:
+            - name (str): The unique thread name for the task that wrote the files.
+            - other (str): The unique thread name for the task that gets the links.
+            - result_file (dict): The result file of @name, as returned by self.spill().
+
+        Returns:
+            dict: The return value.
+            The result file of @other.
+        """
+
+        for source, target in [(self.path(name), self.path(other)),
+                               (self._index_path(name), self._index_path(other))]:
+            try:
+                os.link(source, target)
+            except FileNotFoundError:
+                continue
+            except OSError:
+                shutil.copyfile(source, target)
+
+        return dict(result_file, url="/tasks/result?name={}".format(other))
+
+    def read_items(self, name, start=0, limit=None):
+        """ Reads a range of items from the list result of the task @name.
+
+        Args:
+            - name (str): The unique thread name for the task.
+            - start (int): The position of the first item to read.
+            - limit (int): The number of items to read. Use None to read all remaining items.
+
+        Returns:
+            tuple: The return value.
+            The JSON array of the items as bytes and the total number of items. If the task has
+            no list result file, None is returned.
+        """
+
+        try:
+            with open(self._index_path(name), "rb") as index_file:
+                total = os.fstat(index_file.fileno()).st_size // _OFFSET.size - 1
+                first = min(start, total)
+                last = total if limit is None else min(total, first + limit)
+                if first == last:
+                    return b"[]", total
+                index_file.seek(first * _OFFSET.size)
+                begin = _OFFSET.unpack(index_file.read(_OFFSET.size))[0]
+                index_file.seek(last * _OFFSET.size)
+                end = _OFFSET.unpack(index_file.read(_OFFSET.size))[0] - 2
+
+            with open(self.path(name), "rb") as result_file:
+                result_file.seek(begin)
+                data = result_file.read(end - begin)
+        except FileNotFoundError:
+            return None
+
+        return b"[\n" + data + b"\n]", total
+
+    def hold(self, name):
+        """ Defers the deletion of the result files for the task @name until release() is called,
+        e.g. while other tasks get links to them. This is thread-safe.
+
+        Args:
+            - name (str): The unique thread name for the task.
+
+        Returns:
+            None
+        """
+
+        with self._lock:
+            self._held[name] = False
+
+        return
+
+    def release(self, name):
+        """ Ends a call to hold() and deletes the result files for the task @name if remove() was
+        called in the meantime. This is thread-safe.
+
+        Args:
+            - name (str): The unique thread name for the task.
+
+        Returns:
+            None
+        """
+
+        with self._lock:
+            remove = self._held.pop(name, False)
+        if remove:
+            self.remove(name)
+
+        return
+
+    def remove(self, name):
+        """ Deletes the result files for the task @name, if any. If the files are held (see
+        hold()), they're deleted once they're released. This is thread-safe.
+
+        Args:
+            - name (str): The unique thread name for the task.
+
+        Returns:
+            None
+        """
+
+        with self._lock:
+            if name in self._held:
+                self._held[name] = True
+                return
+
+        for path in [self.path(name), self._index_path(name)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+        return
+
+
+if __name__ == "__main__":
+    pass
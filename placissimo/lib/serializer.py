@@ -0,0 +1,340 @@
+#!/usr/bin/python3
+
+""" This module contains a class that encodes the responses of the endpoints created by
+placissimo.server.serve().
+
+Responses are encoded as JSON unless the request's "Accept" header prefers MessagePack or CBOR and
+the "msgpack" or "cbor2" module is installed. JSON is encoded with "orjson" if it's installed and
+with the json module otherwise. Values that JSON can't represent, e.g. datetimes, bytes, sets, and
+dataclasses, are converted by default(); anything else is converted to a string, so a task result
+of any type can be sent.
+
+Responses larger than a threshold are encoded in a helper thread so that the IOLoop can serve other
+requests in the meantime. JSON is then encoded in pieces, which lets the IOLoop's thread run
+between pieces.
+"""
+
+# import modules.
+import base64
+import datetime
+import itertools
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import dataclasses
+except ImportError:
+    dataclasses = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+# the default approximate size in bytes above which a response is encoded in a helper thread.
+OFFLOAD_BYTES = 1024 * 1024
+
+# the media types that can be sent.
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+CBOR = "application/cbor"
+
+# the content type header for each media type.
+CONTENT_TYPES = {JSON: "application/json; charset=UTF-8", MSGPACK: MSGPACK, CBOR: CBOR}
+
+# the approximate size in bytes of each piece of a JSON response that's encoded in a helper thread.
+_PIECE_BYTES = 64 * 1024
+
+# the number of keys up to which each value of a dict is encoded as a separate piece.
+_SPLIT_KEYS = 64
+
+# the number of levels of nested dicts and lists below which pieces aren't split any further.
+_MAX_DEPTH = 16
+
+
+def default(obj):
+    """ Converts @obj, which can't be encoded as it is, to a value that can.
+
+    Args:
+        - obj (object): The value to convert.
+
+    Returns:
+        object: The return value.
+        Datetimes, dates, and times become ISO strings, bytes become Base64 strings, sets become
+        lists, and dataclass instances become dicts. Anything else becomes a string.
+    """
+
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        return base64.b64encode(obj).decode("ascii")
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if dataclasses is not None and dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+
+    return str(obj)
+
+
+def _encode_json(obj):
+    """ Encodes @obj as JSON with orjson, if it's installed, or with the json module.
+
+    Args:
+        - obj (object): The value to encode.
+
+    Returns:
+        bytes: The return value.
+    """
+
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=default, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            # note: orjson can't encode some values that the json module can, e.g. integers larger
+            # than 64 bits.
+            pass
+
+    return json.dumps(obj, default=default).encode()
+
+
+def _encode_cbor_default(encoder, obj):
+    """ Encodes @obj, which cbor2 can't encode as it is, with @encoder; see default(). """
+
+    encoder.encode(default(obj))
+
+    return
+
+
+def _exceeds(obj, limit):
+    """ Estimates whether the encoding of @obj is larger than @limit bytes. The estimate stops as
+    soon as it exceeds @limit, so large values aren't walked in full.
+
+    Args:
+        - obj (object): The value to estimate.
+        - limit (int): The size in bytes to compare against.
+
+    Returns:
+        bool: The return value.
+    """
+
+    size = 0
+    pending = [obj]
+    while pending:
+        item = pending.pop()
+        if isinstance(item, (str, bytes, bytearray)):
+            size += len(item)
+        elif isinstance(item, dict):
+            size += 6 * len(item)
+            if size <= limit:
+                pending.extend(item.keys())
+                pending.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            size += 2 * len(item)
+            if size <= limit:
+                pending.extend(item)
+        else:
+            size += 8
+        if size > limit:
+            return True
+
+    return False
+
+
+class Serializer():
+    """ This class encodes responses per the request's "Accept" header.
+
+    Args:
+        - offload_bytes (int): The approximate size in bytes above which a response is encoded in a
+        helper thread. Use None to always encode on the calling thread.
+    """
+
+    def __init__(self, offload_bytes=OFFLOAD_BYTES):
+
+        self.offload_bytes = offload_bytes
+        self._pool = None
+
+        # map each accepted media type to the media type that's sent.
+        self.media_types = {JSON: JSON, "application/*": JSON, "*/*": JSON}
+        if msgpack is not None:
+            self.media_types.update({MSGPACK: MSGPACK, "application/x-msgpack": MSGPACK,
+                                     "application/vnd.msgpack": MSGPACK})
+        if cbor2 is not None:
+            self.media_types[CBOR] = CBOR
+
+    def negotiate(self, accept):
+        """ Picks the media type to send per the value of an "Accept" header.
+
+        Args:
+            - accept (str): The value of the "Accept" header. Use None if there's no header.
+
+        Returns:
+            str: The return value.
+            The preferred media type that can be sent. If none of the accepted types can be sent,
+            JSON is returned.
+        """
+
+        if not accept:
+            return JSON
+
+        # sort the accepted media types by their quality, keeping their order for ties.
+        media_ranges = []
+        for position, media_range in enumerate(accept.split(",")):
+            params = media_range.split(";")
+            quality = 1.0
+            for param in params[1:]:
+                key, _, value = param.partition("=")
+                if key.strip() == "q":
+                    try:
+                        quality = float(value)
+                    except ValueError:
+                        quality = 0.0
+            if quality > 0:
+                media_ranges.append((-quality, position, params[0].strip().lower()))
+
+        for _, _, media_range in sorted(media_ranges):
+            if media_range in self.media_types:
+                return self.media_types[media_range]
+
+        return JSON
+
+    def encode(self, obj, media_type=JSON):
+        """ Encodes @obj as @media_type.
+
+        Args:
+            - obj (object): The value to encode.
+            - media_type (str): The media type to encode as; see self.negotiate().
+
+        Returns:
+            tuple: The return value.
+            The value of the "Content-Type" header and the encoded bytes. If @obj can't be encoded
+            as MessagePack or CBOR, it's encoded as JSON instead.
+        """
+
+        try:
+            if media_type == MSGPACK:
+                return CONTENT_TYPES[MSGPACK], msgpack.packb(
+                    obj, default=default, use_bin_type=True)
+            if media_type == CBOR:
+                return CONTENT_TYPES[CBOR], cbor2.dumps(obj, default=_encode_cbor_default)
+        except Exception:
+            # note: the exception types differ between versions of msgpack and cbor2, e.g. for
+            # datetimes without a timezone.
+            pass
+
+        return CONTENT_TYPES[JSON], _encode_json(obj)
+
+    def _iter_json(self, obj, depth=0):
+        """ Yields the JSON encoding of @obj in pieces of about @_PIECE_BYTES; see
+        self._encode_pieces(). The items of dicts and lists are encoded in batches whose size
+        adapts to the size of the items, and large items are split in turn. """
+
+        if depth >= _MAX_DEPTH or not isinstance(obj, (dict, list)) or not obj:
+            yield _encode_json(obj)
+            return
+
+        is_dict = isinstance(obj, dict)
+        items = iter(obj.items() if is_dict else obj)
+        separator = b"{" if is_dict else b"["
+        batch_size = 1
+
+        while True:
+            batch = list(itertools.islice(items, batch_size))
+            if not batch:
+                break
+
+            # split single items in case they're large; otherwise, encode the whole batch.
+            size = 0
+            if batch_size == 1:
+                value = batch[0]
+                if is_dict:
+                    # note: this encodes the key as the json module would, including the colon.
+                    key, value = value
+                    separator += _encode_json({key: None})[1:-5].rstrip()
+                yield separator
+                for piece in self._iter_json(value, depth + 1):
+                    size += len(piece)
+                    yield piece
+            else:
+                piece = _encode_json(dict(batch) if is_dict else batch)[1:-1]
+                size = len(piece)
+                yield separator + piece
+            separator = b","
+
+            # aim the next batch at @_PIECE_BYTES, growing it at most twofold. The values of small
+            # dicts, e.g. task metadata, vary in size, so they're always split one at a time.
+            if not is_dict or len(obj) > _SPLIT_KEYS:
+                batch_size = max(1, min(batch_size * 2, batch_size * _PIECE_BYTES // max(size, 1)))
+
+        yield b"}" if is_dict else b"]"
+
+    def _encode_pieces(self, obj, media_type, compress=None):
+        """ Encodes @obj as @media_type like self.encode() and then applies @compress, if any.
+        JSON is encoded in pieces so that other threads can run between them. """
+
+        if media_type != JSON:
+            content_type, data = self.encode(obj, media_type)
+        else:
+            content_type, data = CONTENT_TYPES[JSON], b"".join(self._iter_json(obj))
+
+        if compress is not None:
+            data = compress(data)
+
+        return content_type, data
+
+    def is_large(self, obj):
+        """ Returns True if @obj should be encoded with self.encode_async().
+
+        Args:
+            - obj (object): The value to encode.
+
+        Returns:
+            bool: The return value.
+        """
+
+        return self.offload_bytes is not None and _exceeds(obj, self.offload_bytes)
+
+    def encode_async(self, obj, media_type=JSON, compress=None):
+        """ Encodes @obj as @media_type in a helper thread; see self.encode().
+
+        Args:
+            - obj (object): The value to encode. It must not change until it's encoded.
+            - media_type (str): The media type to encode as.
+            - compress (function): The function with which to compress the encoded bytes in the
+            helper thread, too. Use None to skip compression.
+
+        Returns:
+            concurrent.futures.Future: The return value.
+            The future for the "Content-Type" header and the encoded bytes.
+        """
+
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=1)
+
+        return self._pool.submit(self._encode_pieces, obj, media_type, compress)
+
+    def close(self):
+        """ Stops the helper thread, if any.
+
+        Returns:
+            None
+        """
+
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+        return
+
+
+if __name__ == "__main__":
+    pass
@@ -3,28 +3,68 @@
 """ This module contains a function that handles all server endpoints. """
 
 # import modules.
+import asyncio
+import inspect
 import logging
 import os
-from . import dependency_error, log_manager
+import signal
+import sys
+from . import dependency_error, log_manager, supervisor, worker_local
+from .arg_schema import ArgSchema
+from .compression import COMPRESS_LEVEL, COMPRESS_MIN_BYTES, Compression
+from .coroutine_pool import CoroutinePool
+from .event_bus import EventBus
 from .handlers.api_handler import ApiHandler
+from .handlers.batch_handler import BatchHandler
+from .handlers.cancel_handler import CancelHandler
+from .handlers.events_handler import EventsHandler
 from .handlers.filesystem_handler import FilesystemHandler
 from .handlers.index_handler import IndexHandler
+from .handlers.result_handler import ResultHandler
 from .handlers.state_handler import StateHandler
 from .handlers.tasks_handler import TasksHandler
 from .handlers.websocket_handler import WebsocketHandler
+from .process_pool import ProcessPool, picklable_items
+from .remote_pool import RemotePool, parse_address
+from .request_body import MAX_BODY_BYTES
+from .result_cache import ResultCache
+from .result_files import ResultFiles, SPILL_BYTES
+from .serializer import OFFLOAD_BYTES, Serializer
+from .shared_state import SharedState
+from .task_coalescer import TaskCoalescer
+from .task_batches import TaskBatches
+from .task_canceller import TaskCanceller
+from .task_queue import TaskQueue
+from .task_registry import TaskRegistry
+from .task_store import TaskStore
+from .task_stream import RESULT_TAIL
+from .task_uploads import TaskUploads
 from concurrent.futures import ThreadPoolExecutor
-from tornado import ioloop, web
+from tornado import httpserver, ioloop, netutil, web
+
+# the default permissions of the Unix socket on which the server listens.
+UNIX_SOCKET_MODE = 0o600
 
 
 def serve(funk, server_name="servissimo", render_object=None, callback_arg=None, max_threads=None,
           socket_filters=None, port=8080, index_file=None, filesystem_path=None,
-          allow_websocket=False, allow_broadcasts=False, allow_get=False, *args, **kwargs):
-    """ Serves @funk at localhost:@port with the following endpoints:
+          allow_websocket=False, allow_broadcasts=False, allow_get=False, executor="thread",
+          max_queue=0, max_tasks=None, max_task_age=None, max_result_bytes=None, task_store=None,
+          max_coroutines=None, result_tail=RESULT_TAIL, task_timeout=None, cancel_arg=None,
+          worker_init=None, cache_size=None, cache_bytes=None, cache_ttl=None, cache=None,
+          coalesce=False, max_body_bytes=MAX_BODY_BYTES, result_dir=None, spill_bytes=SPILL_BYTES,
+          offload_bytes=OFFLOAD_BYTES, compress=False, compress_level=COMPRESS_LEVEL,
+          compress_min_bytes=COMPRESS_MIN_BYTES, processes=1, worker_address=None,
+          worker_key=None, unix_socket=None, unix_socket_mode=UNIX_SOCKET_MODE, *args, **kwargs):
+    """ Serves @funk at localhost:@port and/or at @unix_socket with the following endpoints:
 
             - "/": Provides a rendering of @index_file if it's not None.
             - "/api": Provides an interface to @funk.
+            - "/api/batch": Starts many tasks from a single request and reports their progress.
             - "/state": Provides metadata about the current application state.
             - "/tasks": Provides task metadata.
+            - "/events": Provides a stream of task lifecycle events.
+            - "/cancel": Cancels a queued or running task.
             - "/filesystem": Provides file/folder listings starting at @filesystem_path if it's not
             None.
             - "/websocket": Provides a websocket interface to send and receive logging statements if
@@ -38,11 +78,11 @@ def serve(funk, server_name="servissimo", render_object=None, callback_arg=None,
         - callback_arg (str): The name of the argument for @funk to which to pass back
         placissimo.server.serve()'s non-private local vars. Use None to omit passing anything back 
         to @funk.
-        - max_threads (int): The number of concurrent threads to support. If None, the value will be
-        based on your CPU per: https://docs.python.org/3/library/concurrent.futures.html#concurrent.futures.ThreadPoolExecutor.
+        - max_threads (int): The number of concurrent threads (or worker processes) to support. If
+        None, the value will be based on your CPU per: https://docs.python.org/3/library/concurrent.futures.html#concurrent.futures.ThreadPoolExecutor.
         - socket_filters (list): Logging filters to add to the websocket logger. Each item in the 
         list must be an instance of logging.Filter. Use None if no filters are needed.
-        - port (int): The port to use.
+        - port (int): The port to use. Use None to only listen on @unix_socket.
         - index_file (str): The path to the HTML file to render at the "/" endpoint. The HTML file
         supports templating per: https://www.tornadoweb.org/en/stable/template.html.
         - filesystem_path (str): The top-most directory for the "/filesystem" endpoint.
@@ -52,16 +92,108 @@ def serve(funk, server_name="servissimo", render_object=None, callback_arg=None,
         to be broadcast to all other connected clients.
         - allow_get (bool): Use True to allow GET access. Otherwise, use False to restrict access to 
         POST-only requests.
+        - executor (str): Use "thread" to run tasks in a thread pool. Use "process" to run tasks in
+        a pool of pre-forked worker processes; this requires @funk to be defined at the top level of
+        a module and its arguments and return values to be picklable. Use "remote" to run tasks in
+        standalone worker processes that connect to @worker_address; see
+        placissimo.lib.remote_pool. If @funk is a coroutine function, this is ignored and tasks
+        run on the server's IOLoop instead.
+        - max_queue (int): The number of tasks that may wait for a free thread (or worker process).
+        Once this many tasks are waiting, "/api" responds with a 429 and a "Retry-After" header.
+        - max_tasks (int): The number of tasks to keep in "/tasks". Once exceeded, the oldest
+        finished tasks are evicted. Use None for no limit.
+        - max_task_age (float): The number of seconds to keep a finished task in "/tasks". Use None
+        for no limit.
+        - max_result_bytes (int): The approximate total size in bytes of the task results to keep.
+        Once exceeded, the oldest finished tasks are evicted. Use None for no limit.
+        - task_store (str): The path to an SQLite database in which to keep task metadata and
+        results so that they survive restarts. It's created if it doesn't exist. Use None to keep
+        tasks in memory only.
+        - max_coroutines (int): The number of concurrent tasks to support if @funk is a coroutine
+        function. If None, placissimo.lib.coroutine_pool.MAX_COROUTINES is used.
+        - result_tail (int): The number of items to keep as a task's result if @funk is a generator
+        (or async generator) function. Items are streamed to clients that request
+        "/api?stream=1".
+        - task_timeout (float): The default number of seconds a task may run before it's
+        cancelled. Clients may pass a "timeout" argument to "/api" to override it. Use None for no
+        limit.
+        - cancel_arg (str): The name of the argument for @funk to which to pass a cancellation
+        token (a threading.Event) that's set once the task is cancelled or times out. Use None to
+        omit passing anything to @funk. This is ignored if @executor is "process" or "remote";
+        worker processes are stopped instead.
+        - worker_init (function): The function each worker thread (or process) calls once, before
+        its first task. It takes no arguments; its return value is available to @funk through
+        placissimo.worker_state(). With @executor "process", it must be defined at the top level
+        of a module. With @executor "remote", it's ignored; standalone workers call their own.
+        Use None to skip it.
+        - cache_size (int): The number of results to cache, keyed by the arguments sent to "/api".
+        Repeated calls with the same arguments are then answered from the cache without running
+        @funk. Use None to disable caching unless @cache is passed.
+        - cache_bytes (int): The approximate total size in bytes of the cached results. Use None
+        for no limit.
+        - cache_ttl (float): The number of seconds to keep a cached result. Use None for no limit.
+        - cache (placissimo.lib.result_cache.ResultCache): The cache to use instead of one created
+        from @cache_size, @cache_bytes, and @cache_ttl. Use None to create one only if @cache_size
+        is not None.
+        - coalesce (bool): Use True to let identical calls to "/api" share the work of a queued or
+        running task with the same arguments instead of starting a new task. Each call still gets
+        its own task identifier.
+        - max_body_bytes (int): The maximum size in bytes of a request body sent to "/api". Files
+        uploaded to "/api" are written to temporary files instead of being kept in memory. Use
+        None for Tornado's default.
+        - result_dir (str): The directory in which to write results whose JSON encoding is larger
+        than @spill_bytes instead of keeping them in memory. "/tasks" then refers to the file,
+        which is served by "/tasks/result". It's created if it doesn't exist. Use None to keep all
+        results in memory.
+        - spill_bytes (int): The size in bytes of the JSON encoding above which a result is written
+        to @result_dir.
+        - offload_bytes (int): The approximate size in bytes above which a response is encoded in a
+        helper thread instead of on the IOLoop. Use None to encode all responses on the IOLoop.
+        - compress (bool): Use True to compress responses with gzip (or with Zstandard or Brotli if
+        the "zstandard" or "brotli" module is installed) per the request's "Accept-Encoding"
+        header.
+        - compress_level (int): The compression level, from 1 (fastest) to 9 (smallest).
+        - compress_min_bytes (int): The size in bytes below which a response isn't compressed.
+        Streamed responses are always compressed. Use None to compress responses of any size.
+        - processes (int): The number of worker processes that serve @port. If it's more than 1,
+        the calling process forks the workers, restarts any that crash, and returns once they've
+        all stopped; the workers share the tasks in @task_store, so "/tasks" and "/state" are the
+        same whichever worker answers. Each worker has its own @max_threads and @max_queue.
+        - worker_address (str): The path of the Unix socket, or "host:port" of the TCP socket, to
+        which standalone workers connect if @executor is "remote". @max_threads is then the number
+        of tasks handed to workers at a time.
+        - worker_key (str): The key that standalone workers must know. This is required for a TCP
+        @worker_address. Use None to accept any worker on a Unix socket.
+        - unix_socket (str): The path of a Unix socket on which to serve the endpoints, alone or
+        alongside @port. An existing socket at the path is replaced. Use None to only listen on
+        @port.
+        - unix_socket_mode (int): The permissions of @unix_socket, e.g. 0o660 to let the server
+        user's group connect.
 
     Returns:
         None
 
     Raises:
-        - TypeError: If @funk is not callable, if @max_threads is not an int, if @socket_filters is 
-        not a list, if @port is not an int.
-        - ValueError: If @server_name contains non-letters or if @port is not between 5000 and 9999.
+        - TypeError: If @funk or @worker_init is not callable, if @cache is not a ResultCache, if
+        @max_threads or @max_coroutines is not an int, if
+        @socket_filters is not a list, if @port is not an int, if @unix_socket is not None or a
+        str, if @unix_socket_mode is not an int, if @max_queue or @result_tail is not an int, if
+        @compress_level or @processes is not an int, if a retention limit
+        (@max_tasks, @max_task_age, @max_result_bytes), @task_timeout, a cache limit (@cache_size,
+        @cache_bytes, @cache_ttl), @max_body_bytes, @spill_bytes, @offload_bytes, or
+        @compress_min_bytes is not None or a number.
+        - ValueError: If @server_name contains non-letters, if @port is not between 5000 and 9999,
+        if @unix_socket_mode is not between 0 and 0o777, if @unix_socket exists and is not a
+        socket, if @executor is not "thread", "process", or "remote", if @worker_address is
+        invalid, if @max_queue or @result_tail is negative, if @compress_level is not between 1
+        and 9, if @processes is less than 1, or if a retention limit, @task_timeout, a cache
+        limit, @max_body_bytes, @spill_bytes, @offload_bytes, or @compress_min_bytes is not
+        positive.
         - FileNotFoundError: If @index_file is not a file.
-        - dependency_error.DependencyError: If @allow_websocket is True and @index_file is None.
+        - dependency_error.DependencyError: If @allow_websocket is True and @index_file is None, or
+        if @processes is more than 1 and @task_store is None, or if @executor is "remote" and
+        @worker_address is None, @worker_key is None for a TCP @worker_address, or @processes is
+        more than 1, or if @unix_socket is not None on an operating system without Unix sockets.
         - NotADirectoryError: If @filesystem_path is not a directory.
     """
 
@@ -77,6 +209,20 @@ def serve(funk, server_name="servissimo", render_object=None, callback_arg=None,
         logger.error(msg)
         raise TypeError(msg)
 
+    # make sure @worker_init is None or a function.
+    if worker_init is not None and not callable(worker_init):
+        msg = "The type of @worker_init must be None or a function, not '{}'.".format(
+            worker_init.__class__.__name__)
+        logger.error(msg)
+        raise TypeError(msg)
+
+    # make sure @cache is None or a ResultCache.
+    if cache is not None and not isinstance(cache, ResultCache):
+        msg = "The type of @cache must be None or a ResultCache, not '{}'.".format(
+            cache.__class__.__name__)
+        logger.error(msg)
+        raise TypeError(msg)
+
     # make sure @server_name contains only letters.
     if not server_name.isalpha():
         msg = "The @server_name '{}' contains non-letter characters.".format(
@@ -91,6 +237,85 @@ def serve(funk, server_name="servissimo", render_object=None, callback_arg=None,
         logger.error(msg)
         raise TypeError(msg)
 
+    # make sure @max_coroutines is None or an int.
+    if max_coroutines is not None and not isinstance(max_coroutines, int):
+        msg = "The type of @max_coroutines must be None or an integer, not '{}'.".format(
+            max_coroutines.__class__.__name__)
+        logger.error(msg)
+        raise TypeError(msg)
+
+    # make sure @executor is supported.
+    if executor not in ["thread", "process", "remote"]:
+        msg = "The @executor value must be 'thread', 'process', or 'remote', not '{}'.".format(
+            executor)
+        logger.error(msg)
+        raise ValueError(msg)
+
+    # make sure @max_queue is a non-negative int.
+    if not isinstance(max_queue, int):
+        msg = "The type of @max_queue must be an integer, not '{}'.".format(
+            max_queue.__class__.__name__)
+        logger.error(msg)
+        raise TypeError(msg)
+    if max_queue < 0:
+        msg = "The @max_queue value must not be negative."
+        logger.error(msg)
+        raise ValueError(msg)
+
+    # make sure @result_tail is a non-negative int.
+    if not isinstance(result_tail, int):
+        msg = "The type of @result_tail must be an integer, not '{}'.".format(
+            result_tail.__class__.__name__)
+        logger.error(msg)
+        raise TypeError(msg)
+    if result_tail < 0:
+        msg = "The @result_tail value must not be negative."
+        logger.error(msg)
+        raise ValueError(msg)
+
+    # make sure @compress_level is an int between 1 and 9.
+    if isinstance(compress_level, bool) or not isinstance(compress_level, int):
+        msg = "The type of @compress_level must be an integer, not '{}'.".format(
+            compress_level.__class__.__name__)
+        logger.error(msg)
+        raise TypeError(msg)
+    if compress_level < 1 or compress_level > 9:
+        msg = "The @compress_level value must be between 1 and 9."
+        logger.error(msg)
+        raise ValueError(msg)
+
+    # make sure @processes is a positive int.
+    if isinstance(processes, bool) or not isinstance(processes, int):
+        msg = "The type of @processes must be an integer, not '{}'.".format(
+            processes.__class__.__name__)
+        logger.error(msg)
+        raise TypeError(msg)
+    if processes < 1:
+        msg = "The @processes value must be at least 1."
+        logger.error(msg)
+        raise ValueError(msg)
+
+    # make sure each retention limit, @task_timeout, each cache limit, @max_body_bytes,
+    # @spill_bytes, @offload_bytes, and @compress_min_bytes is None or a positive number.
+    retention_limits = {"max_tasks": max_tasks, "max_task_age": max_task_age,
+                        "max_result_bytes": max_result_bytes, "task_timeout": task_timeout,
+                        "cache_size": cache_size, "cache_bytes": cache_bytes,
+                        "cache_ttl": cache_ttl, "max_body_bytes": max_body_bytes,
+                        "spill_bytes": spill_bytes, "offload_bytes": offload_bytes,
+                        "compress_min_bytes": compress_min_bytes}
+    for limit_name, limit in retention_limits.items():
+        if limit is None:
+            continue
+        if isinstance(limit, bool) or not isinstance(limit, (int, float)):
+            msg = "The type of @{} must be None or a number, not '{}'.".format(
+                limit_name, limit.__class__.__name__)
+            logger.error(msg)
+            raise TypeError(msg)
+        if limit <= 0:
+            msg = "The @{} value must be positive.".format(limit_name)
+            logger.error(msg)
+            raise ValueError(msg)
+
     # make sure @socket_filters is a list.
     if socket_filters is not None and not isinstance(socket_filters, list):
         msg = "The type of @socket_filters must be a list, not '{}'.".format(
@@ -98,13 +323,34 @@ def serve(funk, server_name="servissimo", render_object=None, callback_arg=None,
         logger.error(msg)
         raise TypeError(msg)
 
-    # validate @port.
-    if not isinstance(port, int):
-        msg = "The port value must be an integer not: {}".format(type(port))
-        raise TypeError(msg)
-    if port < 5000 or port > 9999:
-        msg = "The port value must be an integer between 5000 and 9999."
-        raise ValueError(msg)
+    # validate @port; it may only be None if @unix_socket is used instead.
+    if port is not None or unix_socket is None:
+        if not isinstance(port, int):
+            msg = "The port value must be an integer not: {}".format(type(port))
+            raise TypeError(msg)
+        if port < 5000 or port > 9999:
+            msg = "The port value must be an integer between 5000 and 9999."
+            raise ValueError(msg)
+
+    # validate @unix_socket and @unix_socket_mode.
+    if unix_socket is not None:
+        if not isinstance(unix_socket, str):
+            msg = "The type of @unix_socket must be a str, not '{}'.".format(
+                unix_socket.__class__.__name__)
+            logger.error(msg)
+            raise TypeError(msg)
+        if not isinstance(unix_socket_mode, int) or isinstance(unix_socket_mode, bool):
+            msg = "The type of @unix_socket_mode must be an int, not '{}'.".format(
+                unix_socket_mode.__class__.__name__)
+            logger.error(msg)
+            raise TypeError(msg)
+        if unix_socket_mode < 0 or unix_socket_mode > 0o777:
+            msg = "The @unix_socket_mode value must be between 0 and 0o777."
+            logger.error(msg)
+            raise ValueError(msg)
+        if not hasattr(netutil, "bind_unix_socket"):
+            msg = "Unix sockets aren't supported on this operating system."
+            raise dependency_error.DependencyError(msg)
 
     # if needed, make sure @index_file exists.
     if index_file is not None:
@@ -125,17 +371,132 @@ def serve(funk, server_name="servissimo", render_object=None, callback_arg=None,
             msg = "Can't find directory: {}".format(filesystem_path)
             raise NotADirectoryError(msg)
 
+    # if several processes are requested, make sure they can share tasks through @task_store.
+    if processes > 1 and task_store is None:
+        msg = "A task store must be used if several processes are requested."
+        raise dependency_error.DependencyError(msg)
+
+    # if standalone workers are requested, make sure they can connect safely.
+    if executor == "remote":
+        if worker_address is None:
+            msg = "A worker address must be given for remote workers."
+            raise dependency_error.DependencyError(msg)
+        try:
+            _worker_address = parse_address(worker_address)
+        except ValueError as err:
+            logger.error(err)
+            raise
+        if not isinstance(_worker_address, str) and not worker_key:
+            msg = "A worker key must be given for remote workers that connect over TCP."
+            raise dependency_error.DependencyError(msg)
+        if processes > 1:
+            msg = "Remote workers can't be used if several processes are requested."
+            raise dependency_error.DependencyError(msg)
+
+    # if needed, recover the tasks left unfinished by an earlier server before any worker starts.
+    shared_state, worker_number = None, None
+    if processes > 1:
+        _store = TaskStore(task_store)
+        shared_state = SharedState(_store.recover()[0], processes)
+        _store.close()
+
+    # bind the listening sockets.
+    _sockets = netutil.bind_sockets(port) if port is not None else []
+    if unix_socket is not None:
+        try:
+            _sockets.append(netutil.bind_unix_socket(unix_socket, unix_socket_mode))
+        except ValueError:
+            msg = "Can't replace a file that isn't a socket: {}".format(unix_socket)
+            logger.error(msg)
+            for _socket in _sockets:
+                _socket.close()
+            raise ValueError(msg)
+    _addresses = ["localhost:{}".format(port)] if port is not None else []
+    _addresses += [unix_socket] if unix_socket is not None else []
+
+    def _close_sockets():
+        """ Closes the listening sockets and removes @unix_socket. """
+
+        for _socket in _sockets:
+            _socket.close()
+        if unix_socket is not None and os.path.exists(unix_socket):
+            os.remove(unix_socket)
+
+    # if needed, fork worker processes that share the listening sockets and task ids; this must
+    # happen before any IOLoop is created.
+    if processes > 1:
+
+        def _recover_worker(pid):
+            """ Marks the unfinished tasks of the crashed worker process @pid as done. """
+
+            _worker_store = TaskStore(task_store)
+            try:
+                _worker_store.recover(pid)
+            finally:
+                _worker_store.close()
+
+        logger.info("Starting {} worker processes at: {}".format(processes, _addresses))
+        worker_number = supervisor.fork_workers(processes, _recover_worker)
+        if worker_number is None:
+            _close_sockets()
+            return
+        shared_state.attach(worker_number)
+
     # set parameters to pass to other modules.
     thread_prefix = "{}_".format(server_name)
-    task_metadata = {}
-    futures_metadata = {}
-    thread_pool = ThreadPoolExecutor(max_workers=max_threads)
+    _store = TaskStore(task_store) if task_store is not None else None
+    result_files = None
+    if result_dir is not None:
+        result_files = ResultFiles(result_dir, spill_bytes or SPILL_BYTES)
+    task_metadata = TaskRegistry(thread_prefix, max_tasks, max_task_age, max_result_bytes, _store,
+                                 result_files, shared_state)
+    arg_schema = ArgSchema(funk, [callback_arg, cancel_arg])
+    is_async_generator = getattr(inspect, "isasyncgenfunction", lambda obj: False)(funk)
+    streamable = inspect.isgeneratorfunction(funk) or is_async_generator
+    task_streams = dict()
+    if asyncio.iscoroutinefunction(funk) or is_async_generator:
+        logger.info("Running coroutine function on the IOLoop instead of a {} pool.".format(
+            executor))
+        executor = "coroutine"
+        task_pool = CoroutinePool(funk, ioloop.IOLoop.current(), max_coroutines, task_streams,
+                                  worker_init)
+    elif executor == "process":
+        task_pool = ProcessPool(funk, max_threads, thread_prefix,
+                                streams=task_streams, worker_init=worker_init)
+    elif executor == "remote":
+        task_pool = RemotePool(funk, worker_address, worker_key, max_threads, thread_prefix,
+                               streams=task_streams)
+    else:
+        task_pool = ThreadPoolExecutor(max_workers=max_threads)
+    task_queue = TaskQueue(ioloop.IOLoop.current(),
+                           task_pool._max_workers, max_queue)
+    event_bus = EventBus(ioloop.IOLoop.current())
+    result_cache = cache
+    if result_cache is None and cache_size is not None:
+        result_cache = ResultCache(cache_size, cache_bytes, cache_ttl)
+    if result_cache is not None and streamable:
+        logger.warning("Results of generator functions aren't cached.")
+        result_cache = None
+    task_coalescer = TaskCoalescer() if coalesce and not streamable else None
+    if coalesce and streamable:
+        logger.warning("Calls to generator functions aren't coalesced.")
+    task_canceller = TaskCanceller(ioloop.IOLoop.current(), task_queue, task_pool, task_metadata,
+                                   event_bus, task_streams, task_timeout, task_coalescer)
+    task_batches = TaskBatches()
+    event_bus.subscribe(task_batches.on_event)
+    task_uploads = TaskUploads()
+    event_bus.subscribe(task_uploads.on_event)
+    serializer = Serializer(offload_bytes)
+    compression = Compression(compress_level, compress_min_bytes) if compress else None
     websocket_connections = list() if allow_websocket else None
 
     # update the root logger so that websocket connections can emit logging messages.
     log_manager.handle_sockets(
         websocket_connections, allow_broadcasts, socket_filters)
 
+    # update the root logger so that task progress reports reach "/events".
+    log_manager.handle_events(event_bus, thread_prefix)
+
     # prepare endpoints.
     _endpoint_list = []
     def get_endpoint_paths(): return [e[0] for e in sorted(_endpoint_list)]
@@ -147,11 +508,20 @@ def serve(funk, server_name="servissimo", render_object=None, callback_arg=None,
     for k, v in server_locals.items():
         logging.debug("* {} : {}".format(k, v))
 
+    # worker processes can only receive the picklable server arguments; these are found once,
+    # along with the pool, rather than for each task.
+    if callback_arg is not None and executor in ["process", "remote"]:
+        server_locals["worker_locals"] = picklable_items(server_locals)
+
     # set endpoints.
     _endpoint_list += [
         (r"/api", ApiHandler, server_locals),
+        (r"/api/batch", BatchHandler, server_locals),
         (r"/tasks", TasksHandler, server_locals),
+        (r"/tasks/result", ResultHandler, server_locals),
         (r"/state", StateHandler, server_locals),
+        (r"/events", EventsHandler, server_locals),
+        (r"/cancel", CancelHandler, server_locals),
     ]
 
     # if @index_file is not None, add an IndexHandler to @_endpoint_list.
@@ -174,11 +544,51 @@ def serve(funk, server_name="servissimo", render_object=None, callback_arg=None,
         _endpoint_list.append(websocket_handler)
 
     # create server.
-    logger.info("Creating server at 'localhost:{}' with endpoints: {}".format(port,
-                                                                              get_endpoint_paths()))
-    app = web.Application(_endpoint_list)
-    app.listen(port)
-    ioloop.IOLoop.instance().start()
+    logger.info("Creating server at {} with endpoints: {}".format(_addresses,
+                                                                  get_endpoint_paths()))
+    _transforms = [compression.transform] if compression is not None else []
+    app = web.Application(_endpoint_list, transforms=_transforms)
+    _http_server = httpserver.HTTPServer(app)
+    _http_server.add_sockets(_sockets)
+
+    # keep idle event streams open.
+    _heartbeat_callback = ioloop.PeriodicCallback(event_bus.heartbeat, 15000)
+    _heartbeat_callback.start()
+
+    # if needed, evict old tasks even while no new tasks finish.
+    if max_task_age is not None:
+        _evict_callback = ioloop.PeriodicCallback(
+            task_metadata.evict, min(max_task_age, 60) * 1000)
+        _evict_callback.start()
+
+    # if needed, cancel the tasks that other worker processes were asked to cancel, and stop
+    # gracefully once the supervisor asks.
+    if worker_number is not None:
+        def _cancel_requested():
+            """ Cancels this process's tasks that another process was asked to cancel. """
+            for name in task_metadata.cancel_requests():
+                task_canceller.cancel(name)
+        _cancel_callback = ioloop.PeriodicCallback(_cancel_requested, 1000)
+        _cancel_callback.start()
+
+        _loop = ioloop.IOLoop.current()
+        signal.signal(signal.SIGTERM,
+                      lambda signum, frame: _loop.add_callback_from_signal(_loop.stop))
+
+    try:
+        ioloop.IOLoop.instance().start()
+    finally:
+        task_pool.shutdown(wait=False)
+        worker_local.close_loops()
+        task_uploads.close()
+        serializer.close()
+        task_metadata.close()
+        if worker_number is None:
+            _close_sockets()
+
+    # workers exit here instead of returning to the caller, which is the supervisor's job.
+    if worker_number is not None:
+        sys.exit(0)
 
     return
 
@@ -0,0 +1,130 @@
+#!/usr/bin/python3
+
+""" This module contains a class that holds the counters shared by the worker processes of
+placissimo.server.serve() when it runs in several processes.
+
+The counters live in shared memory that's created before the processes are forked, so each task
+gets a unique identifier whichever process starts it, and every process reports the same revision
+and eviction counts for its task registry.
+
+Each process only changes its own slot of each counter and reads add up the slots, so no lock is
+shared between processes; a worker that dies can't leave the others waiting. Task identifiers are
+interleaved: with 4 slots, the process in slot 0 takes the 1st, 5th, 9th, ... identifier.
+"""
+
+# import modules.
+import multiprocessing
+import threading
+
+
+class SharedState():
+    """ This class holds counters in memory that's shared with forked processes. Create it before
+    forking and call attach() in each forked process.
+
+    Args:
+        - max_id (int): The highest task id that's already in use.
+        - slots (int): The number of processes that share the counters.
+    """
+
+    # the counters, in order of their position in each slot.
+    _fields = ("task_id", "revision", "max_tasks", "max_age", "max_result_bytes")
+
+    def __init__(self, max_id=0, slots=1):
+
+        self.max_id = max_id
+        self.slots = slots
+        self.slot = 0
+        self._lock = threading.Lock()
+        self._values = multiprocessing.RawArray("q", len(self._fields) * slots)
+
+    def attach(self, slot):
+        """ Makes the current process change the counters in @slot.
+
+        Args:
+            - slot (int): The slot from 0 to @self.slots - 1, e.g. the worker's number. A
+            restarted worker must reuse its slot.
+
+        Returns:
+            None
+        """
+
+        self.slot = slot
+
+        return
+
+    def _index(self, field, slot=None):
+        """ Returns the position of @field in @slot, or in @self.slot if @slot is None. """
+
+        slot = self.slot if slot is None else slot
+
+        return slot * len(self._fields) + self._fields.index(field)
+
+    def _add(self, field, count):
+        """ Adds @count to @field in @self.slot. """
+
+        # note: only threads of this process change the slot.
+        with self._lock:
+            self._values[self._index(field)] += count
+            return self._values[self._index(field)]
+
+    def _sum(self, field):
+        """ Returns the sum of @field over all slots. """
+
+        return sum(self._values[self._index(field, slot)] for slot in range(self.slots))
+
+    def next_id(self):
+        """ Returns a new, unique task id.
+
+        Returns:
+            int: The return value.
+        """
+
+        count = self._add("task_id", 1)
+
+        return self.max_id + self.slot + 1 + (count - 1) * self.slots
+
+    @property
+    def revision(self):
+        """ The number of changes to tasks in any process. """
+
+        return self._sum("revision")
+
+    def bump_revision(self):
+        """ Counts a change to a task.
+
+        Returns:
+            None
+        """
+
+        self._add("revision", 1)
+
+        return
+
+    def add_evicted(self, evicted):
+        """ Adds the number of evicted tasks per retention policy in @evicted to the shared counts.
+
+        Args:
+            - evicted (dict): The number of evicted tasks keyed by "max_tasks", "max_age", and
+            "max_result_bytes".
+
+        Returns:
+            None
+        """
+
+        for reason, count in evicted.items():
+            self._add(reason, count)
+
+        return
+
+    def eviction_counts(self):
+        """ Returns the number of evicted tasks per retention policy in all processes.
+
+        Returns:
+            dict: The return value.
+        """
+
+        return {reason: self._sum(reason) for reason in self._fields[2:]}
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,129 @@
+#!/usr/bin/python3
+
+""" This module contains a function that forks the worker processes of placissimo.server.serve(),
+or the standalone workers of placissimo.lib.remote_pool.run_workers(), and restarts the ones that
+crash.
+
+The process that calls fork_workers() becomes the supervisor; it only waits on its workers. A
+worker that exits with an error or is killed by a signal is started again. Once the supervisor
+receives SIGTERM or SIGINT, it sends SIGTERM to its workers and waits for them to stop instead.
+Workers ignore SIGINT so that pressing Ctrl+C stops them through the supervisor.
+"""
+
+# import modules.
+import logging
+import os
+import signal
+
+# the default number of times to restart crashed workers before giving up.
+MAX_RESTARTS = 100
+
+
+def _describe(status):
+    """ Returns a description of how a worker stopped per its wait @status. """
+
+    if os.WIFSIGNALED(status):
+        return "was killed by signal {}".format(os.WTERMSIG(status))
+
+    return "exited with status {}".format(os.WEXITSTATUS(status))
+
+
+def fork_workers(processes, on_crash=None, max_restarts=MAX_RESTARTS):
+    """ Forks @processes worker processes and supervises them until they all stop. No IOLoop may
+    be created before this is called.
+
+    Args:
+        - processes (int): The number of worker processes.
+        - on_crash (function): Called by the supervisor with the process id of a worker that
+        crashed, before the worker is restarted. Use None to skip it.
+        - max_restarts (int): The number of times to restart crashed workers. Use None for no
+        limit.
+
+    Returns:
+        int: The return value.
+        In each worker, the worker's number from 0 to @processes - 1; a restarted worker keeps its
+        number. In the supervisor, None once all workers have stopped.
+
+    Raises:
+        - RuntimeError: If workers crashed more than @max_restarts times. The remaining workers are
+        told to stop first.
+    """
+
+    # set logging.
+    logger = logging.getLogger(__name__)
+    logger.addHandler(logging.NullHandler())
+
+    workers = {}
+    stopping = False
+
+    def _stop(signum=None, frame=None):
+        """ Stops restarting workers and sends SIGTERM to each one. """
+
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
+
+    def _start(number):
+        """ Forks worker @number. Returns @number in the worker and None in the supervisor. """
+
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            return number
+        workers[pid] = number
+        logger.info("Started worker {} (pid {}).".format(number, pid))
+
+        return None
+
+    previous_handler = signal.signal(signal.SIGTERM, _stop)
+    try:
+        for number in range(processes):
+            if _start(number) is not None:
+                return number
+
+        restarts = 0
+        while workers:
+            try:
+                pid, status = os.wait()
+            except KeyboardInterrupt:
+                _stop()
+                continue
+            number = workers.pop(pid, None)
+            if number is None:
+                continue
+
+            if stopping or (os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0):
+                logger.info("Worker {} (pid {}) stopped.".format(number, pid))
+                continue
+
+            logger.warning("Worker {} (pid {}) {}.".format(number, pid, _describe(status)))
+            if on_crash is not None:
+                try:
+                    on_crash(pid)
+                except Exception as err:
+                    logger.error("Can't clean up after worker {}: {}".format(
+                        number, err.__repr__()))
+
+            restarts += 1
+            if max_restarts is not None and restarts > max_restarts:
+                msg = "Workers crashed more than {} times.".format(max_restarts)
+                logger.error(msg)
+                _stop()
+                raise RuntimeError(msg)
+
+            logger.info("Restarting worker {}.".format(number))
+            if _start(number) is not None:
+                return number
+    finally:
+        signal.signal(signal.SIGTERM, previous_handler)
+
+    return None
+
+
+if __name__ == "__main__":
+    pass
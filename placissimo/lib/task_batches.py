@@ -0,0 +1,135 @@
+#!/usr/bin/python3
+
+""" This module contains a class that tracks the progress of task batches submitted to
+"/api/batch" in placissimo.server.serve().
+
+Each batch keeps a running count of its tasks per state. The counts are updated from the task
+lifecycle events published by placissimo.lib.event_bus.EventBus, so a batch's status never requires
+a scan of its tasks.
+"""
+
+# import modules.
+import itertools
+from collections import OrderedDict
+from datetime import datetime
+
+# the number of recent batches to keep.
+BATCH_HISTORY = 1000
+
+# the batch state for each task lifecycle event.
+_EVENT_STATES = {"queued": "queued",
+                 "started": "running",
+                 "finished": "finished",
+                 "failed": "failed",
+                 "cancelled": "failed",
+                 "timed_out": "failed"}
+
+
+class TaskBatches():
+    """ This class tracks the progress of task batches. Its methods run on the server's IOLoop.
+
+    Args:
+        - history (int): The number of recent batches to keep. Once exceeded, the oldest batches
+        are forgotten; their tasks are still kept in "/tasks".
+    """
+
+    def __init__(self, history=BATCH_HISTORY):
+
+        self.history = history
+        self._batches = OrderedDict()
+        self._batch_of = {}
+        self._ids = itertools.count(1)
+
+    def add(self, names, rejected=0):
+        """ Adds a batch of tasks. Each task starts as queued until its events arrive.
+
+        Args:
+            - names (list): The thread names of the batch's tasks.
+            - rejected (int): The number of items that couldn't be admitted.
+
+        Returns:
+            str: The return value.
+            The batch identifier.
+        """
+
+        batch_id = "batch_{}".format(str(next(self._ids)).zfill(3))
+        self._batches[batch_id] = {"created": datetime.now().isoformat(),
+                                   "names": dict.fromkeys(names, "queued"),
+                                   "counts": {"queued": len(names), "running": 0,
+                                              "finished": 0, "failed": 0},
+                                   "rejected": rejected}
+        for name in names:
+            self._batch_of[name] = batch_id
+
+        # forget the oldest batches.
+        while len(self._batches) > self.history:
+            _, batch = self._batches.popitem(last=False)
+            for name in batch["names"]:
+                self._batch_of.pop(name, None)
+
+        return batch_id
+
+    def on_event(self, item):
+        """ Updates the counts of the batch, if any, to which an event's task belongs. This is
+        subscribed to placissimo.lib.event_bus.EventBus.
+
+        Args:
+            - item (tuple): The event id, event type, thread name, and JSON payload, or None for a
+            heartbeat.
+
+        Returns:
+            None
+        """
+
+        if item is None:
+            return
+
+        _, event, thread_name, _ = item
+        batch_id = self._batch_of.get(thread_name)
+        state = _EVENT_STATES.get(event)
+        if batch_id is None or state is None:
+            return
+
+        # move the task to its new state, unless it's already done.
+        batch = self._batches[batch_id]
+        previous = batch["names"][thread_name]
+        if previous in ["finished", "failed"] or previous == state:
+            return
+        batch["names"][thread_name] = state
+        batch["counts"][previous] -= 1
+        batch["counts"][state] += 1
+
+        return
+
+    def status(self, batch_id):
+        """ Returns the progress of the batch @batch_id.
+
+        Args:
+            - batch_id (str): The batch identifier.
+
+        Returns:
+            dict: The return value.
+            The batch's creation time, its number of tasks in total and per state, and the number
+            of rejected items. If the batch doesn't exist, None is returned.
+        """
+
+        batch = self._batches.get(batch_id)
+        if batch is None:
+            return None
+
+        counts = batch["counts"]
+        total = len(batch["names"])
+        finished = counts["finished"] + counts["failed"]
+
+        return {"created": batch["created"],
+                "total": total,
+                "queued": counts["queued"],
+                "running": counts["running"],
+                "finished": counts["finished"],
+                "failed": counts["failed"],
+                "rejected": batch["rejected"],
+                "done": finished == total}
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,21 @@
+#!/usr/bin/python3
+
+""" This module contains a custom exception class for tasks that are cancelled or that run past
+their deadline. """
+
+
+class TaskCancelledError(Exception):
+    """ A custom exception class for tasks that are cancelled or that run past their deadline.
+
+    Args:
+        - reason (str): Either "cancelled" or "timed_out".
+    """
+
+    def __init__(self, reason):
+
+        super().__init__(reason)
+        self.reason = reason
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,188 @@
+#!/usr/bin/python3
+
+""" This module contains a class that cancels tasks started by placissimo.server.serve(), either on
+request or once their deadline passes.
+
+How a task is stopped depends on where it is:
+
+    - Queued tasks are dropped right away.
+    - Tasks in a pool that can stop them (worker processes, coroutines) are stopped by the pool.
+    Worker processes are terminated and replaced.
+    - Tasks in a thread pool can't be interrupted. Instead, their cancellation token is set and
+    the user function is expected to check it. The task's worker slot is only freed once the
+    function returns.
+
+In all cases, the task is marked as done right away with a
+placissimo.lib.task_cancelled_error.TaskCancelledError. If other tasks share the task's work (see
+placissimo.lib.task_coalescer.TaskCoalescer), the work is only stopped once the last of them is
+cancelled.
+"""
+
+# import modules.
+import logging
+import threading
+from .task_cancelled_error import TaskCancelledError
+
+
+class TaskCanceller():
+    """ This class cancels tasks started by placissimo.server.serve(). """
+
+    def __init__(self, io_loop, task_queue, task_pool, task_metadata, event_bus, task_streams,
+                 timeout=None, task_coalescer=None):
+        """ Sets instance attributes.
+
+        Args:
+            - io_loop (tornado.ioloop.IOLoop): The server's IOLoop. Deadlines are enforced on it.
+            - task_queue (placissimo.lib.task_queue.TaskQueue): The queue that admits tasks.
+            - task_pool (concurrent.futures.Executor): The pool that runs tasks.
+            - task_metadata (placissimo.lib.task_registry.TaskRegistry): The task registry.
+            - event_bus (placissimo.lib.event_bus.EventBus): The bus on which to publish the
+            "cancelled" and "timed_out" events.
+            - task_streams (dict): The placissimo.lib.task_stream.TaskStream for each streaming
+            task, keyed by thread name.
+            - timeout (float): The default number of seconds a task may run. Use None for no limit.
+            - task_coalescer (placissimo.lib.task_coalescer.TaskCoalescer): The tracker of tasks
+            that share their work, if any. A cancelled task's work is only stopped once no other
+            task shares it; tasks that share a timed out task's work time out with it.
+        """
+
+        # set logging.
+        self.logger = logging.getLogger(__name__)
+        self.logger.addHandler(logging.NullHandler())
+
+        # set attributes.
+        self.io_loop = io_loop
+        self.task_queue = task_queue
+        self.task_pool = task_pool
+        self.task_metadata = task_metadata
+        self.event_bus = event_bus
+        self.task_streams = task_streams
+        self.timeout = timeout
+        self.task_coalescer = task_coalescer
+        self._tokens = {}
+        self._deadlines = {}
+
+    def token(self, thread_name):
+        """ Returns the cancellation token for the task @thread_name, creating it if needed.
+
+        Args:
+            - thread_name (str): The unique thread name for a given task.
+
+        Returns:
+            threading.Event: The return value.
+            The token; it's set once the task is cancelled or times out.
+        """
+
+        return self._tokens.setdefault(thread_name, threading.Event())
+
+    def start_deadline(self, thread_name, timeout=None):
+        """ Cancels the task @thread_name with the reason "timed_out" once it has run for @timeout
+        seconds. Call this on @self.io_loop once the task starts.
+
+        Args:
+            - thread_name (str): The unique thread name for a given task.
+            - timeout (float): The number of seconds the task may run. If None, @self.timeout is
+            used.
+
+        Returns:
+            None
+        """
+
+        timeout = timeout or self.timeout
+        if timeout is None:
+            return
+
+        self._deadlines[thread_name] = self.io_loop.call_later(
+            timeout, self.cancel, thread_name, "timed_out")
+
+        return
+
+    def _clear_deadline(self, thread_name):
+        """ Removes the deadline for @thread_name, if any. This runs on @self.io_loop. """
+
+        deadline = self._deadlines.pop(thread_name, None)
+        if deadline is not None:
+            self.io_loop.remove_timeout(deadline)
+
+        return
+
+    def finish(self, thread_name):
+        """ Forgets the token and deadline for the finished task @thread_name. This is thread-safe.
+
+        Args:
+            - thread_name (str): The unique thread name for a given task.
+
+        Returns:
+            None
+        """
+
+        self._tokens.pop(thread_name, None)
+        self.io_loop.add_callback(self._clear_deadline, thread_name)
+
+        return
+
+    def cancel(self, thread_name, reason="cancelled"):
+        """ Cancels the queued or running task @thread_name. Call this on @self.io_loop.
+
+        Args:
+            - thread_name (str): The unique thread name for a given task.
+            - reason (str): Either "cancelled" or "timed_out".
+
+        Returns:
+            dict: The return value.
+            The metadata for the cancelled task, or None if the task doesn't exist or is already
+            done.
+        """
+
+        # mark the task as done; its result, if it still returns one, is ignored.
+        error = TaskCancelledError(reason)
+        task_data = self.task_metadata.finish(thread_name, exception=error.__repr__())
+        if task_data is not None:
+            self.logger.info("Task {}: {}".format(reason.replace("_", " "), thread_name))
+            self.event_bus.publish(reason, thread_name, task_data)
+
+            # end the task's stream, if any.
+            task_stream = self.task_streams.get(thread_name)
+            if task_stream is not None:
+                task_stream.close()
+
+        # a cancelled task whose work is shared with other tasks only stops sharing it; the work
+        # is stopped once no task shares it anymore. A task that times out takes the tasks that
+        # share its work with it.
+        # note: a detached leader is already done when it times out.
+        if self.task_coalescer is not None:
+            if reason == "cancelled":
+                if task_data is None:
+                    return None
+                thread_name = self.task_coalescer.leave(thread_name)
+                if thread_name is None:
+                    return task_data
+            else:
+                followers = self.task_coalescer.finish(thread_name)
+                for follower in followers:
+                    self.cancel(follower, reason)
+                if task_data is None and not followers:
+                    return None
+        elif task_data is None:
+            return None
+        self._clear_deadline(thread_name)
+
+        # drop the task if it's queued; it doesn't hold a worker slot yet.
+        if self.task_queue.cancel(thread_name):
+            self.task_streams.pop(thread_name, None)
+            self._tokens.pop(thread_name, None)
+            return task_data
+
+        # otherwise, stop the task; its worker slot is freed by ApiHandler._update_task().
+        # note: tasks in a thread pool only stop if they check their token.
+        token = self._tokens.get(thread_name)
+        if token is not None:
+            token.set()
+        if hasattr(self.task_pool, "cancel"):
+            self.task_pool.cancel(thread_name, error)
+
+        return task_data
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,141 @@
+#!/usr/bin/python3
+
+""" This module contains a class that lets identical "/api" calls share a single task in
+placissimo.server.serve().
+
+While a task is queued or running, later calls with the same arguments don't start a new task.
+Instead, each one gets a task of its own that follows the first one (the leader) and finishes with
+the leader's result.
+
+Cancelling a task only stops the shared work once no other task shares it. A cancelled leader
+whose work is still shared is detached: its work goes on for its followers, new calls no longer
+follow it, and it's stopped once the last of its followers is cancelled too.
+"""
+
+# import modules.
+import threading
+
+
+class TaskCoalescer():
+    """ This class tracks queued and running tasks by their arguments so that identical calls can
+    share them. """
+
+    def __init__(self):
+
+        self.coalesced = 0
+        self._leaders = {}
+        self._keys = {}
+        self._followers = {}
+        self._detached = set()
+        self._leader_of = {}
+        self._lock = threading.Lock()
+
+    def join(self, key, thread_name):
+        """ Makes the task @thread_name follow the queued or running task with the same @key. If
+        there's none, @thread_name becomes the leader for @key.
+
+        Args:
+            - key (tuple): The task's arguments as returned by
+            placissimo.lib.result_cache.ResultCache.key().
+            - thread_name (str): The unique thread name for the new task.
+
+        Returns:
+            str: The return value.
+            The thread name of the leader to follow, or None if @thread_name is the new leader.
+        """
+
+        with self._lock:
+            leader = self._leaders.get(key)
+            if leader is None:
+                self._leaders[key] = thread_name
+                self._keys[thread_name] = key
+                self._followers[thread_name] = []
+                return None
+
+            self._followers[leader].append(thread_name)
+            self._leader_of[thread_name] = leader
+            self.coalesced += 1
+            return leader
+
+    def leave(self, thread_name):
+        """ Stops the cancelled task @thread_name from sharing work with other tasks. This is
+        thread-safe.
+
+        Args:
+            - thread_name (str): The thread name of a leading or following task.
+
+        Returns:
+            str: The return value.
+            The thread name of the task whose work is no longer shared and should be stopped, or
+            None if other tasks still share it. A leader that still has followers is detached
+            instead of stopped. If @thread_name doesn't share any work, it's returned as is.
+        """
+
+        with self._lock:
+
+            # if @thread_name leads other tasks, keep its work going for them.
+            if self._followers.get(thread_name):
+                del self._leaders[self._keys.pop(thread_name)]
+                self._detached.add(thread_name)
+                return None
+
+            # if @thread_name follows a detached leader, stop the leader's work once it's the
+            # last follower.
+            leader = self._leader_of.pop(thread_name, None)
+            if leader is not None:
+                followers = self._followers[leader]
+                followers.remove(thread_name)
+                if followers or leader not in self._detached:
+                    return None
+                thread_name = leader
+
+            # stop tracking the task whose work is stopped.
+            self._forget(thread_name)
+            return thread_name
+
+    def followers(self, leader):
+        """ Returns the thread names of the tasks that currently follow @leader.
+
+        Args:
+            - leader (str): The thread name of a leading task.
+
+        Returns:
+            list: The return value.
+        """
+
+        with self._lock:
+            return list(self._followers.get(leader, []))
+
+    def finish(self, leader):
+        """ Stops new tasks from following @leader, e.g. because it's done or cancelled. This is
+        thread-safe.
+
+        Args:
+            - leader (str): The thread name of a leading task.
+
+        Returns:
+            list: The return value.
+            The thread names of the tasks that followed @leader. If @leader isn't a leader (or was
+            already finished), an empty list is returned.
+        """
+
+        with self._lock:
+            return self._forget(leader)
+
+    def _forget(self, leader):
+        """ Stops tracking @leader and returns its followers. Call this while holding
+        @self._lock. """
+
+        key = self._keys.pop(leader, None)
+        if key is not None:
+            del self._leaders[key]
+        self._detached.discard(leader)
+        followers = self._followers.pop(leader, [])
+        for follower in followers:
+            del self._leader_of[follower]
+
+        return followers
+
+
+if __name__ == "__main__":
+    pass
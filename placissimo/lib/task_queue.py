@@ -0,0 +1,244 @@
+#!/usr/bin/python3
+
+""" This module contains a class that admits tasks to the task pool in placissimo.server.serve().
+
+Tasks start right away while there are free workers. Otherwise, they wait in a bounded queue until a
+worker is released. Once the queue is full, new tasks are rejected with an estimate of when to
+retry.
+
+Queued tasks start in order of priority, highest first. Within a priority, clients take turns so
+that one client that sends many tasks can't starve the others; each client's own tasks start first
+in, first out.
+"""
+
+# import modules.
+import logging
+import math
+import threading
+import time
+from .queue_full_error import QueueFullError
+from collections import OrderedDict, deque
+
+
+class TaskQueue():
+    """ This class admits tasks to the task pool in placissimo.server.serve(). """
+
+    def __init__(self, io_loop, max_workers, max_queue=0, history=20):
+        """ Sets instance attributes.
+
+        Args:
+            - io_loop (tornado.ioloop.IOLoop): The server's IOLoop. Queued tasks are started on it.
+            - max_workers (int): The number of tasks that may run at the same time.
+            - max_queue (int): The number of tasks that may wait for a free worker.
+            - history (int): The number of recent task durations used to estimate retry times.
+        """
+
+        # set logging.
+        self.logger = logging.getLogger(__name__)
+        self.logger.addHandler(logging.NullHandler())
+
+        # set attributes.
+        self.io_loop = io_loop
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.pending = {}
+        self.depth = 0
+        self.running = 0
+        self.durations = deque(maxlen=history)
+        self._start_times = {}
+        self._client_depths = {}
+        self._lock = threading.Lock()
+
+    def _retry_after(self):
+        """ Estimates the number of seconds until a new task could be admitted. Call this only
+        while holding @self._lock.
+
+        Returns:
+            int: The return value.
+        """
+
+        if not self.durations:
+            return 1
+
+        # assume each queued task (plus the new one) takes the average recent duration and that
+        # all workers drain the queue in parallel.
+        average = sum(self.durations) / len(self.durations)
+        estimate = average * (self.depth + 1) / self.max_workers
+
+        return max(1, math.ceil(estimate))
+
+    def _start(self, thread_name, start_funk):
+        """ Calls @start_funk() for @thread_name and records its start time. If @start_funk()
+        fails, the worker slot is released. """
+
+        self._start_times[thread_name] = time.monotonic()
+        try:
+            start_funk()
+        except Exception:
+            self.release(thread_name)
+            raise
+
+        return
+
+    def _push(self, thread_name, start_funk, priority, client):
+        """ Adds a task to the end of @client's queue for @priority. Call this only while holding
+        @self._lock. """
+
+        clients = self.pending.setdefault(priority, OrderedDict())
+        clients.setdefault(client, deque()).append((thread_name, start_funk))
+        self.depth += 1
+        self._client_depths[client] = self._client_depths.get(client, 0) + 1
+
+        return
+
+    def _remove(self, priority, client, position=0):
+        """ Removes and returns the task at @position in @client's queue for @priority, dropping
+        the queue once it's empty. Call this only while holding @self._lock.
+
+        Returns:
+            tuple: The return value.
+            The task's thread name and start function.
+        """
+
+        clients = self.pending[priority]
+        tasks = clients[client]
+        task = tasks[position]
+        del tasks[position]
+        if not tasks:
+            del clients[client]
+            if not clients:
+                del self.pending[priority]
+
+        self.depth -= 1
+        self._client_depths[client] -= 1
+        if not self._client_depths[client]:
+            del self._client_depths[client]
+
+        return task
+
+    def _pop(self):
+        """ Removes and returns the next task to start: the oldest task of the next client in turn
+        within the highest priority. Call this only while holding @self._lock.
+
+        Returns:
+            tuple: The return value.
+            The task's thread name and start function.
+        """
+
+        priority = max(self.pending)
+        clients = self.pending[priority]
+        client = next(iter(clients))
+
+        # move @client to the back of the line for its next task.
+        clients.move_to_end(client)
+
+        return self._remove(priority, client)
+
+    def _start_pending(self):
+        """ Starts queued tasks while there are free workers. This runs on @self.io_loop. """
+
+        while True:
+            with self._lock:
+                if not self.pending or self.running >= self.max_workers:
+                    return
+                thread_name, start_funk = self._pop()
+                self.running += 1
+
+            self.logger.info(
+                "Starting queued task: {}".format(thread_name))
+            try:
+                self._start(thread_name, start_funk)
+            except Exception as err:
+                self.logger.error(
+                    "Can't start queued task '{}': {}".format(thread_name, err.__repr__()))
+
+    def admit(self, thread_name, start_funk, priority=0, client=None):
+        """ Starts a task now if a worker is free, otherwise adds it to the queue.
+
+        Args:
+            - thread_name (str): The unique thread name for a given task.
+            - start_funk (function): The function that submits the task to the task pool. It takes
+            no arguments.
+            - priority (int): The task's priority. Queued tasks with a higher priority start first.
+            - client (str): The key of the client that sent the task, e.g. its IP address.
+
+        Returns:
+            bool: The return value.
+            True if the task started right away. False if it was queued.
+
+        Raises:
+            - QueueFullError: If all workers are busy and the queue is full.
+        """
+
+        with self._lock:
+            if self.running < self.max_workers and not self.pending:
+                self.running += 1
+                start_now = True
+            elif self.depth < self.max_queue:
+                self._push(thread_name, start_funk, priority, client)
+                start_now = False
+            else:
+                msg = "Can't add task; already running {} maximum threads with {} queued.".format(
+                    self.max_workers, self.depth)
+                raise QueueFullError(msg, self._retry_after())
+
+        if start_now:
+            self._start(thread_name, start_funk)
+
+        return start_now
+
+    def cancel(self, thread_name):
+        """ Removes @thread_name from the queue if it hasn't started yet.
+
+        Args:
+            - thread_name (str): The unique thread name for a given task.
+
+        Returns:
+            bool: The return value.
+            True if the task was removed. False if it isn't queued.
+        """
+
+        with self._lock:
+            for priority, clients in self.pending.items():
+                for client, tasks in clients.items():
+                    for position, (name, _) in enumerate(tasks):
+                        if name == thread_name:
+                            self._remove(priority, client, position)
+                            return True
+
+        return False
+
+    def client_depths(self):
+        """ Returns the number of queued tasks per client.
+
+        Returns:
+            dict: The return value.
+        """
+
+        with self._lock:
+            return dict(self._client_depths)
+
+    def release(self, thread_name):
+        """ Frees the worker slot held by @thread_name and schedules any queued tasks to start.
+        This is safe to call from any thread.
+
+        Args:
+            - thread_name (str): The unique thread name for a finished task.
+
+        Returns:
+            None
+        """
+
+        with self._lock:
+            start_time = self._start_times.pop(thread_name, None)
+            if start_time is not None:
+                self.durations.append(time.monotonic() - start_time)
+            self.running -= 1
+
+        self.io_loop.add_callback(self._start_pending)
+
+        return
+
+
+if __name__ == "__main__":
+    pass
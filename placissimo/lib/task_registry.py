@@ -0,0 +1,872 @@
+#!/usr/bin/python3
+
+""" This module contains a thread-safe registry of task metadata for placissimo.server.serve().
+
+The registry is read like a dict that maps each task's thread name to a dict of its metadata. Each
+read returns a snapshot, so callers never see a task while a worker thread is updating it.
+
+Finished tasks can be evicted by count, by age, or by the total size of their results. Queued and
+running tasks are never evicted.
+
+If a task store is used, each change is also written to the store and finished tasks are dropped
+from memory once they're saved. Reads then fall back to the store.
+
+Tasks in memory are indexed by state and start time so that filtered, paginated queries don't have
+to scan every task.
+
+Each change to a task bumps the registry's revision. Clients that pass back the last revision they
+saw only receive the tasks that changed since then.
+
+Registries in several processes can share a task store along with a
+placissimo.lib.shared_state.SharedState. Task ids, the revision, and the task and eviction counts
+are then the same in every process. Changes since a revision aren't known across processes, so
+clients must reload all tasks instead.
+"""
+
+# import modules.
+import bisect
+import itertools
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from datetime import datetime
+
+
+class TaskRecord():
+    """ This class holds the metadata for a single task. """
+
+    __slots__ = ("task_id", "name", "caller", "start_time", "end_time", "state", "result",
+                 "exception", "cached", "coalesced_with", "result_file", "future",
+                 "pending_writes")
+
+    def __init__(self, task_id, name, caller):
+
+        self.task_id = task_id
+        self.name = name
+        self.caller = caller
+        self.start_time = datetime.now().isoformat()
+        self.end_time = None
+        self.state = "queued"
+        self.result = None
+        self.exception = None
+        self.cached = False
+        self.coalesced_with = None
+        self.result_file = None
+        self.future = None
+        self.pending_writes = 0
+
+    def to_dict(self):
+        """ Returns the task's metadata as a dict. The "end_time", "result", and "exception" keys
+        are only included once the task is done. The "cached" key is only included if the result
+        came from a cache, the "coalesced_with" key only if the task shares another task's work,
+        and the "result_file" key only if the result was written to a file instead. """
+
+        done = self.state == "done"
+        task_data = {"caller": self.caller,
+                     "start_time": self.start_time,
+                     "state": self.state,
+                     "running": self.state == "running",
+                     "done": done}
+        if done:
+            task_data.update(end_time=self.end_time, result=self.result,
+                             exception=self.exception)
+        if self.cached:
+            task_data["cached"] = True
+        if self.coalesced_with is not None:
+            task_data["coalesced_with"] = self.coalesced_with
+        if done and self.result_file is not None:
+            task_data["result_file"] = self.result_file
+
+        return task_data
+
+
+class TaskRegistry(Mapping):
+    """ This class is a thread-safe registry of task metadata. It keeps a running count of tasks
+    per state so that the counts never require a scan of all tasks.
+
+    Args:
+        - thread_prefix (str): The prefix for each task's thread name.
+        - max_tasks (int): The number of tasks to keep. Once exceeded, the oldest finished tasks are
+        evicted. Use None for no limit.
+        - max_age (float): The number of seconds to keep a finished task. Use None for no limit.
+        - max_result_bytes (int): The total, approximate size in bytes of the results to keep. Once
+        exceeded, the oldest finished tasks are evicted. Use None for no limit.
+        - store (placissimo.lib.task_store.TaskStore): The store in which to persist tasks. Use
+        None to keep tasks in memory only.
+        - result_files (placissimo.lib.result_files.ResultFiles): The files to which large results
+        are written. The file of an evicted task is deleted. Use None if results aren't written to
+        files.
+        - shared (placissimo.lib.shared_state.SharedState): The counters shared with registries in
+        other processes. This requires @store, which the first process must have recovered. Use
+        None if the registry isn't shared.
+    """
+
+    states = ("queued", "running", "done")
+    filters = ("queued", "running", "done", "failed")
+
+    # the number of task changes to remember for changes(); older revisions must reload all tasks.
+    max_changes = 10000
+
+    def __init__(self, thread_prefix, max_tasks=None, max_age=None, max_result_bytes=None,
+                 store=None, result_files=None, shared=None):
+
+        self.thread_prefix = thread_prefix
+        self.max_tasks = max_tasks
+        self.max_age = max_age
+        self.max_result_bytes = max_result_bytes
+        self.result_files = result_files
+        self.shared = shared
+        self.evicted = {"max_tasks": 0, "max_age": 0, "max_result_bytes": 0}
+        self.result_bytes = 0
+        self._records = OrderedDict()
+        self._futures = {}
+        self._finished = OrderedDict()
+        self._counts = dict.fromkeys(self.states, 0)
+        self._ids = itertools.count(1)
+        self._lock = threading.RLock()
+
+        # set indexes: task ids in ascending order, overall and per state filter.
+        self._order = []
+        self._start_times = []
+        self._names_by_id = {}
+        self._index = {state: [] for state in self.filters}
+
+        # set the change log: thread names in order of their last change, with its revision.
+        self._revision = 0
+        self._changes = OrderedDict()
+        self._changes_floor = 0
+
+        # if needed, continue from the tasks already in @store.
+        self.store = store
+        if store is not None:
+            store.on_flush, store.on_evict = self._on_flush, self._on_evict
+            if shared is None:
+                max_id, counts = store.recover()
+                self._ids = itertools.count(max_id + 1)
+                self._counts["done"] = counts.get("done", 0)
+
+    def __getitem__(self, name):
+        """ Returns a snapshot of the metadata dict for the task @name. """
+
+        with self._lock:
+            if name in self._records:
+                return self._records[name].to_dict()
+
+        task_data = self.store.get(name) if self.store is not None else None
+        if task_data is None:
+            raise KeyError(name)
+
+        return task_data
+
+    def __iter__(self):
+        """ Iterates over a snapshot of the thread names. """
+
+        names = self.store.names() if self.store is not None else []
+        with self._lock:
+            stored = set(names)
+            names += [name for name in self._records if name not in stored]
+
+        return iter(names)
+
+    def __len__(self):
+
+        return sum(self.counts().values())
+
+    def __contains__(self, name):
+
+        if name in self._records:
+            return True
+
+        return self.store is not None and self.store.contains(name)
+
+    def _persist(self, record, encoded=None):
+        """ Queues a write of @record to @self.store, if any. Call this only while holding
+        @self._lock. If @record is done, @encoded is its result as returned by
+        @self.store.encode_result(); see self._encode(). """
+
+        if self.store is not None:
+            record.pending_writes += 1
+            self.store.write(record.task_id, record, encoded)
+
+        return
+
+    def _on_flush(self, names):
+        """ Drops finished tasks from memory once all of their writes are saved. This is called by
+        @self.store on its writer thread with one name per saved write. """
+
+        with self._lock:
+            for name in names:
+                record = self._records.get(name)
+                if record is None:
+                    continue
+                record.pending_writes -= 1
+                if record.state == "done" and record.pending_writes == 0:
+                    del self._records[name]
+                    self._index_remove(record)
+
+        # let other processes know that the stored tasks changed.
+        if self.shared is not None:
+            self.shared.bump_revision()
+
+        return
+
+    def _on_evict(self, evicted, names):
+        """ Updates the eviction and state counts after @self.store evicted the finished tasks
+        @names. This is called by @self.store on its writer thread. """
+
+        with self._lock:
+            for reason, count in evicted.items():
+                self.evicted[reason] += count
+                self._counts["done"] -= count
+            for name in names:
+                self._touch(name)
+        if self.shared is not None:
+            self.shared.add_evicted(evicted)
+
+        # delete the result files of the evicted tasks.
+        if self.result_files is not None:
+            for name in names:
+                self.result_files.remove(name)
+
+        return
+
+    @property
+    def revision(self):
+        """ The revision of the last change to any task. """
+
+        if self.shared is not None:
+            return self.shared.revision
+
+        return self._revision
+
+    def _touch(self, name):
+        """ Bumps @self.revision and logs it as the last change to the task @name. Call this only
+        while holding @self._lock. """
+
+        self._revision += 1
+        self._changes.pop(name, None)
+        self._changes[name] = self._revision
+        if self.shared is not None:
+            self.shared.bump_revision()
+
+        # forget the oldest changes; clients that haven't seen them must reload all tasks.
+        while len(self._changes) > self.max_changes:
+            _, self._changes_floor = self._changes.popitem(last=False)
+
+        return
+
+    def _index_keys(self, record):
+        """ Returns the state filters under which @record is indexed. """
+
+        if record.state == "done" and record.exception is not None:
+            return (record.state, "failed")
+
+        return (record.state,)
+
+    def _index_add(self, record):
+        """ Adds a new @record to the indexes. Call this only while holding @self._lock. """
+
+        # new records almost always have the highest id, so this is usually an append.
+        position = bisect.bisect_left(self._order, record.task_id)
+        self._order.insert(position, record.task_id)
+        self._start_times.insert(position, record.start_time)
+        self._names_by_id[record.task_id] = record.name
+        for key in self._index_keys(record):
+            bisect.insort(self._index[key], record.task_id)
+
+        return
+
+    def _index_remove(self, record):
+        """ Removes @record from the indexes. Call this only while holding @self._lock. """
+
+        position = bisect.bisect_left(self._order, record.task_id)
+        del self._order[position]
+        del self._start_times[position]
+        del self._names_by_id[record.task_id]
+        for key in self._index_keys(record):
+            ids = self._index[key]
+            del ids[bisect.bisect_left(ids, record.task_id)]
+
+        return
+
+    def _set_state(self, record, state):
+        """ Moves @record to @state and updates the state counts and indexes. Call this only while
+        holding @self._lock. """
+
+        ids = self._index[record.state]
+        del ids[bisect.bisect_left(ids, record.task_id)]
+
+        self._counts[record.state] -= 1
+        self._counts[state] += 1
+        record.state = state
+
+        for key in self._index_keys(record):
+            bisect.insort(self._index[key], record.task_id)
+
+        return
+
+    def _encode(self, result):
+        """ Returns @result as encoded by @self.store, or None if there's no store. Call this
+        before taking @self._lock so that large results don't hold it up. """
+
+        if self.store is None:
+            return None
+
+        return self.store.encode_result(result)
+
+    def _result_size(self, result):
+        """ Returns the approximate size of @result in bytes, or 0 if there's no size limit. """
+
+        if self.max_result_bytes is None:
+            return 0
+
+        try:
+            return len(pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            return sys.getsizeof(result)
+
+    def _evict_oldest(self, reason):
+        """ Removes the oldest finished task and counts it under @reason. Call this only while
+        holding @self._lock. """
+
+        name, (_, size) = self._finished.popitem(last=False)
+        record = self._records.pop(name)
+        self._index_remove(record)
+        self._counts[record.state] -= 1
+        self.result_bytes -= size
+        self.evicted[reason] += 1
+        self._touch(name)
+        if self.result_files is not None:
+            self.result_files.remove(name)
+
+        return
+
+    def evict(self):
+        """ Evicts finished tasks that exceed @self.max_tasks, @self.max_age, or
+        @self.max_result_bytes, oldest first.
+
+        Returns:
+            int: The return value.
+            The number of evicted tasks.
+        """
+
+        # let the store evict its own tasks.
+        if self.store is not None:
+            limits = (self.max_tasks, self.max_age, self.max_result_bytes)
+            if limits != (None, None, None):
+                self.store.evict(*limits)
+            return 0
+
+        with self._lock:
+            before = len(self._records)
+
+            while (self.max_tasks is not None and self._finished
+                   and len(self._records) > self.max_tasks):
+                self._evict_oldest("max_tasks")
+
+            if self.max_age is not None:
+                cutoff = time.monotonic() - self.max_age
+                while self._finished and next(iter(self._finished.values()))[0] < cutoff:
+                    self._evict_oldest("max_age")
+
+            while (self.max_result_bytes is not None and self._finished
+                   and self.result_bytes > self.max_result_bytes):
+                self._evict_oldest("max_result_bytes")
+
+            return before - len(self._records)
+
+    def new_name(self):
+        """ Returns a new, unique thread name for a task.
+
+        Returns:
+            str: The return value.
+        """
+
+        if self.shared is not None:
+            task_id = str(self.shared.next_id()).zfill(3)
+        else:
+            with self._lock:
+                task_id = str(next(self._ids)).zfill(3)
+
+        return "{}{}".format(self.thread_prefix, task_id)
+
+    def add(self, name, caller, coalesced_with=None):
+        """ Adds a queued task.
+
+        Args:
+            - name (str): The unique thread name for the task.
+            - caller (str): The file and function name of the user function.
+            - coalesced_with (str): The thread name of the task whose work this task shares, if
+            any. Such a task never runs on its own; see finish().
+
+        Returns:
+            dict: The return value.
+            The metadata for the new task.
+        """
+
+        with self._lock:
+            record = self._insert(name, caller)
+            record.coalesced_with = coalesced_with
+            self._touch(name)
+            self._persist(record)
+            self.evict()
+            return record.to_dict()
+
+    def _insert(self, name, caller):
+        """ Creates and indexes a queued record for the task @name. Call this only while holding
+        @self._lock.
+
+        Returns:
+            TaskRecord: The return value.
+        """
+
+        record = TaskRecord(int(name[len(self.thread_prefix):]), name, caller)
+        self._records[name] = record
+        self._counts[record.state] += 1
+        self._index_add(record)
+
+        return record
+
+    def add_cached(self, name, caller, result):
+        """ Adds a task that's already done with a cached @result, i.e. one that never ran.
+
+        Args:
+            - name (str): The unique thread name for the task.
+            - caller (str): The file and function name of the user function.
+            - result (object): The cached result.
+
+        Returns:
+            dict: The return value.
+            The metadata for the new task.
+        """
+
+        size = self._result_size(result) if self.store is None else 0
+        encoded = self._encode(result)
+
+        with self._lock:
+            record = self._insert(name, caller)
+            record.cached = True
+            return self._finish(record, result, None, size, encoded=encoded)
+
+    def discard(self, name):
+        """ Removes the task @name, e.g. because it couldn't be admitted.
+
+        Args:
+            - name (str): The unique thread name for the task.
+
+        Returns:
+            None
+        """
+
+        with self._lock:
+            record = self._records.pop(name, None)
+            if record is not None:
+                self._counts[record.state] -= 1
+                self._futures.pop(record.future, None)
+                self._index_remove(record)
+                self._touch(name)
+            finished = self._finished.pop(name, None)
+            if finished is not None:
+                self.result_bytes -= finished[1]
+            if self.store is not None:
+                self.store.delete(name)
+
+        return
+
+    def set_running(self, name, future=None):
+        """ Marks the task @name as running.
+
+        Args:
+            - name (str): The unique thread name for the task.
+            - future (concurrent.futures.Future): The future that runs the task. Use None for a
+            task that shares another task's work.
+
+        Returns:
+            dict: The return value.
+            The metadata for the task.
+        """
+
+        with self._lock:
+            record = self._records[name]
+            if record.state != "queued":
+                return record.to_dict()
+            record.future = future
+            if future is not None:
+                self._futures[future] = name
+            self._set_state(record, "running")
+            self._touch(name)
+            self._persist(record)
+            return record.to_dict()
+
+    def _finish(self, record, result, exception, size, result_file=None, encoded=None):
+        """ Marks @record as done with @result and @exception and tracks it for eviction. Call this
+        only while holding @self._lock. If the result was written to a file, @result_file describes
+        it; see placissimo.lib.result_files.ResultFiles.spill(). @encoded is the result as
+        returned by self._encode().
+
+        Returns:
+            dict: The return value.
+            The metadata for the task.
+        """
+
+        record.end_time = datetime.now().isoformat()
+        record.result, record.exception = result, exception
+        record.result_file = result_file
+        record.future = None
+        self._set_state(record, "done")
+        self._touch(record.name)
+        self._persist(record, encoded)
+        task_data = record.to_dict()
+
+        # track the finished task for eviction.
+        if self.store is None:
+            self._finished[record.name] = (time.monotonic(), size)
+            self.result_bytes += size
+        self.evict()
+
+        return task_data
+
+    def set_done(self, future, result, exception, result_file=None):
+        """ Marks the task that ran in @future as done and releases @future.
+
+        Args:
+            - future (concurrent.futures.Future): The future that ran the task.
+            - result (object): The task's return value.
+            - exception (str): The repr of any exception raised by the task, or None.
+            - result_file (dict): The file to which the task's return value was written instead,
+            if any; see placissimo.lib.result_files.ResultFiles.spill().
+
+        Returns:
+            tuple: The return value.
+            The thread name and the metadata for the task. If the task was already marked as done
+            by finish(), None is returned instead.
+        """
+
+        size = self._result_size(result) if self.store is None else 0
+        encoded = self._encode(result)
+
+        with self._lock:
+            name = self._futures.pop(future, None)
+            if name is None:
+                return None
+            task_data = self._finish(self._records[name], result, exception, size, result_file,
+                                     encoded)
+
+        return name, task_data
+
+    def finish(self, name, result=None, exception=None, result_file=None):
+        """ Marks the queued or running task @name as done with @result and @exception, e.g.
+        because it was cancelled or because the task whose work it shares is done. If the task is
+        running, a later call to set_done() for it is ignored.
+
+        Args:
+            - name (str): The unique thread name for the task.
+            - result (object): The task's result.
+            - exception (str): The repr of the task's exception, if any.
+            - result_file (dict): The file to which the task's result was written instead, if any.
+
+        Returns:
+            dict: The return value.
+            The metadata for the task, or None if the task doesn't exist or is already done.
+        """
+
+        size = self._result_size(result) if self.store is None else 0
+        encoded = self._encode(result)
+
+        with self._lock:
+            record = self._records.get(name)
+            if record is None or record.state == "done":
+                return None
+            self._futures.pop(record.future, None)
+            return self._finish(record, result, exception, size, result_file, encoded)
+
+    def eviction_counts(self):
+        """ Returns a copy of the number of evicted tasks per retention policy.
+
+        Returns:
+            dict: The return value.
+        """
+
+        if self.shared is not None:
+            return self.shared.eviction_counts()
+
+        with self._lock:
+            return dict(self.evicted)
+
+    def close(self):
+        """ Saves all pending writes and closes @self.store, if any.
+
+        Returns:
+            None
+        """
+
+        if self.store is not None:
+            self.store.close()
+
+        return
+
+    def counts(self):
+        """ Returns a copy of the number of tasks per state. If the registry is shared, the counts
+        are those of the stored tasks of all processes.
+
+        Returns:
+            dict: The return value.
+        """
+
+        if self.shared is not None:
+            counts = dict.fromkeys(self.states, 0)
+            counts.update(self.store.counts())
+            return counts
+
+        with self._lock:
+            return dict(self._counts)
+
+    def request_cancel(self, name):
+        """ Asks the process that runs the task @name to cancel it. Use this for tasks that a
+        shared registry knows only from its store; see cancel_requests().
+
+        Args:
+            - name (str): The unique thread name for the task.
+
+        Returns:
+            dict: The return value.
+            The metadata for the task, or None if the task doesn't exist, is already done, or runs
+            in this process.
+        """
+
+        with self._lock:
+            if name in self._records:
+                return None
+
+        task_data = self.store.get(name) if self.store is not None else None
+        if task_data is None or task_data["done"]:
+            return None
+        self.store.request_cancel(name)
+
+        return task_data
+
+    def cancel_requests(self):
+        """ Returns the thread names of this process's tasks that another process asked to cancel.
+
+        Returns:
+            list: The return value.
+        """
+
+        if self.store is None:
+            return []
+
+        names = self.store.cancel_requests()
+        with self._lock:
+            return [name for name in names if name in self._records]
+
+    def snapshot(self, names=None, fields=None):
+        """ Returns the metadata for the tasks @names, or for all tasks if @names is None. Unknown
+        names are skipped.
+
+        Args:
+            - names (list): The thread names of the tasks to include.
+            - fields (list): The metadata keys to include for each task. Use None for all keys.
+
+        Returns:
+            collections.OrderedDict: The return value.
+        """
+
+        if self.store is None:
+            with self._lock:
+                if names is None:
+                    names = self._records
+                return OrderedDict((name, _project(self._records[name].to_dict(), fields))
+                                   for name in names if name in self._records)
+
+        # otherwise, merge the stored tasks with the newer copies in memory.
+        # note: memory is read first; a task that's saved and dropped from memory in between is
+        # then read from its updated row instead of being missed.
+        if names is None:
+            with self._lock:
+                memory = [(record.task_id, (name, record.to_dict()))
+                          for name, record in self._records.items()]
+            tasks = {task_id: (name, task_data)
+                     for task_id, name, task_data in self.store.items()}
+            tasks.update(memory)
+            return OrderedDict((name, _project(task_data, fields))
+                               for name, task_data in (tasks[task_id] for task_id in sorted(tasks)))
+
+        tasks = OrderedDict()
+        for name in names:
+            try:
+                tasks[name] = _project(self[name], fields)
+            except KeyError:
+                continue
+
+        return tasks
+
+    def query(self, state=None, since=None, until=None, start=0, limit=None, fields=None):
+        """ Returns a page of tasks, oldest first, that match the given filters.
+
+        Args:
+            - state (str): Use "queued", "running", "done", or "failed" to only include tasks with
+            that state. Failed tasks are done tasks with an exception. Use None for all tasks.
+            - since (str): An ISO timestamp. Only tasks started at or after it are included.
+            - until (str): An ISO timestamp. Only tasks started before it are included.
+            - start (int): The number of matching tasks to skip.
+            - limit (int): The maximum number of tasks to include. Use None for no limit.
+            - fields (list): The metadata keys to include for each task. Use None for all keys.
+
+        Returns:
+            tuple: The return value.
+            The total number of matching tasks and a collections.OrderedDict of the page of tasks.
+        """
+
+        if self.store is not None:
+            return self._query_store(state, since, until, start, limit, fields)
+
+        with self._lock:
+            ids, low, high = self._match(state, since, until)
+
+            # slice the page out of the matching range.
+            first = low + start
+            last = high if limit is None else min(high, first + limit)
+            tasks = OrderedDict()
+            for task_id in ids[first:last]:
+                name = self._names_by_id[task_id]
+                tasks[name] = _project(
+                    self._records[name].to_dict(), fields)
+
+            return high - low, tasks
+
+    def _match(self, state, since, until):
+        """ Finds the tasks in memory that match the filters of self.query(). Call this only while
+        holding @self._lock.
+
+        Returns:
+            tuple: The return value.
+            A sorted list of task ids and the range of its indexes, from @low up to @high, that
+            holds the matching tasks.
+        """
+
+        # convert the time range to a range of task ids; ids increase with start time.
+        ids = self._order if state is None else self._index[state]
+        low, high = 0, len(ids)
+        if since is not None:
+            position = bisect.bisect_left(self._start_times, since)
+            if position < len(self._order):
+                low = bisect.bisect_left(ids, self._order[position])
+            else:
+                low = high
+        if until is not None:
+            position = bisect.bisect_left(self._start_times, until)
+            if position < len(self._order):
+                high = bisect.bisect_left(ids, self._order[position])
+
+        return ids, low, max(low, high)
+
+    def _query_store(self, state, since, until, start, limit, fields):
+        """ Implements self.query() for a registry with a store. Tasks in memory are newer than
+        their rows, if any, so they're merged into the page of stored tasks instead of being read
+        from the store.
+
+        Returns:
+            tuple: The return value.
+        """
+
+        # copy the matching tasks in memory.
+        with self._lock:
+            excluded = list(self._names_by_id)
+            ids, low, high = self._match(state, since, until)
+            matches = []
+            for task_id in ids[low:high]:
+                name = self._names_by_id[task_id]
+                matches.append((task_id, name, self._records[name].to_dict()))
+        match_ids = [task_id for task_id, _, _ in matches]
+
+        # note: each task in memory may come before the page, so the stored tasks are read from
+        # up to that many positions earlier.
+        offset = max(0, start - len(matches))
+        count = None if limit is None else start + limit - offset
+        stored, rows = self.store.query(state, since, until, offset, count,
+                                        fields is None or "result" in fields, excluded)
+        row_ids = [task_id for task_id, _, _ in rows]
+        complete = count is None or len(rows) < count
+
+        # find each task's position among all matching tasks.
+        positions = []
+        for index, (task_id, name, task_data) in enumerate(rows):
+            positions.append((offset + index + bisect.bisect_left(match_ids, task_id), name,
+                              task_data))
+        for index, (task_id, name, task_data) in enumerate(matches):
+            below = bisect.bisect_left(row_ids, task_id)
+            if (offset > 0 and below == 0) or (below == len(row_ids) and not complete):
+                continue
+            positions.append((offset + below + index, name, task_data))
+
+        # slice the page out of the matching tasks.
+        last = None if limit is None else start + limit
+        tasks = OrderedDict()
+        for position, name, task_data in sorted(positions, key=lambda item: item[0]):
+            if position >= start and (last is None or position < last):
+                tasks[name] = _project(task_data, fields)
+
+        return stored + len(matches), tasks
+
+    def changes(self, since_rev, fields=None):
+        """ Returns the tasks that changed after the revision @since_rev, oldest change first.
+
+        Args:
+            - since_rev (int): The last revision the caller has seen.
+            - fields (list): The metadata keys to include for each task. Use None for all keys.
+
+        Returns:
+            tuple: The return value.
+            The current revision and a collections.OrderedDict of the changed tasks. Removed tasks
+            map to None. If the changes after @since_rev are no longer known (or @since_rev is
+            newer than the current revision, or the registry is shared), None is returned instead
+            of the dict.
+        """
+
+        if self.shared is not None:
+            return self.revision, None
+
+        with self._lock:
+            revision = self._revision
+            if since_rev < self._changes_floor or since_rev > revision:
+                return revision, None
+
+            # walk back from the newest change, so that the cost follows the number of changes.
+            names = []
+            for name, rev in reversed(self._changes.items()):
+                if rev <= since_rev:
+                    break
+                names.append(name)
+
+            tasks = OrderedDict()
+            for name in reversed(names):
+                record = self._records.get(name)
+                tasks[name] = None if record is None else _project(
+                    record.to_dict(), fields)
+
+        # finished tasks may only be in the store.
+        if self.store is not None:
+            for name, task_data in tasks.items():
+                if task_data is None:
+                    task_data = self.store.get(name)
+                    tasks[name] = None if task_data is None else _project(
+                        task_data, fields)
+
+        return revision, tasks
+
+
+def _project(task_data, fields):
+    """ Returns @task_data limited to the keys in @fields, or all of @task_data if @fields is None.
+    """
+
+    if fields is None:
+        return task_data
+
+    return {k: task_data[k] for k in fields if k in task_data}
+
+
+if __name__ == "__main__":
+    pass
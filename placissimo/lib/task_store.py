@@ -0,0 +1,692 @@
+#!/usr/bin/python3
+
+""" This module contains a class that persists task metadata to an SQLite database so that task
+history survives server restarts.
+
+Writes are queued and committed in batches by a background thread so that the IOLoop never waits
+on the disk. The number of tasks (in total and per state) and the total size of their results are
+kept up to date by triggers, so neither evictions nor task counts have to count every task, and at
+most one eviction runs per batch.
+Results are encoded before they're queued, and each write in a batch is applied within its own
+savepoint, so a write that fails is skipped without losing the rest of its batch. A batch that
+can't be committed because another process holds the database is retried until it's saved. Task
+results live in their own table so that queries on the indexed task columns never have to read
+them.
+
+Several processes may share a store. Each task row records the process that wrote it, so that the
+tasks of a process that crashed can be marked as done and so that any process can ask the one
+running a task to cancel it.
+"""
+
+# import modules.
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from .serializer import default
+from datetime import datetime
+
+# the maximum number of queued writes to commit in a single transaction.
+BATCH_SIZE = 500
+
+# the number of seconds to wait before retrying a batch while the database is locked by another
+# process. The delay doubles with each attempt, up to MAX_RETRY_DELAY.
+RETRY_DELAY = 0.1
+MAX_RETRY_DELAY = 5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    caller TEXT,
+    state TEXT NOT NULL,
+    start_time TEXT,
+    end_time TEXT,
+    end_ts REAL,
+    exception TEXT,
+    result_size INTEGER NOT NULL DEFAULT 0,
+    cached INTEGER NOT NULL DEFAULT 0,
+    coalesced_with TEXT,
+    result_file TEXT
+);
+CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state, id);
+CREATE INDEX IF NOT EXISTS tasks_start_time ON tasks (start_time);
+CREATE INDEX IF NOT EXISTS tasks_end_ts ON tasks (end_ts);
+CREATE INDEX IF NOT EXISTS tasks_failed ON tasks (id)
+    WHERE state = 'done' AND exception IS NOT NULL;
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    result TEXT
+);
+CREATE TRIGGER IF NOT EXISTS tasks_delete AFTER DELETE ON tasks BEGIN
+    DELETE FROM results WHERE id = OLD.id;
+END;
+CREATE TABLE IF NOT EXISTS totals (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    tasks INTEGER NOT NULL,
+    result_bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO totals (id, tasks, result_bytes)
+    SELECT 0, COUNT(*), COALESCE(SUM(result_size), 0) FROM tasks;
+CREATE TRIGGER IF NOT EXISTS totals_insert AFTER INSERT ON tasks BEGIN
+    UPDATE totals SET tasks = tasks + 1, result_bytes = result_bytes + NEW.result_size;
+END;
+CREATE TRIGGER IF NOT EXISTS totals_delete AFTER DELETE ON tasks BEGIN
+    UPDATE totals SET tasks = tasks - 1, result_bytes = result_bytes - OLD.result_size;
+END;
+CREATE TRIGGER IF NOT EXISTS totals_update AFTER UPDATE OF result_size ON tasks BEGIN
+    UPDATE totals SET result_bytes = result_bytes + NEW.result_size - OLD.result_size;
+END;
+CREATE TABLE IF NOT EXISTS state_counts (
+    state TEXT PRIMARY KEY,
+    tasks INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO state_counts (state, tasks)
+    SELECT 'queued', COUNT(*) FROM tasks WHERE state = 'queued'
+    UNION ALL SELECT 'running', COUNT(*) FROM tasks WHERE state = 'running'
+    UNION ALL SELECT 'done', COUNT(*) FROM tasks WHERE state = 'done'
+    UNION ALL SELECT 'failed', COUNT(*) FROM tasks WHERE state = 'done' AND exception IS NOT NULL;
+CREATE TRIGGER IF NOT EXISTS state_counts_insert AFTER INSERT ON tasks BEGIN
+    UPDATE state_counts SET tasks = tasks + 1 WHERE state = NEW.state
+        OR (state = 'failed' AND NEW.state = 'done' AND NEW.exception IS NOT NULL);
+END;
+CREATE TRIGGER IF NOT EXISTS state_counts_delete AFTER DELETE ON tasks BEGIN
+    UPDATE state_counts SET tasks = tasks - 1 WHERE state = OLD.state
+        OR (state = 'failed' AND OLD.state = 'done' AND OLD.exception IS NOT NULL);
+END;
+CREATE TRIGGER IF NOT EXISTS state_counts_update AFTER UPDATE OF state, exception ON tasks BEGIN
+    UPDATE state_counts SET tasks = tasks - 1 WHERE state = OLD.state
+        OR (state = 'failed' AND OLD.state = 'done' AND OLD.exception IS NOT NULL);
+    UPDATE state_counts SET tasks = tasks + 1 WHERE state = NEW.state
+        OR (state = 'failed' AND NEW.state = 'done' AND NEW.exception IS NOT NULL);
+END;
+"""
+
+# the columns added to the tasks table after its first version, in order.
+_ADDED_COLUMNS = [("cached", "INTEGER NOT NULL DEFAULT 0"), ("coalesced_with", "TEXT"),
+                  ("result_file", "TEXT"), ("pid", "INTEGER"),
+                  ("cancel", "INTEGER NOT NULL DEFAULT 0")]
+
+# the indexes on added columns, which can only be created once the columns exist.
+_ADDED_INDEXES = """
+CREATE INDEX IF NOT EXISTS tasks_cancel ON tasks (pid) WHERE cancel = 1 AND state != 'done';
+"""
+
+_COLUMNS = ("tasks.id, name, caller, state, start_time, end_time, exception, cached, "
+            "coalesced_with, result_file, result")
+
+
+def _is_busy(err):
+    """ Returns True if @err was raised because another connection holds the database. """
+
+    return isinstance(err, sqlite3.OperationalError) and any(
+        word in str(err) for word in ["locked", "busy"])
+
+
+def _row_to_dict(row):
+    """ Converts a row selected with @_COLUMNS to the metadata dict used by "/tasks". """
+
+    (_, _, caller, state, start_time, end_time, exception, cached, coalesced_with, result_file,
+     result) = row
+    done = state == "done"
+    task_data = {"caller": caller,
+                 "start_time": start_time,
+                 "state": state,
+                 "running": state == "running",
+                 "done": done}
+    if done:
+        task_data.update(end_time=end_time, result=json.loads(result) if result else None,
+                         exception=exception)
+    if cached:
+        task_data["cached"] = True
+    if coalesced_with is not None:
+        task_data["coalesced_with"] = coalesced_with
+    if done and result_file is not None:
+        task_data["result_file"] = json.loads(result_file)
+
+    return task_data
+
+
+class TaskStore():
+    """ This class persists task metadata to an SQLite database.
+
+    Args:
+        - path (str): The path to the database file. It's created if it doesn't exist.
+        - on_flush (function): Called on the writer thread with the list of thread names whose
+        writes were just committed.
+        - on_evict (function): Called on the writer thread with a dict of the number of evicted
+        tasks per retention policy and a list of the evicted thread names.
+    """
+
+    def __init__(self, path, on_flush=None, on_evict=None):
+
+        # set logging.
+        self.logger = logging.getLogger(__name__)
+        self.logger.addHandler(logging.NullHandler())
+
+        # set attributes.
+        self.path = path
+        self.pid = os.getpid()
+        self.on_flush = on_flush
+        self.on_evict = on_evict
+        self._writes = queue.Queue()
+        self._read_lock = threading.Lock()
+        self._evict_lock = threading.Lock()
+        self._evict_limits = None
+
+        # create the schema and open a connection for reads.
+        self.logger.info("Opening task store: {}".format(path))
+        with sqlite3.connect(path) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+            # add columns that are missing from stores created by older versions.
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(tasks)")]
+            for column, definition in _ADDED_COLUMNS:
+                if column not in columns:
+                    conn.execute("ALTER TABLE tasks ADD COLUMN {} {}".format(column, definition))
+            conn.executescript(_ADDED_INDEXES)
+        self._reader = sqlite3.connect(path, check_same_thread=False)
+        self._reader.execute("CREATE TEMP TABLE excluded (id INTEGER PRIMARY KEY)")
+
+        # commit writes on a background thread.
+        self._writer = threading.Thread(target=self._write_batches, daemon=True,
+                                        name="task_store_writer")
+        self._writer.start()
+
+    def recover(self, pid=None):
+        """ Marks tasks that were queued or running when the server last stopped as done.
+
+        Args:
+            - pid (int): The id of the process whose tasks to mark, e.g. a worker process that
+            crashed. Use None to mark the tasks of all processes.
+
+        Returns:
+            tuple: The return value.
+            The highest task id in the store and a dict of the number of tasks per state.
+        """
+
+        where, params = "WHERE state != 'done'", ()
+        msg = "The server stopped before the task finished."
+        if pid is not None:
+            where, params = where + " AND pid = ?", (pid,)
+            msg = "The worker process stopped before the task finished."
+
+        with self._read_lock, self._reader as conn:
+            interrupted = conn.execute(
+                "UPDATE tasks SET state = 'done', end_time = ?, end_ts = ?, exception = ? " + where,
+                (datetime.now().isoformat(), time.time(), msg) + params).rowcount
+            max_id = conn.execute(
+                "SELECT COALESCE(MAX(id), 0) FROM tasks").fetchone()[0]
+            counts = dict(conn.execute(
+                "SELECT state, tasks FROM state_counts WHERE state != 'failed'").fetchall())
+
+        if interrupted:
+            self.logger.warning(
+                "Marked {} interrupted task(s) as done.".format(interrupted))
+
+        return max_id, counts
+
+    def encode_result(self, result):
+        """ Encodes @result as it's stored. Results that can't be encoded as JSON, e.g. ones with
+        circular references, are stored as their repr instead.
+
+        Args:
+            - result (object): The task's result.
+
+        Returns:
+            str: The return value.
+        """
+
+        try:
+            return json.dumps(result, default=default)
+        except (TypeError, ValueError, RecursionError) as err:
+            self.logger.warning("Can't encode result as JSON; storing its repr: {}".format(
+                err.__repr__()))
+            return json.dumps(repr(result))
+
+    def write(self, task_id, record, encoded=None):
+        """ Queues an insert or update for a task.
+
+        Args:
+            - task_id (int): The task's numeric identifier.
+            - record (placissimo.lib.task_registry.TaskRecord): The task. Its values are copied
+            right away; the result is only stored once the task is done.
+            - encoded (str): The task's result as returned by self.encode_result(). If None, the
+            result is encoded here.
+
+        Returns:
+            None
+        """
+
+        result_file = json.dumps(record.result_file) if record.result_file is not None else None
+        row = (task_id, record.name, record.caller, record.state, record.start_time,
+               record.end_time, record.exception, int(record.cached), record.coalesced_with,
+               result_file, self.pid)
+        if record.state == "done" and encoded is None:
+            encoded = self.encode_result(record.result)
+        self._writes.put(("write", row, encoded if record.state == "done" else None))
+
+        return
+
+    def delete(self, name):
+        """ Queues the removal of the task @name.
+
+        Args:
+            - name (str): The unique thread name for the task.
+
+        Returns:
+            None
+        """
+
+        self._writes.put(("delete", name, None))
+
+        return
+
+    def request_cancel(self, name):
+        """ Queues a request for the process that runs the task @name to cancel it; see
+        self.cancel_requests().
+
+        Args:
+            - name (str): The unique thread name for the task.
+
+        Returns:
+            None
+        """
+
+        self._writes.put(("cancel", name, None))
+
+        return
+
+    def cancel_requests(self):
+        """ Returns the thread names of this process's unfinished tasks that another process asked
+        to cancel.
+
+        Returns:
+            list: The return value.
+        """
+
+        with self._read_lock:
+            rows = self._reader.execute(
+                "SELECT name FROM tasks WHERE pid = ? AND cancel = 1 AND state != 'done'",
+                (self.pid,)).fetchall()
+
+        return [name for (name,) in rows]
+
+    def evict(self, max_tasks=None, max_age=None, max_result_bytes=None):
+        """ Queues the eviction of finished tasks that exceed the given retention limits. See
+        placissimo.lib.task_registry.TaskRegistry for details on each limit. If an eviction is
+        already queued, it uses these limits instead.
+
+        Returns:
+            None
+        """
+
+        with self._evict_lock:
+            queued = self._evict_limits is not None
+            self._evict_limits = (max_tasks, max_age, max_result_bytes)
+        if not queued:
+            self._writes.put(("evict", None, None))
+
+        return
+
+    def _evict(self, conn, max_tasks, max_age, max_result_bytes):
+        """ Deletes the oldest finished tasks that exceed the retention limits using @conn.
+
+        Returns:
+            tuple: The return value.
+            The number of evicted tasks per retention policy and a list of the evicted thread
+            names.
+        """
+
+        evicted = {"max_tasks": 0, "max_age": 0, "max_result_bytes": 0}
+        names = []
+        select_oldest = "SELECT name FROM tasks WHERE state = 'done' ORDER BY end_ts LIMIT ?"
+
+        def delete(reason, query, params):
+            """ Deletes the tasks whose names are selected by @query and counts them under
+            @reason. """
+
+            selected = [name for (name,) in conn.execute(query, params).fetchall()]
+            conn.executemany("DELETE FROM tasks WHERE name = ?",
+                             [(name,) for name in selected])
+            evicted[reason] = len(selected)
+            names.extend(selected)
+
+        if max_tasks is not None:
+            excess = conn.execute(
+                "SELECT tasks FROM totals").fetchone()[0] - max_tasks
+            if excess > 0:
+                delete("max_tasks", select_oldest, (excess,))
+
+        if max_age is not None:
+            delete("max_age", "SELECT name FROM tasks WHERE state = 'done' AND end_ts < ?",
+                   (time.time() - max_age,))
+
+        if max_result_bytes is not None:
+            excess = conn.execute(
+                "SELECT result_bytes FROM totals").fetchone()[0] - max_result_bytes
+            if excess > 0:
+
+                # count the oldest finished tasks whose results cover @excess.
+                count = 0
+                sizes = conn.execute(
+                    "SELECT result_size FROM tasks WHERE state = 'done' ORDER BY end_ts")
+                for (size,) in sizes:
+                    if excess <= 0:
+                        break
+                    excess -= size
+                    count += 1
+                sizes.close()
+
+                delete("max_result_bytes", select_oldest, (count,))
+
+        return evicted, names
+
+    def _apply(self, conn, item, evicted, evicted_names):
+        """ Applies the queued @item using @conn. The number of evicted tasks per retention policy
+        and their names are added to @evicted and @evicted_names. """
+
+        op, payload, result = item
+        if op == "write":
+            self._write_row(conn, payload, result)
+        elif op == "delete":
+            conn.execute("DELETE FROM tasks WHERE name = ?", (payload,))
+        elif op == "cancel":
+            conn.execute("UPDATE tasks SET cancel = 1 WHERE name = ? AND state != 'done'",
+                         (payload,))
+        elif op == "evict" and payload is not None:
+            counts, removed = self._evict(conn, *payload)
+            for reason, count in counts.items():
+                evicted[reason] = evicted.get(reason, 0) + count
+            evicted_names.extend(removed)
+
+        return
+
+    def _commit(self, conn, batch):
+        """ Applies the queued items in @batch using @conn in a single transaction. Each item gets
+        its own savepoint, so an item that fails is rolled back and skipped on its own.
+
+        Returns:
+            tuple: The return value.
+            The list of items that were saved, the number of evicted tasks per retention policy,
+            and a list of the evicted thread names.
+
+        Raises:
+            - sqlite3.Error: If the transaction can't be committed, e.g. because another process
+            holds the database.
+        """
+
+        saved, evicted, evicted_names = [], {}, []
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for item in batch:
+                conn.execute("SAVEPOINT item")
+                try:
+                    self._apply(conn, item, evicted, evicted_names)
+                except Exception as err:
+                    # note: the database being locked or busy affects the whole batch.
+                    if _is_busy(err):
+                        raise
+                    conn.execute("ROLLBACK TO item")
+                    self.logger.error("Can't write {} of {} to task store: {}".format(
+                        item[0], item[1][1] if item[0] == "write" else item[1],
+                        err.__repr__()))
+                else:
+                    saved.append(item)
+                conn.execute("RELEASE item")
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+        return saved, evicted, evicted_names
+
+    def _write_batches(self):
+        """ Commits queued writes in batches until None is queued. """
+
+        # note: transactions are managed by self._commit().
+        conn = sqlite3.connect(self.path, isolation_level=None)
+        running, retry, delay = True, [], 0
+
+        while running or retry:
+
+            # wait for the first write, then take whatever else is already queued. A batch that
+            # wasn't committed is retried after a delay, along with the writes queued since.
+            if retry:
+                time.sleep(delay)
+                batch, retry = retry, []
+            else:
+                batch = [self._writes.get()]
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                running = False
+                batch = [item for item in batch if item is not None]
+
+            # evict at most once per batch, after all of its writes.
+            # note: a retried eviction already holds its limits; newer limits replace them.
+            if any(item[0] == "evict" for item in batch):
+                limits = [item[1] for item in batch if item[0] == "evict" and item[1] is not None]
+                with self._evict_lock:
+                    if self._evict_limits is not None:
+                        limits.append(self._evict_limits)
+                    self._evict_limits = None
+                batch = [item for item in batch if item[0] != "evict"]
+                if limits:
+                    batch.append(("evict", limits[-1], None))
+
+            # commit the batch; if another process holds the database, keep it for the next try.
+            # note: on shutdown, the batch is only retried until the delay reaches its maximum.
+            saved, evicted, evicted_names = [], {}, []
+            try:
+                saved, evicted, evicted_names = self._commit(conn, batch)
+                delay = 0
+            except Exception as err:
+                if _is_busy(err) and (running or delay < MAX_RETRY_DELAY):
+                    retry = batch
+                    delay = min(max(delay * 2, RETRY_DELAY), MAX_RETRY_DELAY)
+                    self.logger.warning("Task store is busy; retrying {} change(s) in {} "
+                                        "second(s).".format(len(batch), delay))
+                else:
+                    self.logger.error("Can't write {} change(s) to task store: {}".format(
+                        len(batch), err.__repr__()))
+
+            # note: the tasks of writes that weren't saved stay in memory.
+            names = [item[1][1] for item in saved if item[0] == "write"]
+            if names and self.on_flush is not None:
+                self.on_flush(names)
+            if any(evicted.values()) and self.on_evict is not None:
+                self.on_evict(evicted, evicted_names)
+
+        conn.close()
+
+        return
+
+    def _write_row(self, conn, row, result_text):
+        """ Inserts or updates a task @row (and its encoded @result_text, if the task is done) using
+        @conn. """
+
+        task_id, _, _, state, _, end_time, _, _, _, _, _ = row
+        end_ts = time.time() if state == "done" else None
+
+        # note: rows are updated in place rather than replaced so that the totals triggers see
+        # every change and a pending cancel request survives later writes of the task.
+        values = row + (end_ts, len(result_text or ""))
+        updated = conn.execute("UPDATE tasks SET name = ?, caller = ?, state = ?, start_time = ?, "
+                               "end_time = ?, exception = ?, cached = ?, coalesced_with = ?, "
+                               "result_file = ?, pid = ?, end_ts = ?, result_size = ? "
+                               "WHERE id = ?", values[1:] + (task_id,)).rowcount
+        if not updated:
+            conn.execute("INSERT INTO tasks (id, name, caller, state, start_time, end_time, "
+                         "exception, cached, coalesced_with, result_file, pid, end_ts, "
+                         "result_size) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", values)
+        if result_text is not None:
+            conn.execute("INSERT OR REPLACE INTO results (id, result) VALUES (?, ?)",
+                         (task_id, result_text))
+
+        return
+
+    def contains(self, name):
+        """ Returns True if the task @name is stored.
+
+        Args:
+            - name (str): The unique thread name for the task.
+
+        Returns:
+            bool: The return value.
+        """
+
+        with self._read_lock:
+            row = self._reader.execute(
+                "SELECT 1 FROM tasks WHERE name = ?", (name,)).fetchone()
+
+        return row is not None
+
+    def get(self, name):
+        """ Returns the metadata dict for the task @name, or None if it's not stored.
+
+        Args:
+            - name (str): The unique thread name for the task.
+
+        Returns:
+            dict: The return value.
+        """
+
+        with self._read_lock:
+            row = self._reader.execute("SELECT {} FROM tasks LEFT JOIN results USING (id) "
+                                       "WHERE name = ?".format(_COLUMNS), (name,)).fetchone()
+
+        return None if row is None else _row_to_dict(row)
+
+    def counts(self):
+        """ Returns the number of stored tasks per state.
+
+        Returns:
+            dict: The return value.
+        """
+
+        with self._read_lock:
+            rows = self._reader.execute(
+                "SELECT state, tasks FROM state_counts WHERE state != 'failed'").fetchall()
+
+        return dict(rows)
+
+    def names(self):
+        """ Returns the thread names of all stored tasks, oldest first.
+
+        Returns:
+            list: The return value.
+        """
+
+        with self._read_lock:
+            rows = self._reader.execute(
+                "SELECT name FROM tasks ORDER BY id").fetchall()
+
+        return [name for (name,) in rows]
+
+    def items(self):
+        """ Returns (task id, thread name, metadata dict) for all stored tasks, oldest first.
+
+        Returns:
+            list: The return value.
+        """
+
+        with self._read_lock:
+            rows = self._reader.execute("SELECT {} FROM tasks LEFT JOIN results USING (id) "
+                                        "ORDER BY tasks.id".format(_COLUMNS)).fetchall()
+
+        return [(row[0], row[1], _row_to_dict(row)) for row in rows]
+
+    def query(self, state=None, since=None, until=None, start=0, limit=None, with_result=True,
+              excluded=()):
+        """ Returns a page of stored tasks, oldest first, that match the given filters. See
+        placissimo.lib.task_registry.TaskRegistry.query() for details on each filter.
+
+        Args:
+            - with_result (bool): Use False to skip reading results from the store.
+            - excluded (list): The ids of the tasks to leave out, e.g. ones whose newer copies are
+            still in memory.
+
+        Returns:
+            tuple: The return value.
+            The total number of matching tasks and a list of (task id, thread name, metadata dict)
+            tuples.
+        """
+
+        # build the WHERE clause; each term is covered by an index.
+        terms, params = [], []
+        if state == "failed":
+            terms.append("state = 'done' AND exception IS NOT NULL")
+        elif state is not None:
+            terms.append("state = ?")
+            params.append(state)
+        state_terms, state_params = list(terms), list(params)
+        if since is not None:
+            terms.append("start_time >= ?")
+            params.append(since)
+        if until is not None:
+            terms.append("start_time < ?")
+            params.append(until)
+        if excluded:
+            terms.append("tasks.id NOT IN temp.excluded")
+        where = " WHERE " + " AND ".join(terms) if terms else ""
+
+        # skip the results table unless it's needed.
+        columns, join = _COLUMNS, " LEFT JOIN results USING (id)"
+        if not with_result:
+            columns, join = _COLUMNS.rsplit(", ", 1)[0] + ", NULL", ""
+
+        # note: the excluded ids are held in a temporary table, which only this connection sees;
+        # its transaction is ended right away so that later reads see new commits.
+        with self._read_lock, self._reader as conn:
+            conn.execute("DELETE FROM temp.excluded")
+            conn.executemany("INSERT INTO temp.excluded (id) VALUES (?)",
+                             [(task_id,) for task_id in excluded])
+
+            # without a time range, the total is kept by the triggers, less the excluded tasks.
+            if since is None and until is None:
+                if state is None:
+                    total = conn.execute("SELECT tasks FROM totals").fetchone()[0]
+                else:
+                    total = conn.execute("SELECT tasks FROM state_counts WHERE state = ?",
+                                         (state,)).fetchone()[0]
+                if excluded:
+                    total -= conn.execute(
+                        "SELECT COUNT(*) FROM tasks WHERE " + " AND ".join(
+                            ["tasks.id IN temp.excluded"] + state_terms),
+                        state_params).fetchone()[0]
+            else:
+                total = conn.execute(
+                    "SELECT COUNT(*) FROM tasks" + where, params).fetchone()[0]
+            rows = conn.execute(
+                "SELECT {} FROM tasks{}{} ORDER BY tasks.id LIMIT ? OFFSET ?".format(
+                    columns, join, where),
+                params + [-1 if limit is None else limit, start]).fetchall()
+
+        return total, [(row[0], row[1], _row_to_dict(row)) for row in rows]
+
+    def close(self):
+        """ Commits all queued writes and closes the database.
+
+        Returns:
+            None
+        """
+
+        self._writes.put(None)
+        self._writer.join()
+        with self._read_lock:
+            self._reader.close()
+
+        return
+
+
+if __name__ == "__main__":
+    pass
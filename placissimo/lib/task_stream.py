@@ -0,0 +1,158 @@
+#!/usr/bin/python3
+
+""" This module contains a class that passes the items yielded by a generator task to the client
+that requested them with "/api?stream=1".
+
+Items are encoded as newline-delimited JSON by the thread that produces them. Only a small window of
+encoded items may wait to be written to the client at once, so a slow client slows down the task
+instead of filling the server's memory. The last few items are kept as the task's result.
+"""
+
+# import modules.
+import json
+import threading
+from .serializer import default
+from collections import deque
+
+# the number of yielded items that may wait to be written to the client.
+STREAM_WINDOW = 16
+
+# the default number of yielded items to keep as a finished task's result.
+RESULT_TAIL = 100
+
+
+class TaskStream():
+    """ This class passes the items yielded by a generator task to a client.
+
+    Args:
+        - io_loop (tornado.ioloop.IOLoop): The server's IOLoop. Items are written to the client on
+        it.
+        - tail (int): The number of recent items to keep as the task's result.
+        - window (int): The number of items that may wait to be written to the client.
+    """
+
+    def __init__(self, io_loop, tail=RESULT_TAIL, window=STREAM_WINDOW):
+
+        self.io_loop = io_loop
+        self.tail = deque(maxlen=tail)
+        self.count = 0
+        self.consumer = None
+        self.on_close = None
+        self.closed = False
+        self._credits = threading.Semaphore(window)
+
+    def _encode(self, item):
+        """ Adds @item to @self.tail and returns it as a line of JSON. Values that can't be
+        converted to JSON are converted with placissimo.lib.serializer.default(). """
+
+        self.tail.append(item)
+        self.count += 1
+
+        return (json.dumps(item, default=default) + "\n").encode()
+
+    def put(self, item, on_release=None):
+        """ Queues @item to be written to the client. This is thread-safe.
+
+        Args:
+            - item (object): The yielded item.
+            - on_release (function): Called on @self.io_loop once @item is written (or dropped, if
+            no client is attached). If None, this blocks while the window is full instead.
+
+        Returns:
+            None
+        """
+
+        chunk = self._encode(item)
+        if on_release is None:
+            self._credits.acquire()
+            on_release = self._credits.release
+        self.io_loop.add_callback(self._deliver, chunk, on_release)
+
+        return
+
+    def write(self, item):
+        """ Writes @item to the client. Call this on @self.io_loop, e.g. from a coroutine task.
+
+        Args:
+            - item (object): The yielded item.
+
+        Returns:
+            tornado.concurrent.Future: The return value.
+            A future that resolves once @item is written. If no client is attached, None is
+            returned.
+        """
+
+        chunk = self._encode(item)
+        if self.consumer is None:
+            return None
+
+        return self.consumer(chunk)
+
+    def _deliver(self, chunk, on_release):
+        """ Writes @chunk to the client, if any, and then calls @on_release. This runs on
+        @self.io_loop. """
+
+        if self.consumer is None:
+            on_release()
+            return
+
+        self.io_loop.add_future(self.consumer(chunk),
+                                lambda future: on_release())
+
+        return
+
+    def attach(self, consumer, on_close):
+        """ Attaches a client to the stream. Call this on @self.io_loop.
+
+        Args:
+            - consumer (function): Called with each encoded item. It must return a future that
+            resolves once the item is written.
+            - on_close (function): Called once the task is done and all items are written.
+
+        Returns:
+            None
+        """
+
+        self.consumer, self.on_close = consumer, on_close
+
+        return
+
+    def detach(self):
+        """ Detaches the client, e.g. because it disconnected. Later items are only kept in
+        @self.tail. Call this on @self.io_loop.
+
+        Returns:
+            None
+        """
+
+        self.consumer, self.on_close = None, None
+
+        return
+
+    def close(self):
+        """ Marks the stream as done once all queued items are written. This is thread-safe.
+
+        Returns:
+            None
+        """
+
+        self.io_loop.add_callback(self._close)
+
+        return
+
+    def _close(self):
+        """ Calls @self.on_close, if any, and detaches the client. This runs on @self.io_loop. """
+
+        if self.closed:
+            return
+
+        self.closed = True
+        if self.on_close is not None:
+            self.on_close()
+        self.detach()
+
+        return
+
+
+if __name__ == "__main__":
+    pass
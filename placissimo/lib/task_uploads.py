@@ -0,0 +1,113 @@
+#!/usr/bin/python3
+
+""" This module contains a class that deletes the files uploaded to "/api" in
+placissimo.server.serve() once their tasks are done.
+
+The files are deleted once the task's function has returned, i.e. once the task's future is done
+(see release()), or when the task's final event (e.g. "finished" or "cancelled") is published by
+placissimo.lib.event_bus.EventBus if its function never ran. A task that's cancelled or times out
+while it runs keeps its files until its function returns, since a function running in a thread
+can't be stopped.
+"""
+
+# import modules.
+from .request_body import discard_files
+
+# the events after which a task no longer needs its files.
+_FINAL_EVENTS = ["finished", "failed", "cancelled", "timed_out"]
+
+
+class TaskUploads():
+    """ This class tracks the files uploaded for each task. Its methods run on the server's
+    IOLoop. """
+
+    def __init__(self):
+
+        self._files = {}
+        self._started = set()
+
+    def add(self, thread_name, paths):
+        """ Adds the uploaded files for the task @thread_name.
+
+        Args:
+            - thread_name (str): The unique thread name for the task.
+            - paths (list): The paths of the uploaded files.
+
+        Returns:
+            None
+        """
+
+        if paths:
+            self._files.setdefault(thread_name, []).extend(paths)
+
+        return
+
+    def start(self, thread_name):
+        """ Keeps the files of the task @thread_name, whose function was just started, until
+        release() is called.
+
+        Args:
+            - thread_name (str): The unique thread name for the task.
+
+        Returns:
+            None
+        """
+
+        self._started.add(thread_name)
+
+        return
+
+    def release(self, thread_name):
+        """ Deletes the files of the task @thread_name once its function has returned.
+
+        Args:
+            - thread_name (str): The unique thread name for the task.
+
+        Returns:
+            None
+        """
+
+        self._started.discard(thread_name)
+        discard_files(self._files.pop(thread_name, []))
+
+        return
+
+    def on_event(self, item):
+        """ Deletes the files of a task that's done, unless its function is still running. This is
+        subscribed to placissimo.lib.event_bus.EventBus.
+
+        Args:
+            - item (tuple): The event id, event type, thread name, and JSON payload, or None for a
+            heartbeat.
+
+        Returns:
+            None
+        """
+
+        if item is None:
+            return
+
+        _, event, thread_name, _ = item
+        if (event in _FINAL_EVENTS and thread_name in self._files
+                and thread_name not in self._started):
+            discard_files(self._files.pop(thread_name))
+
+        return
+
+    def close(self):
+        """ Deletes the files of all remaining tasks, e.g. once the server stops.
+
+        Returns:
+            None
+        """
+
+        for paths in self._files.values():
+            discard_files(paths)
+        self._files.clear()
+        self._started.clear()
+
+        return
+
+
+if __name__ == "__main__":
+    pass
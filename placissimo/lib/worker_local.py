@@ -0,0 +1,112 @@
+#!/usr/bin/python3
+
+""" This module contains functions that keep state for each worker thread or process that runs the
+function called by placissimo.call().
+
+Each worker runs the user's "worker_init" function once, before its first task, and keeps the
+return value for later tasks; see worker_state(). Each worker thread or process also keeps one
+asyncio event loop that's reused by all its tasks and closed once the server stops.
+"""
+
+# import modules.
+import asyncio
+import logging
+import threading
+
+# the state of the current worker.
+_local = threading.local()
+
+# the event loops created by workers, so that they can be closed on shutdown.
+_loops = []
+_loops_lock = threading.Lock()
+
+
+def _ensure_loop():
+    """ Makes the current worker's event loop the current event loop, creating it if needed.
+
+    Returns:
+        None
+    """
+
+    loop = getattr(_local, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = asyncio.new_event_loop()
+        _local.loop = loop
+        with _loops_lock:
+            _loops.append(loop)
+
+    # note: tasks may unset the event loop, e.g. with asyncio.run(), so this is done every time.
+    asyncio.set_event_loop(loop)
+
+    return
+
+
+def init_worker(worker_init=None, new_loop=True):
+    """ Prepares the current thread to run a task. The first time this is called in a thread,
+    @worker_init() is called and its return value is kept for worker_state(). Later calls only
+    reset the event loop. Call this before each task.
+
+    Args:
+        - worker_init (function): The function that creates the worker's state. It takes no
+        arguments. Use None to skip it.
+        - new_loop (bool): Use True to give the thread its own, reusable event loop. Use False if
+        the thread already runs an event loop, e.g. the server's IOLoop.
+
+    Returns:
+        None
+
+    Raises:
+        - Exception: Any exception raised by @worker_init(). It's called again before the next task.
+    """
+
+    # without this, child logs of the user function don't seem to appear.
+    # fix per "https://github.com/tornadoweb/tornado/issues/2183#issuecomment-371001254".
+    if new_loop:
+        _ensure_loop()
+
+    if getattr(_local, "initialized", False):
+        return
+
+    if worker_init is not None:
+        logger = logging.getLogger(__name__)
+        logger.addHandler(logging.NullHandler())
+        logger.info("Initializing worker with: {}".format(worker_init.__name__))
+        _local.state = worker_init()
+    _local.initialized = True
+
+    return
+
+
+def worker_state():
+    """ Returns the value returned by the "worker_init" function for the current worker thread or
+    process. Call this from the user function, e.g. to reuse a large object loaded once per worker.
+
+    Returns:
+        object: The return value.
+        If "worker_init" wasn't passed to placissimo.call() or hasn't run in this worker, None is
+        returned.
+    """
+
+    return getattr(_local, "state", None)
+
+
+def close_loops():
+    """ Closes the event loops created by workers, except for any that are still running.
+
+    Returns:
+        None
+    """
+
+    with _loops_lock:
+        loops = list(_loops)
+        del _loops[:]
+
+    for loop in loops:
+        if not loop.is_running() and not loop.is_closed():
+            loop.close()
+
+    return
+
+
+if __name__ == "__main__":
+    pass
@@ -13,8 +13,8 @@ logger.setLevel(logging.DEBUG)
 
 
 def main(
-    # From the command line, Plac will enforce the types for each parameter as well as enforcing valid
-    # choices for @string_choices; Placissimo will not.
+    # Both Plac (from the command line) and Placissimo (through "/api") will enforce the types for
+    # each parameter as well as enforcing valid choices for @string_choices.
     string: ("a string", "positional", None, str),
     integer: ("an int", "positional", None, int),
     floating: ("a float", "positional", None, float),
@@ -0,0 +1,110 @@
+#!/usr/bin/python
+
+import logging
+import sys
+import unittest
+
+sys.path.append("..")
+
+from placissimo.lib.arg_schema import ArgSchema
+from placissimo.lib.argument_error import ArgumentError
+
+# enable logging.
+logging.basicConfig(level=logging.DEBUG)
+
+
+def funk(path: ("path to a folder"),
+         count: ("number of items", "option", None, int) = 1,
+         ratio: ("a ratio", "option", None, float) = None,
+         color: ("a color", "option", None, str, ["red", "blue"]) = "red",
+         verbose: ("be verbose", "flag") = False,
+         extra=None,
+         server_locals=None):
+    """ A user function with typed, untyped, and server arguments. """
+
+    return path
+
+
+def funk_implied(verbose: ("be verbose", "flag"),
+                 count: ("number of items", "option", None, int)):
+    """ A user function whose flag and option have no defaults. """
+
+    return count
+
+
+def funk_kwargs(path, **kwargs):
+    """ A user function that accepts any argument. """
+
+    return path
+
+
+class Test_ArgSchema(unittest.TestCase):
+    """ Tests the conversion and checking of "/api" arguments. """
+
+    def setUp(self):
+
+        self.schema = ArgSchema(funk, ["server_locals"])
+
+    def test__typed(self):
+        """ Are string values converted to the declared types? """
+
+        parsed = self.schema.parse({"path": ".", "count": "3", "ratio": "0.5"})
+        self.assertEqual(parsed["count"], 3)
+        self.assertEqual(parsed["ratio"], 0.5)
+        self.assertEqual(parsed["path"], ".")
+
+    def test__flags(self):
+        """ Do flags accept "True"/"False" and "1"/"0" and reject anything else? """
+
+        self.assertIs(self.schema.parse({"path": ".", "verbose": "1"})["verbose"], True)
+        self.assertIs(self.schema.parse({"path": ".", "verbose": "False"})["verbose"], False)
+        with self.assertRaises(ArgumentError):
+            self.schema.parse({"path": ".", "verbose": "maybe"})
+
+    def test__implied(self):
+        """ Are missing flags False and missing options None, as with Plac? """
+
+        self.assertEqual(ArgSchema(funk_implied).parse({}), {"verbose": False, "count": None})
+
+        # note: arguments with defaults are left to the function.
+        self.assertEqual(self.schema.parse({"path": "."}), {"path": "."})
+
+    def test__untyped(self):
+        """ Do untyped values that look like numbers, booleans, or None keep the old behavior? """
+
+        self.assertEqual(self.schema.parse({"path": "1"})["path"], 1)
+        self.assertIs(self.schema.parse({"path": ".", "extra": "None"})["extra"], None)
+        self.assertEqual(self.schema.parse({"path": ".", "extra": "[1]"})["extra"], "[1]")
+
+    def test__choices(self):
+        """ Are values outside an argument's choices rejected? """
+
+        self.assertEqual(self.schema.parse({"path": ".", "color": "blue"})["color"], "blue")
+        with self.assertRaises(ArgumentError):
+            self.schema.parse({"path": ".", "color": "green"})
+
+    def test__invalid(self):
+        """ Are invalid, unknown, missing, and server arguments rejected? """
+
+        for kwargs in [{"path": ".", "count": "three"}, {"path": ".", "unknown": "1"}, {},
+                       {"path": ".", "server_locals": "{}"}]:
+            with self.assertRaises(ArgumentError):
+                self.schema.parse(kwargs)
+
+    def test__json_values(self):
+        """ Are values that are already typed (e.g. from JSON) checked instead of converted? """
+
+        self.assertEqual(self.schema.parse({"path": ".", "ratio": 2})["ratio"], 2)
+        for kwargs in [{"path": ".", "count": True}, {"path": ".", "count": 1.5}]:
+            with self.assertRaises(ArgumentError):
+                self.schema.parse(kwargs)
+
+    def test__var_keyword(self):
+        """ Does a function with **kwargs accept any argument? """
+
+        parsed = ArgSchema(funk_kwargs).parse({"path": ".", "other": "2"})
+        self.assertEqual(parsed, {"path": ".", "other": 2})
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,82 @@
+#!/usr/bin/python
+
+import logging
+import sys
+import time
+import unittest
+
+sys.path.append("..")
+
+from placissimo.lib.result_cache import ResultCache
+
+# enable logging.
+logging.basicConfig(level=logging.DEBUG)
+
+
+class Test_ResultCache(unittest.TestCase):
+    """ Tests the lookups and evictions of the result cache. """
+
+    def test__key(self):
+        """ Do arguments with the same values but different types get different keys? """
+
+        keys = {ResultCache.key({"n": value}) for value in [1, 1.0, True, "1"]}
+        self.assertEqual(len(keys), 4)
+        self.assertEqual(ResultCache.key({"a": 1, "b": 2}), ResultCache.key({"b": 2, "a": 1}))
+
+    def test__hit_and_miss(self):
+        """ Are hits and misses returned and counted? """
+
+        cache = ResultCache(2)
+        cache.put(("a",), None)
+
+        self.assertEqual(cache.get(("a",)), (True, None))
+        self.assertEqual(cache.get(("b",)), (False, None))
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test__max_entries(self):
+        """ Is the least recently used entry evicted once there are too many? """
+
+        cache = ResultCache(2)
+        cache.put(("a",), 1)
+        cache.put(("b",), 2)
+        cache.get(("a",))
+        cache.put(("c",), 3)
+
+        self.assertTrue(cache.get(("a",))[0])
+        self.assertFalse(cache.get(("b",))[0])
+        self.assertEqual(cache.stats()["evicted"]["max_entries"], 1)
+
+    def test__max_bytes(self):
+        """ Are entries evicted once their results are too large, and are results that are too
+        large on their own never cached? """
+
+        cache = ResultCache(10, max_bytes=2500)
+        cache.put(("a",), "a" * 1000)
+        cache.put(("b",), "b" * 1000)
+        cache.put(("c",), "c" * 1000)
+        cache.put(("d",), "d" * 5000)
+
+        self.assertFalse(cache.get(("a",))[0])
+        self.assertTrue(cache.get(("b",))[0])
+        self.assertTrue(cache.get(("c",))[0])
+        self.assertFalse(cache.get(("d",))[0])
+        stats = cache.stats()
+        self.assertEqual(stats["evicted"]["max_bytes"], 1)
+        self.assertLessEqual(stats["result_bytes"], 2500)
+
+    def test__ttl(self):
+        """ Do entries expire after their time to live? """
+
+        cache = ResultCache(10, ttl=0.1)
+        cache.put(("a",), 1)
+        self.assertTrue(cache.get(("a",))[0])
+
+        time.sleep(0.2)
+        self.assertFalse(cache.get(("a",))[0])
+        stats = cache.stats()
+        self.assertEqual((stats["entries"], stats["evicted"]["ttl"]), (0, 1))
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,74 @@
+#!/usr/bin/python
+
+import datetime
+import json
+import logging
+import sys
+import unittest
+
+sys.path.append("..")
+
+from placissimo.lib import serializer
+from placissimo.lib.serializer import JSON, Serializer
+
+# enable logging.
+logging.basicConfig(level=logging.DEBUG)
+
+
+class Test_Serializer(unittest.TestCase):
+    """ Tests the encoding of responses. """
+
+    def setUp(self):
+
+        self.serializer = Serializer(offload_bytes=1000)
+
+    def test__negotiate(self):
+        """ Is JSON sent unless a supported media type is preferred? """
+
+        self.assertEqual(self.serializer.negotiate(None), JSON)
+        self.assertEqual(self.serializer.negotiate("text/html, */*;q=0.1"), JSON)
+        self.assertEqual(self.serializer.negotiate("application/unknown"), JSON)
+        if serializer.msgpack is not None:
+            self.assertEqual(self.serializer.negotiate(
+                "application/json;q=0.5, application/msgpack"), serializer.MSGPACK)
+            self.assertEqual(self.serializer.negotiate(
+                "application/msgpack;q=0, application/json"), JSON)
+
+    def test__default(self):
+        """ Are values that JSON can't represent converted? """
+
+        obj = {"when": datetime.date(2020, 1, 2), "data": b"\x00", "tags": {"a"},
+               "other": object}
+        content_type, data = self.serializer.encode(obj)
+
+        self.assertTrue(content_type.startswith(JSON))
+        self.assertEqual(json.loads(data.decode()), {"when": "2020-01-02", "data": "AA==",
+                                                     "tags": ["a"], "other": str(object)})
+
+    def test__is_large(self):
+        """ Are only large values encoded in a helper thread? """
+
+        self.assertFalse(self.serializer.is_large({"a": list(range(10))}))
+        self.assertTrue(self.serializer.is_large({"a": ["x" * 100] * 20}))
+        self.assertFalse(Serializer(offload_bytes=None).is_large("x" * 10000))
+
+    def test__pieces(self):
+        """ Does encoding in pieces give the same JSON as encoding in one go? """
+
+        obj = {"servissimo_{:03}".format(i): {"result": list(range(i * 50)), "done": True,
+                                              1: None, "nested": [[{"a": "é"}]] * i}
+               for i in range(100)}
+        obj["empty"] = [{}, [], ""]
+
+        pieces = list(self.serializer._iter_json(obj))
+        self.assertGreater(len(pieces), 1)
+        self.assertEqual(json.loads(b"".join(pieces).decode()),
+                         json.loads(self.serializer.encode(obj)[1].decode()))
+
+        content_type, data = self.serializer.encode_async(obj).result()
+        self.assertEqual(data, b"".join(pieces))
+        self.serializer.close()
+
+
+if __name__ == "__main__":
+    pass
@@ -61,7 +61,7 @@ class Test_Server(unittest.TestCase):
     def test__api(self):
         """ Does /api return a 200 via GET? """
 
-        endpoint = "http://localhost:{}/api".format(self.port)
+        endpoint = "http://localhost:{}/api?path=.".format(self.port)
         logging.info("Testing endpoint: {}".format(endpoint))
 
         passed = requests.get(endpoint).status_code == 200
@@ -85,6 +85,83 @@ class Test_Server(unittest.TestCase):
         passed = requests.get(endpoint).status_code == 200
         self.assertTrue(passed)
 
+    def _start_task(self):
+        """ Calls @self.funk via /api and returns the task's thread name. """
+
+        call = requests.get("http://localhost:{}/api?path=.".format(self.port))
+
+        return list(json.loads(call.text))[-1]
+
+    def test__events(self):
+        """ Does /events stream the "queued" event of a new task? """
+
+        endpoint = "http://localhost:{}/events".format(self.port)
+        logging.info("Testing endpoint: {}".format(endpoint))
+
+        # open the stream before starting the task; read it until the task's event arrives.
+        passed = False
+        with requests.get(endpoint, stream=True, timeout=10) as events:
+            self.assertEqual(events.headers["Content-Type"], "text/event-stream")
+            task_thread_name = self._start_task()
+            event = None
+            for line in events.iter_lines(chunk_size=1, decode_unicode=True):
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                elif line.startswith("data: "):
+                    data = json.loads(line[len("data: "):])
+                    if event == "queued" and data["name"] == task_thread_name:
+                        passed = True
+                        break
+
+        self.assertTrue(passed)
+
+    def test__cancel(self):
+        """ Does /cancel cancel a running task and return a 409 once it's done? """
+
+        task_thread_name = self._start_task()
+        endpoint = "http://localhost:{}/cancel?name={}".format(self.port, task_thread_name)
+        logging.info("Testing endpoint: {}".format(endpoint))
+
+        cancelled = requests.get(endpoint)
+        self.assertEqual(cancelled.status_code, 200)
+        task_data = json.loads(cancelled.text)[task_thread_name]
+        self.assertTrue(task_data["done"])
+        self.assertIn("TaskCancelledError", task_data["exception"])
+
+        self.assertEqual(requests.get(endpoint).status_code, 409)
+        self.assertEqual(requests.get(
+            "http://localhost:{}/cancel?name=unknown".format(self.port)).status_code, 404)
+
+    def test__result(self):
+        """ Does /tasks/result return a 404 for a task whose result isn't in a file and a 400 if
+        no task is named? """
+
+        task_thread_name = self._start_task()
+        endpoint = "http://localhost:{}/tasks/result".format(self.port)
+        logging.info("Testing endpoint: {}".format(endpoint))
+
+        self.assertEqual(requests.get(
+            endpoint, params={"name": task_thread_name}).status_code, 404)
+        self.assertEqual(requests.get(endpoint).status_code, 400)
+
+    def test__batch(self):
+        """ Does /api/batch start a task per item and report the batch's progress? """
+
+        endpoint = "http://localhost:{}/api/batch".format(self.port)
+        logging.info("Testing endpoint: {}".format(endpoint))
+
+        batch = requests.post(endpoint, json=[{"path": "."}, {"path": ".."}])
+        self.assertEqual(batch.status_code, 200)
+        batch = json.loads(batch.text)
+        self.assertEqual((len(batch["tasks"]), batch["rejected"]), (2, 0))
+
+        status = requests.get(endpoint, params={"id": batch["batch"]})
+        self.assertEqual(status.status_code, 200)
+        self.assertEqual(json.loads(status.text)[batch["batch"]]["total"], 2)
+
+        # an empty batch is rejected.
+        self.assertEqual(requests.post(endpoint, json=[]).status_code, 400)
+
     def test__render(self):
         """ Does /index contain the proper rendered object?
         This queries /index via POST. """
@@ -0,0 +1,106 @@
+#!/usr/bin/python
+
+import logging
+import sys
+import unittest
+
+sys.path.append("..")
+
+from placissimo.lib.queue_full_error import QueueFullError
+from placissimo.lib.task_queue import TaskQueue
+
+# enable logging.
+logging.basicConfig(level=logging.DEBUG)
+
+
+class _IOLoop():
+    """ Runs callbacks right away instead of on an IOLoop. """
+
+    def add_callback(self, callback, *args, **kwargs):
+
+        callback(*args, **kwargs)
+
+
+class Test_TaskQueue(unittest.TestCase):
+    """ Tests the admission, priorities, and round-robin scheduling of tasks. """
+
+    def setUp(self):
+
+        self.queue = TaskQueue(_IOLoop(), max_workers=1, max_queue=5)
+        self.started = []
+
+    def _admit(self, name, priority=0, client=None):
+        """ Admits the task @name, which records its start in @self.started. """
+
+        return self.queue.admit(name, lambda: self.started.append(name), priority, client)
+
+    def _drain(self):
+        """ Releases the running task until no task is left. """
+
+        while self.queue.running:
+            self.queue.release(self.started[-1])
+
+    def test__admit(self):
+        """ Do tasks start while a worker is free and wait otherwise? """
+
+        self.assertTrue(self._admit("a"))
+        self.assertFalse(self._admit("b"))
+        self.assertEqual(self.started, ["a"])
+        self.assertEqual(self.queue.depth, 1)
+
+        self.queue.release("a")
+        self.assertEqual(self.started, ["a", "b"])
+        self.assertEqual(self.queue.depth, 0)
+
+    def test__priority(self):
+        """ Do queued tasks with a higher priority start first? """
+
+        self._admit("a")
+        self._admit("low", priority=-1)
+        self._admit("normal")
+        self._admit("high", priority=10)
+        self._drain()
+
+        self.assertEqual(self.started, ["a", "high", "normal", "low"])
+
+    def test__round_robin(self):
+        """ Do clients take turns within a priority, each one's tasks first in, first out? """
+
+        self._admit("a")
+        for name in ["x1", "x2", "x3"]:
+            self._admit(name, client="x")
+        self._admit("y1", client="y")
+        self._admit("z1", client="z")
+        self.assertEqual(self.queue.client_depths(), {"x": 3, "y": 1, "z": 1})
+        self._drain()
+
+        self.assertEqual(self.started, ["a", "x1", "y1", "z1", "x2", "x3"])
+
+    def test__queue_full(self):
+        """ Is a task rejected with a retry estimate once the queue is full? """
+
+        self._admit("a")
+        for i in range(5):
+            self._admit("queued_{}".format(i))
+
+        with self.assertRaises(QueueFullError) as context:
+            self._admit("rejected")
+        self.assertGreaterEqual(context.exception.retry_after, 1)
+
+    def test__cancel(self):
+        """ Is a cancelled task removed from the queue and never started? """
+
+        self._admit("a")
+        self._admit("b", client="x")
+        self._admit("c", client="x")
+
+        self.assertTrue(self.queue.cancel("b"))
+        self.assertFalse(self.queue.cancel("b"))
+        self.assertFalse(self.queue.cancel("a"))
+        self._drain()
+
+        self.assertEqual(self.started, ["a", "c"])
+
+
+if __name__ == "__main__":
+    pass
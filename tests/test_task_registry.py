@@ -0,0 +1,91 @@
+#!/usr/bin/python
+
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.append("..")
+
+from placissimo.lib.task_registry import TaskRegistry
+from placissimo.lib.task_store import TaskStore
+
+# enable logging.
+logging.basicConfig(level=logging.DEBUG)
+
+
+class Test_TaskRegistry(unittest.TestCase):
+    """ Tests the trimming of task metadata to the requested fields and the eviction of tasks
+    kept in memory. """
+
+    def setUp(self):
+
+        self.registry = TaskRegistry("servissimo_")
+
+    def _add(self, result=None, exception=None):
+        """ Adds a finished task with @result and @exception to @self.registry.
+
+        Returns:
+            str: The return value.
+            The task's thread name.
+        """
+
+        name = self.registry.new_name()
+        self.registry.add(name, "test:funk")
+        self.registry.finish(name, result, exception)
+
+        return name
+
+    def test__fields(self):
+        """ Are only the requested fields sent, skipping unknown ones? """
+
+        name = self._add(result=[1, 2])
+        fields = ["state", "result", "unknown"]
+
+        self.assertEqual(self.registry.snapshot([name], fields),
+                         {name: {"state": "done", "result": [1, 2]}})
+        self.assertEqual(self.registry.query(fields=["state"]), (1, {name: {"state": "done"}}))
+        self.assertIn("start_time", self.registry.snapshot([name])[name])
+
+    def test__stored_fields(self):
+        """ Are the fields of stored tasks trimmed the same way? """
+
+        directory = tempfile.mkdtemp()
+        store = TaskStore(os.path.join(directory, "tasks.db"))
+        self.registry = TaskRegistry("servissimo_", store=store)
+        try:
+            names = [self._add(result=i) for i in range(3)]
+            self.registry.close()
+
+            registry = TaskRegistry("servissimo_", store=TaskStore(store.path))
+            total, tasks = registry.query(start=1, fields=["result"])
+            self.assertEqual(total, 3)
+            self.assertEqual(tasks, {names[1]: {"result": 1}, names[2]: {"result": 2}})
+            registry.close()
+        finally:
+            shutil.rmtree(directory)
+
+    def test__max_tasks(self):
+        """ Are the oldest finished tasks evicted from memory once there are too many? """
+
+        self.registry = TaskRegistry("servissimo_", max_tasks=2)
+        names = [self._add() for _ in range(3)]
+
+        self.assertEqual(list(self.registry.snapshot()), names[1:])
+        self.assertEqual(self.registry.eviction_counts()["max_tasks"], 1)
+
+    def test__failed(self):
+        """ Are failed tasks counted apart when querying by state? """
+
+        self._add(result=1)
+        failed = self._add(exception="ValueError('boom')")
+
+        total, tasks = self.registry.query(state="failed", fields=["exception"])
+        self.assertEqual(total, 1)
+        self.assertEqual(tasks, {failed: {"exception": "ValueError('boom')"}})
+
+
+if __name__ == "__main__":
+    pass
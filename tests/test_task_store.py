@@ -0,0 +1,106 @@
+#!/usr/bin/python
+
+import logging
+import os
+import queue
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.append("..")
+
+from placissimo.lib.task_registry import TaskRecord
+from placissimo.lib.task_store import TaskStore
+
+# enable logging.
+logging.basicConfig(level=logging.DEBUG)
+
+
+class Test_TaskStore(unittest.TestCase):
+    """ Tests the retention policies of the task store. """
+
+    def setUp(self):
+
+        self.directory = tempfile.mkdtemp()
+        self.flushed = queue.Queue()
+        self.evicted = queue.Queue()
+        self.store = TaskStore(os.path.join(self.directory, "tasks.db"),
+                               on_flush=self.flushed.put,
+                               on_evict=lambda evicted, names: self.evicted.put((evicted, names)))
+
+    def tearDown(self):
+
+        self.store.close()
+        shutil.rmtree(self.directory)
+
+    def _write(self, task_id, state="done", result=None):
+        """ Writes the task @task_id and waits until it's saved.
+
+        Returns:
+            str: The return value.
+            The task's thread name.
+        """
+
+        record = TaskRecord(task_id, "servissimo_{:03}".format(task_id), "test:funk")
+        record.state, record.result = state, result
+        self.store.write(task_id, record)
+        while record.name not in self.flushed.get(timeout=5):
+            continue
+
+        # note: tasks are evicted in the order in which they're saved.
+        time.sleep(0.01)
+
+        return record.name
+
+    def _evict(self, **limits):
+        """ Evicts tasks per @limits and waits until they're deleted.
+
+        Returns:
+            tuple: The return value.
+            The number of evicted tasks per retention policy and their thread names.
+        """
+
+        self.store.evict(**limits)
+
+        return self.evicted.get(timeout=5)
+
+    def test__max_tasks(self):
+        """ Are the oldest finished tasks evicted once there are too many, but never unfinished
+        ones? """
+
+        names = [self._write(task_id) for task_id in range(1, 5)]
+        queued = self._write(5, state="queued")
+
+        evicted, evicted_names = self._evict(max_tasks=2)
+        self.assertEqual(evicted["max_tasks"], 3)
+        self.assertEqual(evicted_names, names[:3])
+        self.assertEqual(self.store.names(), [names[3], queued])
+        self.assertEqual(self.store.counts(), {"queued": 1, "running": 0, "done": 1})
+
+    def test__max_age(self):
+        """ Are finished tasks evicted once they're too old? """
+
+        names = [self._write(task_id) for task_id in range(1, 3)]
+        time.sleep(0.3)
+        names.append(self._write(3))
+
+        evicted, evicted_names = self._evict(max_age=0.2)
+        self.assertEqual(evicted["max_age"], 2)
+        self.assertEqual(sorted(evicted_names), names[:2])
+        self.assertEqual(self.store.names(), names[2:])
+
+    def test__max_result_bytes(self):
+        """ Are the oldest finished tasks evicted until their results fit? """
+
+        names = [self._write(task_id, result="x" * 100) for task_id in range(1, 4)]
+
+        evicted, evicted_names = self._evict(max_result_bytes=250)
+        self.assertEqual(evicted["max_result_bytes"], 1)
+        self.assertEqual(evicted_names, names[:1])
+        self.assertEqual(self.store.get(names[1])["result"], "x" * 100)
+
+
+if __name__ == "__main__":
+    pass